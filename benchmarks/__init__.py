@@ -0,0 +1,7 @@
+"""Pipeline benchmarks against a local SQLite stand-in for Postgres.
+
+Modules:
+- synthetic: wine-shaped synthetic data at arbitrary row counts
+- stages: one benchmark per pipeline stage (setup + timed run)
+- run: CLI driver; one subprocess per stage and size, JSON report, baseline comparison
+"""
@@ -0,0 +1,157 @@
+"""Benchmark the pipeline stages at growing row counts.
+
+Usage (from the repository root):
+
+    python -m benchmarks.run --sizes 1e3,1e4,1e5 --output bench.json
+    python -m benchmarks.run --sizes 1e3,1e4,1e5 --baseline bench.json
+
+Each (stage, size) runs in a fresh subprocess so peak RSS is per stage. The report
+is JSON; with `--baseline`, results slower or larger than the baseline by more than
+`--tolerance` are listed under `regressions` and the exit code is 1. No baseline is
+shipped (timings are per machine): record one with `--output` on the reference
+commit first, as in the first command.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from .stages import STAGES, StageContext
+
+
+DEFAULT_SIZES = "1e3,1e4,1e5"
+
+
+def _max_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(stage: str, rows: int, workdir: str, repeat: int = 1, seed: int = 0) -> Dict[str, Any]:
+    """Run one stage in this process and return its timings (best of `repeat`) and RSS."""
+    run = STAGES[stage](StageContext(rows=rows, workdir=workdir, seed=seed))
+    setup_rss = _max_rss_mb()
+    wall, cpu, processed = float("inf"), float("inf"), 0
+    for _ in range(max(repeat, 1)):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        processed = run()
+        wall = min(wall, time.perf_counter() - wall_start)
+        cpu = min(cpu, time.process_time() - cpu_start)
+    return {
+        "stage": stage,
+        "rows": rows,
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "rows_per_s": processed / wall if wall > 0 else None,
+        "peak_rss_mb": _max_rss_mb(),
+        # high-water mark before the timed section (data generation, imports)
+        "setup_rss_mb": setup_rss,
+    }
+
+
+def _measure_in_subprocess(stage: str, rows: int, workdir: str, repeat: int, seed: int) -> Dict[str, Any]:
+    cmd = [sys.executable, "-m", "benchmarks.run", "--worker", stage, "--rows", str(rows)]
+    cmd += ["--workdir", workdir, "--repeat", str(repeat), "--seed", str(seed)]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(cmd, cwd=root, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"stage": stage, "rows": rows, "error": proc.stderr.strip().splitlines()[-1:] or ["failed"]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(
+    results: Sequence[Dict[str, Any]], baseline: Sequence[Dict[str, Any]], tolerance: float, min_wall_s: float = 0.05
+) -> List[Dict[str, Any]]:
+    """Results whose wall time or peak RSS exceed the baseline by more than `tolerance`.
+
+    Wall times below `min_wall_s` are compared against `min_wall_s` to ignore timer noise.
+    """
+    base = {(b["stage"], b["rows"]): b for b in baseline if "error" not in b}
+    regressions = []
+    for result in results:
+        ref = base.get((result["stage"], result["rows"]))
+        if ref is None or "error" in result:
+            continue
+        for key, floor in (("wall_s", min_wall_s), ("peak_rss_mb", 0.0)):
+            current, previous = result[key], max(ref[key], floor)
+            if current > previous * (1 + tolerance):
+                regressions.append(
+                    {"stage": result["stage"], "rows": result["rows"], "metric": key, "baseline": ref[key], "current": current}
+                )
+    return regressions
+
+
+def _parse_sizes(value: str) -> List[int]:
+    return [int(float(v)) for v in value.split(",") if v.strip()]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated row counts (1e3 ... 1e7)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated stages")
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per stage (best is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="scratch directory (SQLite files, artifacts); reused across runs")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="baseline report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown / RSS growth")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.rows, args.workdir, args.repeat, args.seed)))
+        return 0
+
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))} (choose from {', '.join(STAGES)})")
+    if args.baseline and not os.path.exists(args.baseline):
+        # Fail before the (long) run, not after it
+        parser.error(f"baseline {args.baseline} not found; record one first with --output {args.baseline}")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="wine_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    results = []
+    for rows in _parse_sizes(args.sizes):
+        for stage in stages:
+            result = _measure_in_subprocess(stage, rows, workdir, args.repeat, args.seed)
+            print(f"{stage:>16} {rows:>10}: {result.get('wall_s', float('nan')):.3f}s", file=sys.stderr)
+            results.append(result)
+
+    report: Dict[str, Any] = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)["results"]
+        report["tolerance"] = args.tolerance
+        report["regressions"] = compare(results, baseline, args.tolerance)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+    failed = any("error" in r for r in results) or bool(report.get("regressions"))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
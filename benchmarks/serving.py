@@ -0,0 +1,193 @@
+"""Load-test the prediction server (`iris_pipeline.serving`).
+
+Usage (from the repository root):
+
+    python -m benchmarks.serving --requests 20000 --concurrency 64 --max-batch 1,256
+
+Trains a model on synthetic wine-shaped data, publishes it into a scratch artifact
+store and, for each `--max-batch` value, starts the server in a subprocess (so the
+load generator does not share its interpreter) and sends single-row requests over
+`--concurrency` keep-alive connections. Reports p50/p90/p99 latency, throughput and
+the server's mean batch size as JSON; `--max-batch 1` disables micro-batching.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+
+from dags.iris_pipeline.artifacts import LocalArtifactStore
+from dags.iris_pipeline.config import Settings
+from dags.iris_pipeline.features import FEATURE_COLS
+from dags.iris_pipeline.train import fit_model
+from dags.iris_pipeline.types import ArtifactRef
+
+from .synthetic import synthetic_wine
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def publish_model(artifact_root: str, rows: int = 10_000, seed: int = 0) -> np.ndarray:
+    """Fit and publish a model into `artifact_root`; returns feature rows to send."""
+    df = synthetic_wine(rows, seed=seed, start=None)
+    X, y = df[FEATURE_COLS].to_numpy(), df["target"].to_numpy()
+    settings = Settings(artifact_root=artifact_root, n_jobs=1)
+    store = LocalArtifactStore(artifact_root)
+    result = fit_model(settings, X, y, store=store, namespace="bench")
+    store.publish("model", ArtifactRef(**result["model_ref"]))
+    return X
+
+
+def _request(body: bytes) -> bytes:
+    return (
+        b"POST /predict HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+        + f"Content-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def generate_load(
+    host: str, port: int, rows: np.ndarray, requests: int, concurrency: int
+) -> Dict[str, Any]:
+    """Send `requests` single-row predictions over `concurrency` keep-alive connections."""
+    payloads = [_request(json.dumps({"features": row.tolist()}).encode()) for row in rows[: min(len(rows), 4096)]]
+    latencies: List[float] = []
+    errors = 0
+    sent = 0
+
+    async def client() -> None:
+        nonlocal errors, sent
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while sent < requests:
+                payload = payloads[sent % len(payloads)]
+                sent += 1
+                started = time.perf_counter()
+                writer.write(payload)
+                status = await _read_response(reader)
+                latencies.append(time.perf_counter() - started)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(max(concurrency, 1))))
+    wall = time.perf_counter() - started
+    ms = np.array(latencies) * 1000.0
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "wall_s": wall,
+        "requests_per_s": len(latencies) / wall if wall > 0 else None,
+        "latency_ms": {
+            "mean": float(ms.mean()),
+            "p50": float(np.percentile(ms, 50)),
+            "p90": float(np.percentile(ms, 90)),
+            "p99": float(np.percentile(ms, 99)),
+            "max": float(ms.max()),
+        },
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _health(port: int) -> Optional[Dict[str, Any]]:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as resp:
+            return json.load(resp)
+    except OSError:
+        return None
+
+
+def run_server_benchmark(
+    artifact_root: str, rows: np.ndarray, requests: int, concurrency: int, max_batch: int, max_wait_ms: float
+) -> Dict[str, Any]:
+    port = _free_port()
+    env = {
+        **os.environ,
+        "ARTIFACT_ROOT": artifact_root,
+        "SERVING_MAX_BATCH": str(max_batch),
+        "SERVING_MAX_WAIT_MS": str(max_wait_ms),
+    }
+    cmd = [sys.executable, "-m", "iris_pipeline.serving", "--host", "127.0.0.1", "--port", str(port)]
+    proc = subprocess.Popen(cmd, cwd=os.path.join(ROOT, "dags"), env=env, stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 60
+        while (_health(port) or {}).get("status") != "ok":
+            if proc.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f"prediction server did not start (exit code {proc.poll()})")
+            time.sleep(0.1)
+        # Warm-up, not measured
+        asyncio.run(generate_load("127.0.0.1", port, rows, min(requests, 500), concurrency))
+        before = _health(port)
+        result = asyncio.run(generate_load("127.0.0.1", port, rows, requests, concurrency))
+        after = _health(port)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    batches = after["batches"] - before["batches"]
+    return {
+        "max_batch": max_batch,
+        "max_wait_ms": max_wait_ms,
+        **result,
+        "mean_batch_rows": (after["rows"] - before["rows"]) / batches if batches else None,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-batch", default="1,256", help="comma-separated SERVING_MAX_BATCH values")
+    parser.add_argument("--max-wait-ms", type=float, default=1.0)
+    parser.add_argument("--train-rows", type=int, default=10_000)
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="iris_serving_bench_") as workdir:
+        artifact_root = os.path.join(workdir, "artifacts")
+        rows = publish_model(artifact_root, args.train_rows)
+        results = [
+            run_server_benchmark(artifact_root, rows, args.requests, args.concurrency, int(b), args.max_wait_ms)
+            for b in args.max_batch.split(",")
+        ]
+    report = json.dumps({"results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(report)
+    print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
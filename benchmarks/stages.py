@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, replace
+from datetime import date
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from dags.iris_pipeline import db, ingest, metrics, train, validation
+from dags.iris_pipeline.artifacts import LocalArtifactStore
+from dags.iris_pipeline.config import Settings
+
+from .synthetic import synthetic_wine
+
+
+# A stage runs its setup (untimed) and returns the timed callable; the callable
+# returns the number of rows it processed.
+Stage = Callable[["StageContext"], Callable[[], int]]
+
+
+@dataclass(frozen=True)
+class StageContext:
+    rows: int
+    workdir: str
+    seed: int = 0
+
+    @property
+    def settings(self) -> Settings:
+        return Settings(
+            postgres_conn_id="benchmark",
+            iris_table="wine_data",
+            eval_table="wine_evaluation",
+            predictions_table="wine_predictions",
+            artifact_root=os.path.join(self.workdir, "artifacts"),
+            mlflow_tracking_uri=None,
+        )
+
+    def db_path(self, name: str = "wine") -> str:
+        return os.path.join(self.workdir, f"{name}_{self.rows}.sqlite")
+
+
+def use_local_database(ctx: StageContext, name: str = "wine") -> Settings:
+    """Point `db.get_engine` at a per-size SQLite file (the Postgres stand-in)."""
+    settings = ctx.settings
+    db.register_engine(settings, create_engine(f"sqlite:///{ctx.db_path(name)}"))
+    db.ensure_tables(db.get_engine(settings), settings)
+    return settings
+
+
+def _mark_populated(ctx: StageContext) -> None:
+    open(ctx.db_path() + ".ready", "w").close()
+
+
+def _populated_database(ctx: StageContext) -> Settings:
+    # Written once per size (normally by the `write_iris` stage) and reused by
+    # read-side stages and later runs
+    settings = use_local_database(ctx)
+    if not os.path.exists(ctx.db_path() + ".ready"):
+        ingest.write_iris(settings, synthetic_wine(ctx.rows, seed=ctx.seed))
+        _mark_populated(ctx)
+    return settings
+
+
+def write_iris(ctx: StageContext) -> Callable[[], int]:
+    settings = use_local_database(ctx)
+    df = synthetic_wine(ctx.rows, seed=ctx.seed)
+
+    def run() -> int:
+        rows = ingest.write_iris(settings, df)
+        _mark_populated(ctx)
+        return rows
+
+    return run
+
+
+def ingest_synthetic(ctx: StageContext) -> Callable[[], int]:
+    # Generation + chunked write of one day, as the DAG does with SYNTHETIC_ROWS; own
+    # database so the dataset read by `load_dataset` keeps its size
+    settings = use_local_database(ctx, "synthetic")
+    day = date(2025, 1, 1)
+
+    def run() -> int:
+        chunks = ingest.iter_synthetic_wine(ctx.rows, f"{day:%Y-%m-%d}", settings.ingest_chunk_rows, seed=ctx.seed)
+        return ingest.write_iris_chunks(settings, chunks, [day])
+
+    return run
+
+
+def load_dataset(ctx: StageContext) -> Callable[[], int]:
+    settings = _populated_database(ctx)
+
+    def run() -> int:
+        X, _ = train.load_dataset(settings)
+        return len(X)
+
+    return run
+
+
+def validate(ctx: StageContext) -> Callable[[], int]:
+    settings = _populated_database(ctx)
+    engine = db.get_engine(settings)
+    query = text(f"SELECT DISTINCT ingestion_date FROM {settings.iris_table}")
+    with engine.connect() as conn:
+        days = [pd.Timestamp(r[0]).date() for r in conn.execute(query)]
+
+    def run() -> int:
+        # All rules for every partition as one pushed-down aggregate query
+        results = validation.validate_partitions(engine, settings, days)
+        return sum(rs[0].row_count for rs in results.values())
+
+    return run
+
+
+def fit_model(ctx: StageContext) -> Callable[[], int]:
+    settings = ctx.settings
+    df = synthetic_wine(ctx.rows, seed=ctx.seed, start=None)
+    X, y = df[train.FEATURE_COLS].to_numpy(), df["target"].to_numpy()
+    del df
+    store = LocalArtifactStore(settings.artifact_root)
+
+    def run() -> int:
+        train.fit_model(settings, X, y, store=store, namespace="benchmark")
+        return len(X)
+
+    return run
+
+
+def cross_validate(ctx: StageContext) -> Callable[[], int]:
+    # 5 folds in a process pool over memory-mapped .npy files, plus 1000 bootstrap
+    # resamples; compare with `fit_model` for the cost over a single fit
+    settings = replace(ctx.settings, cv_folds=5)
+    df = synthetic_wine(ctx.rows, seed=ctx.seed, start=None)
+    X_path = os.path.join(ctx.workdir, f"cv_X_{ctx.rows}.npy")
+    y_path = os.path.join(ctx.workdir, f"cv_y_{ctx.rows}.npy")
+    np.save(X_path, df[train.FEATURE_COLS].to_numpy())
+    np.save(y_path, df["target"].to_numpy())
+    del df
+
+    def run() -> int:
+        train.cross_validate(settings, X_path, y_path)
+        return ctx.rows
+
+    return run
+
+
+def compute_metrics(ctx: StageContext) -> Callable[[], int]:
+    rng = np.random.default_rng(ctx.seed)
+    y_true = rng.integers(0, 3, size=ctx.rows)
+    # ~10% of predictions wrong
+    y_pred = np.where(rng.random(ctx.rows) < 0.1, rng.integers(0, 3, size=ctx.rows), y_true)
+
+    def run() -> int:
+        metrics.compute_metrics(y_true, y_pred)
+        return len(y_true)
+
+    return run
+
+
+STAGES: Dict[str, Stage] = {
+    "write_iris": write_iris,
+    "ingest_synthetic": ingest_synthetic,
+    "load_dataset": load_dataset,
+    "validate": validate,
+    "fit_model": fit_model,
+    "cross_validate": cross_validate,
+    "compute_metrics": compute_metrics,
+}
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import pandas as pd
+
+from dags.iris_pipeline.ingest import iter_synthetic_wine
+
+
+def synthetic_wine(n_rows: int, seed: int = 0, days: int = 7, start: Optional[str] = "2025-01-01") -> pd.DataFrame:
+    """Wine-shaped frame of `n_rows` rows, spread over `days` `ingestion_date` values.
+
+    Rows come from `ingest.iter_synthetic_wine` (per-class multivariate normals fitted
+    on the real data). With `start=None` the frame has no `ingestion_date`.
+    """
+    if start is None:
+        return pd.concat(iter_synthetic_wine(n_rows, seed=seed, chunk_rows=max(n_rows, 1)), ignore_index=True)
+    days = max(min(days, n_rows), 1)
+    frames = []
+    for i in range(days):
+        ds = f"{pd.Timestamp(start) + pd.Timedelta(days=i):%Y-%m-%d}"
+        n = n_rows // days + (i < n_rows % days)
+        frames.extend(iter_synthetic_wine(n, ds, chunk_rows=max(n, 1), seed=seed + i))
+    return pd.concat(frames, ignore_index=True)
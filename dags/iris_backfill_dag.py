@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+# Manually triggered backfill built from the same iris_pipeline modules as the daily
+# DAG. As there, only Airflow and lightweight config are imported at module level.
+#
+#   airflow dags trigger iris_backfill_dag \
+#       --conf '{"start": "2025-01-01", "end": "2025-01-31", "granularity": "week"}'
+from datetime import date, datetime
+from typing import Dict, Any, List
+
+from airflow.decorators import dag, task
+from airflow.models.param import Param
+from airflow.operators.python import get_current_context
+
+from iris_pipeline.config import Settings, load_settings_from_env
+
+
+@dag(
+    schedule=None,  # triggered with a date range
+    start_date=datetime(2025, 1, 1),
+    catchup=False,
+    max_active_runs=1,
+    tags=["example", "ml", "iris", "mlflow", "backfill"],
+    default_args={"owner": "airflow", "retries": 1},
+    params={
+        "start": Param(None, type=["null", "string"], format="date", description="first day (default: end)"),
+        "end": Param(None, type=["null", "string"], format="date", description="last day (default: logical date)"),
+        # keys of iris_pipeline.backfill.GRANULARITIES
+        "granularity": Param("all", enum=["all", "month", "week", "day"], description="one model per window"),
+    },
+)
+def iris_backfill_dag():
+
+    def _settings() -> Settings:
+        # Read at task run time, not at parse time
+        return load_settings_from_env()
+
+    def run_namespace() -> str:
+        from iris_pipeline.artifacts import namespace_for
+
+        ctx = get_current_context()
+        return namespace_for(ctx["dag"].dag_id, ctx["run_id"])
+
+    def record_perf(settings: Settings, day: str) -> None:
+        # Stages profiled by this task instance -> perf table; never fails the task
+        from iris_pipeline import perf
+
+        perf.record_task_perf(settings, get_current_context(), date.fromisoformat(day))
+
+    @task()
+    def plan() -> Dict[str, Any]:
+        from iris_pipeline import backfill
+
+        ctx = get_current_context()
+        params = ctx["params"]
+        end = params.get("end") or ctx.get("ds") or f"{date.today():%Y-%m-%d}"
+        days = backfill.backfill_days(params.get("start") or end, end)
+        windows = backfill.backfill_windows(days, params.get("granularity") or "all")
+        print(f"[BACKFILL] {len(days)} days in {len(windows)} training window(s)", flush=True)
+        return {"days": [f"{d:%Y-%m-%d}" for d in days], "windows": windows}
+
+    @task()
+    def ingest_range(planned: Dict[str, Any]) -> Dict[str, Any]:
+        from iris_pipeline import backfill
+        from iris_pipeline.perf import profile_stage
+
+        settings = _settings()
+        days = [date.fromisoformat(d) for d in planned["days"]]
+        # One DDL pass and one transaction for the whole range
+        with profile_stage("ingest") as stage:
+            stage.rows = backfill.ingest_range(settings, days)
+        record_perf(settings, planned["days"][-1])
+        return {"rows_ingested": stage.rows, "days": len(days), "table": settings.iris_table}
+
+    @task()
+    def validate_range(planned: Dict[str, Any], ingested: Dict[str, Any]) -> Dict[str, Any]:
+        from airflow.exceptions import AirflowFailException
+
+        from iris_pipeline import db as db_mod
+        from iris_pipeline import validation
+        from iris_pipeline.perf import profile_stage
+
+        settings = _settings()
+        # All days in one aggregate query grouped by ingestion_date
+        with profile_stage("validate") as stage:
+            try:
+                summary = validation.run_validation(
+                    db_mod.get_engine(settings),
+                    settings,
+                    [date.fromisoformat(d) for d in planned["days"]],
+                    dag_run_id=get_current_context()["run_id"],
+                )
+            except validation.ValidationError as exc:
+                raise AirflowFailException(str(exc)) from exc
+            stage.rows = ingested["rows_ingested"]
+        record_perf(settings, planned["days"][-1])
+        return {**ingested, "validation": summary}
+
+    @task()
+    def windows(planned: Dict[str, Any], validated: Dict[str, Any]) -> List[Dict[str, str]]:
+        # Taking the validation result orders training after the load and its checks
+        return planned["windows"]
+
+    @task()
+    def train_window(window: Dict[str, str]) -> Dict[str, Any]:
+        from iris_pipeline import backfill
+        from iris_pipeline import db as db_mod
+        from iris_pipeline.artifacts import build_artifact_store, put_confusion_matrix
+        from iris_pipeline.mlflow_utils import build_metrics_logger
+        from iris_pipeline.perf import profile_stage
+
+        settings = _settings()
+        store = build_artifact_store(settings)
+        with profile_stage("fit") as stage:
+            result = backfill.train_window(settings, window, store, run_namespace())
+            stage.rows = result["rows"]
+
+        cm_path = put_confusion_matrix(store, run_namespace(), result["confusion_matrix"])
+
+        with profile_stage("mlflow"):
+            logger = build_metrics_logger(settings)
+            ml = logger.log_all(
+                params={**result["params"], "backfill_start": window["start"], "backfill_end": window["end"]},
+                metrics={**result["metrics"], **result.get("fit_stats", {})},
+                model_path=result["model_path"],
+                features=result["features"],
+                confusion_matrix_path=cm_path,
+                candidates=result.get("candidates"),
+            )
+            upload_errors = logger.flush()
+        error = "; ".join(filter(None, [ml.error, *upload_errors])) or None
+        print(f"[MLFLOW] window {window['start']}..{window['end']}: run_id={ml.run_id}, error={error}", flush=True)
+
+        # One evaluation row per window, dated by the last day it was trained on
+        with profile_stage("persist") as stage:
+            db_mod.write_evaluation(
+                db_mod.get_engine(settings), settings, ml.run_id, result["metrics"], date.fromisoformat(window["end"])
+            )
+            stage.rows = 1
+        record_perf(settings, window["end"])
+        return {"window": window, "rows": result["rows"], "run_id": ml.run_id, "metrics": result["metrics"]}
+
+    @task(trigger_rule="all_done")
+    def cleanup_artifacts() -> Dict[str, Any]:
+        from iris_pipeline.artifacts import cleanup_expired
+
+        # Retention-based GC of previous runs' artifacts; this run's are kept
+        return {"removed_namespaces": cleanup_expired(_settings(), keep=[run_namespace()])}
+
+    planned = plan()
+    # One mapped training task per window; the published model is left to the daily DAG
+    validated = validate_range(planned, ingest_range(planned))
+    trained = train_window.expand(window=windows(planned, validated))
+    trained >> cleanup_artifacts()
+
+
+dag = iris_backfill_dag()
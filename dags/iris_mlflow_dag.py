@@ -1,22 +1,16 @@
 from __future__ import annotations
 
+# Only Airflow and lightweight config are imported at module level: the scheduler
+# re-parses this file often, so numpy/pandas/sklearn/mlflow (via the iris_pipeline
+# task modules) are imported inside the task bodies that need them.
 import os
-import logging
-import tempfile
-from datetime import datetime
-from typing import Dict, Any
+from datetime import date, datetime
+from typing import Dict, Any, List
 
-import numpy as np
-import pandas as pd
 from airflow.decorators import dag, task, task_group
 from airflow.operators.python import get_current_context
 
-from iris_pipeline.config import load_settings_from_env
-from iris_pipeline import ingest as ingest_mod
-from iris_pipeline import train as train_mod
-from iris_pipeline import metrics as metrics_mod
-from iris_pipeline import db as db_mod
-from iris_pipeline.mlflow_utils import build_metrics_logger
+from iris_pipeline.config import Settings, load_settings_from_env
 
 
 @dag(
@@ -28,73 +22,325 @@ from iris_pipeline.mlflow_utils import build_metrics_logger
 )
 def iris_mlflow_training_dag():
 
-    settings = load_settings_from_env()
+    def _settings() -> Settings:
+        # Read at task run time, not at parse time
+        return load_settings_from_env()
+
+    def run_namespace() -> str:
+        from iris_pipeline.artifacts import namespace_for
+
+        ctx = get_current_context()
+        return namespace_for(ctx["dag"].dag_id, ctx["run_id"])
+
+    def record_perf(settings: Settings) -> None:
+        # Stages profiled by this task instance -> perf table; never fails the task
+        from iris_pipeline import perf
+
+        ctx = get_current_context()
+        perf.record_task_perf(settings, ctx, date.fromisoformat(ctx["ds"]))
 
     @task_group(group_id="ingestion")
     def ingestion_group():
         @task()
         def create_iris_table() -> str:
+            from iris_pipeline import db as db_mod
+
+            settings = _settings()
             engine = db_mod.get_engine(settings)
             db_mod.ensure_tables(engine, settings)
             return settings.iris_table
 
         @task()
         def ingest_iris() -> Dict[str, Any]:
+            from iris_pipeline import db as db_mod
+            from iris_pipeline import drift
+            from iris_pipeline import ingest as ingest_mod
+            from iris_pipeline.perf import profile_stage
+
+            settings = _settings()
             ctx = get_current_context()
             ds = ctx.get("ds")
-            df = ingest_mod.load_iris_df(ds)
-            rows = ingest_mod.write_iris(settings, df)
+            with profile_stage("ingest") as stage:
+                # The compact layout keeps class names in a lookup table, not per row
+                labels = not settings.compact_schema
+                if settings.synthetic_rows:
+                    # Load-test mode: generated and written chunk by chunk; drift
+                    # sketches are accumulated from the same chunks on the way
+                    stats: Dict[Any, Any] = {}
+                    chunks = ingest_mod.iter_synthetic_wine(
+                        settings.synthetic_rows, ds, settings.ingest_chunk_rows, labels=labels
+                    )
+                    rows = ingest_mod.write_iris_chunks(
+                        settings, drift.observe(chunks, stats), [date.fromisoformat(ds)]
+                    )
+                else:
+                    df = ingest_mod.load_iris_df(ds, labels=labels)
+                    stats = drift.frame_stats(df)
+                    rows = ingest_mod.write_iris(settings, df)
+                drift.write_stats(db_mod.get_engine(settings), settings, stats)
+                stage.rows = rows
+            record_perf(settings)
             return {"rows_ingested": rows, "table": settings.iris_table}
 
-        _ = create_iris_table()
-        return ingest_iris()
+        @task()
+        def validate_partition(ingested: Dict[str, Any]) -> Dict[str, Any]:
+            from airflow.exceptions import AirflowFailException
+
+            from iris_pipeline import db as db_mod
+            from iris_pipeline import validation
+            from iris_pipeline.perf import profile_stage
+
+            settings = _settings()
+            ctx = get_current_context()
+            # One aggregate query over this run's partition, before anything reads it
+            with profile_stage("validate") as stage:
+                try:
+                    summary = validation.run_validation(
+                        db_mod.get_engine(settings),
+                        settings,
+                        [date.fromisoformat(ctx["ds"])],
+                        dag_run_id=ctx["run_id"],
+                    )
+                except validation.ValidationError as exc:
+                    # Bad data does not get better on retry
+                    raise AirflowFailException(str(exc)) from exc
+                stage.rows = ingested["rows_ingested"]
+            record_perf(settings)
+            if summary["failed"]:
+                print(f"[VALIDATION] failed rules (VALIDATION_MODE=warn): {summary['failed']}", flush=True)
+            return {**ingested, "validation": summary}
+
+        # Skips the training group (and evaluation/publishing) when the new partition
+        # has not drifted from the published model's training window; scoring still runs
+        @task.short_circuit(ignore_downstream_trigger_rules=False)
+        def drift_gate(ingested: Dict[str, Any]) -> Any:
+            from iris_pipeline import db as db_mod
+            from iris_pipeline import drift
+            from iris_pipeline.artifacts import build_artifact_store
+            from iris_pipeline.perf import profile_stage
+
+            settings = _settings()
+            if settings.drift_threshold <= 0:
+                return ingested
+            published = build_artifact_store(settings).resolve("model")
+            if published is None:
+                print("[DRIFT] no published model yet, training", flush=True)
+                return ingested
+            # Reference = the window the published model was trained on, not the days before ds,
+            # so drift that creeps in over skipped runs still adds up
+            trained_through = published[1].get("trained_through")
+            with profile_stage("drift"):
+                report = drift.check_drift(
+                    db_mod.get_engine(settings), settings, get_current_context()["ds"], trained_through
+                )
+            record_perf(settings)
+            if report is None:
+                print("[DRIFT] no reference statistics yet, training", flush=True)
+                return ingested
+            print(
+                f"[DRIFT] max PSI={report['max_psi']:.4f} max KS={report['max_ks']:.4f} "
+                f"({report['rows']} rows vs {report['reference_rows']} reference rows through "
+                f"{report['reference_end']}), threshold={settings.drift_threshold}",
+                flush=True,
+            )
+            if drift.retrain_needed(settings, report) or settings.full_refresh:
+                return {**ingested, "drift": {"max_psi": report["max_psi"], "max_ks": report["max_ks"]}}
+            print("[DRIFT] below threshold, skipping training", flush=True)
+            return False
+
+        ingested = ingest_iris()
+        create_iris_table() >> ingested
+        return drift_gate(validate_partition(ingested))
 
     @task_group(group_id="training")
-    def training_group():
+    def training_group(ingested: Dict[str, Any]):
         @task()
-        def load_data() -> Dict[str, Any]:
-            X, y = train_mod.load_dataset(settings)
-            # write arrays to temp npy files to avoid heavy XCom
-            tmp_dir = tempfile.mkdtemp(prefix="iris_data_")
-            X_path = os.path.join(tmp_dir, "X.npy")
-            y_path = os.path.join(tmp_dir, "y.npy")
-            np.save(X_path, X)
-            np.save(y_path, y)
-            return {"X_path": X_path, "y_path": y_path}
+        def load_data(ingested: Dict[str, Any]) -> Dict[str, Any]:
+            from iris_pipeline import db as db_mod
+            from iris_pipeline import memo
+            from iris_pipeline import train as train_mod
+            from iris_pipeline.artifacts import build_artifact_store
+            from iris_pipeline.perf import profile_stage
+
+            settings = _settings()
+            store = build_artifact_store(settings)
+            sweep = train_mod.expand_search_space(settings)
+            fingerprint = None
+            if settings.result_cache_size:
+                fingerprint = memo.data_fingerprint(db_mod.get_engine(settings), settings)
+                # Unchanged data and settings: every `fit` is served from the memo cache.
+                # (Warm-start keys depend on the base model, known only after loading.)
+                if not settings.warm_start and not settings.full_refresh:
+                    cache = memo.ResultCache(store, settings.result_cache_size)
+                    if all(cache.get(memo.cache_key(fingerprint, settings, c)) for c in sweep):
+                        return {"fingerprint": fingerprint}
+            if all(train_mod.is_incremental(c["model_type"]) for c in sweep):
+                # Out-of-core candidates stream the table themselves in `fit`
+                return {"fingerprint": fingerprint}
+            with profile_stage("load") as stage:
+                # Only new partitions + a replay sample when warm-starting (WARM_START)
+                # hand arrays off through the artifact store to avoid heavy XCom
+                refs = train_mod.stage_training_set(settings, store, run_namespace())
+                stage.rows = refs["y"]["shape"][0]
+            record_perf(settings)
+            return {**refs, "fingerprint": fingerprint}
 
         @task()
-        def fit(payload: Dict[str, Any]) -> Dict[str, Any]:
-            X = np.load(payload["X_path"])  # type: ignore[arg-type]
-            y = np.load(payload["y_path"])  # type: ignore[arg-type]
-            result = train_mod.fit_model(settings, X, y)
+        def candidates() -> List[Dict[str, Any]]:
+            from iris_pipeline import train as train_mod
+
+            settings = _settings()
+            return train_mod.expand_search_space(settings)
+
+        @task()
+        def fit(payload: Dict[str, Any], candidate: Dict[str, Any]) -> Dict[str, Any]:
+            from iris_pipeline import memo
+            from iris_pipeline import train as train_mod
+            from iris_pipeline.artifacts import build_artifact_store
+            from iris_pipeline.perf import profile_stage
+            from iris_pipeline.types import ArtifactRef
+
+            settings = _settings()
+            store = build_artifact_store(settings)
+            base = payload.get("base_model")
+            key = cache = None
+            if payload.get("fingerprint"):
+                key = memo.cache_key(payload["fingerprint"], settings, candidate, base["sha256"] if base else None)
+                cache = memo.ResultCache(store, settings.result_cache_size)
+                hit = None if settings.full_refresh else cache.get(key)
+                if hit is not None:
+                    print(f"[MEMO] data and settings unchanged, reusing cached fit {key[:12]}", flush=True)
+                    return hit["result"]
+
+            if "X" not in payload and not train_mod.is_incremental(candidate["model_type"]):
+                # `load_data` found every fit cached, but this entry was evicted since (e.g. by
+                # a concurrent run): load the arrays here instead
+                with profile_stage("load") as stage:
+                    payload = {**payload, **train_mod.stage_training_set(settings, store, run_namespace())}
+                    stage.rows = payload["y"]["shape"][0]
+            with profile_stage("fit") as stage:
+                if train_mod.is_incremental(candidate["model_type"]):
+                    result = train_mod.fit_incremental(
+                        settings, store=store, namespace=run_namespace(), candidate=candidate
+                    )
+                    stage.rows = result["params"]["train_rows"]
+                else:
+                    # memory-mapped, read-only views shared by all sweep candidates: no reload per fit
+                    X = store.get_array(ArtifactRef(**payload["X"]))
+                    y = store.get_array(ArtifactRef(**payload["y"]))
+                    result = train_mod.fit_model(
+                        settings,
+                        X,
+                        y,
+                        store=store,
+                        namespace=run_namespace(),
+                        candidate=candidate,
+                        base_model_path=store.local_path(ArtifactRef(**base)) if base else None,
+                        # Replayed rows were seen by the base model: keep them out of the holdout
+                        holdout_rows=payload["new_rows"] if payload.get("replay_rows") else None,
+                    )
+                    stage.rows = len(y)
+            if settings.cv_folds >= 2 and not train_mod.is_incremental(candidate["model_type"]):
+                # Folds fitted in parallel processes that memory-map the same .npy files
+                with profile_stage("cv") as stage:
+                    result["cv"] = train_mod.cross_validate(
+                        settings,
+                        store.local_path(ArtifactRef(**payload["X"])),
+                        store.local_path(ArtifactRef(**payload["y"])),
+                        candidate,
+                    )
+                    stage.rows = len(y)
+            record_perf(settings)
+            result["trained_through"] = payload.get("trained_through")
+            if cache is not None:
+                cache.put_result(key, result)
+                result["memo_key"] = key
             return result
 
-        loaded = load_data()
-        return fit(loaded)
+        @task()
+        def select_best(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+            from iris_pipeline import train as train_mod
+
+            return train_mod.select_best(results, _settings().sweep_metric)
+
+        # Taking the ingestion result orders the read after this run's load
+        loaded = load_data(ingested)
+        # One mapped `fit` per candidate (dynamic task mapping), reduced to the best one
+        results = fit.partial(payload=loaded).expand(candidate=candidates())
+        return select_best(results)
 
     @task_group(group_id="evaluation")
     def evaluation_group(train_result: Dict[str, Any]):
         @task()
         def compute(train_result: Dict[str, Any]) -> Dict[str, Any]:
-            y_test = train_result["y_test"]
-            y_pred = train_result["y_pred"]
-            eval_metrics, cm = metrics_mod.compute_metrics(y_test, y_pred)
-
-            # Persist confusion matrix to file for artifact logging
-            tmp_dir = tempfile.mkdtemp(prefix="iris_eval_")
-            cm_path = os.path.join(tmp_dir, "confusion_matrix.csv")
-            pd.DataFrame(cm).to_csv(cm_path, index=False)
-            return {
+            from iris_pipeline import memo
+            from iris_pipeline import metrics as metrics_mod
+            from iris_pipeline.artifacts import build_artifact_store, put_confusion_matrix
+            from iris_pipeline.perf import profile_stage
+            from iris_pipeline.types import ArtifactRef
+
+            settings = _settings()
+            store = build_artifact_store(settings)
+            key = train_result.get("memo_key")
+            cache = memo.ResultCache(store, settings.result_cache_size) if key else None
+            entry = cache.get(key) if cache is not None and not settings.full_refresh else None
+            if entry is not None and entry.get("metrics"):
+                # Same model and holdout as a cached run: same metrics (and MLflow run)
+                return {**entry["metrics"], "cached": True, "mlflow_run_id": entry.get("mlflow_run_id")}
+            with profile_stage("metrics") as stage:
+                y_test = store.get_array(ArtifactRef(**train_result["y_test"]))
+                y_pred = store.get_array(ArtifactRef(**train_result["y_pred"]))
+                eval_metrics, cm = metrics_mod.compute_metrics(y_test, y_pred)
+                cv = train_result.get("cv")
+                # Fold mean/std and intervals from cross-validation, or intervals of the holdout alone
+                if cv:
+                    intervals = {**cv["metrics"], "cv_folds": cv["folds"], "cv_wall_seconds": cv["wall_seconds"]}
+                else:
+                    intervals = metrics_mod.bootstrap_intervals(
+                        cm, settings.bootstrap_samples, settings.ci_level, settings.random_state
+                    )
+                stage.rows = len(y_test)
+            record_perf(settings)
+
+            # Persist confusion matrix to the artifact store for artifact logging
+            cm_path = put_confusion_matrix(store, run_namespace(), cm)
+            eval_result = {
                 "metrics": {
                     "accuracy": eval_metrics.accuracy,
                     "precision_weighted": eval_metrics.precision_weighted,
                     "recall_weighted": eval_metrics.recall_weighted,
+                    "f1_weighted": eval_metrics.f1_weighted,
+                    "precision_macro": eval_metrics.precision_macro,
+                    "recall_macro": eval_metrics.recall_macro,
+                    "f1_macro": eval_metrics.f1_macro,
+                    **intervals,
                 },
                 "confusion_matrix_path": cm_path,
             }
+            if cache is not None:
+                cache.put_metrics(key, eval_result)
+            return eval_result
 
         @task()
         def log_mlflow(train_result: Dict[str, Any], eval_result: Dict[str, Any]) -> Dict[str, Any]:
+            from iris_pipeline import db as db_mod
+            from iris_pipeline import memo, perf
+            from iris_pipeline.artifacts import build_artifact_store
+            from iris_pipeline.mlflow_utils import build_metrics_logger
+
+            settings = _settings()
+            if eval_result.get("cached") and eval_result.get("mlflow_run_id"):
+                # Memoized result already logged: no duplicate MLflow run
+                print(f"[MLFLOW] unchanged result, reusing run_id={eval_result['mlflow_run_id']}", flush=True)
+                return {"run_id": eval_result["mlflow_run_id"], "mlflow_error": None}
+            # Stage costs recorded so far in this run (ingest ... metrics) go along as metrics
+            try:
+                run_perf = perf.load_run_perf(
+                    db_mod.get_engine(settings), settings.perf_table, get_current_context()["run_id"]
+                )
+            except Exception as exc:
+                print(f"[PERF] could not read stage timings: {exc}", flush=True)
+                run_perf = []
             # Emit a preflight log so users know where to look (Airflow task logs, not MLflow container)
             effective_tracking_uri = settings.mlflow_tracking_uri or os.getenv("MLFLOW_TRACKING_URI")
             # Use print to guarantee visibility even if logging handlers are missing in the container
@@ -103,49 +349,111 @@ def iris_mlflow_training_dag():
                 f"experiment={settings.experiment_name}",
                 flush=True,
             )
-            logger = build_metrics_logger(settings)
-            ml = logger.log_all(
-                params=train_result["params"],
-                metrics=eval_result["metrics"],
-                model_path=train_result["model_path"],
-                features=train_result["features"],
-                confusion_matrix_path=eval_result.get("confusion_matrix_path"),
-            )
+            with perf.profile_stage("mlflow"):
+                logger = build_metrics_logger(settings)
+                ml = logger.log_all(
+                    params=train_result["params"],
+                    metrics={
+                        **eval_result["metrics"],
+                        # fit time, solver iterations and convergence of the selected model
+                        **train_result.get("fit_stats", {}),
+                        **perf.perf_metrics(run_perf),
+                    },
+                    model_path=train_result["model_path"],
+                    features=train_result["features"],
+                    confusion_matrix_path=eval_result.get("confusion_matrix_path"),
+                    candidates=train_result.get("candidates"),
+                )
+                # Background uploads must finish before the task process exits
+                upload_errors = logger.flush()
+            record_perf(settings)
+            error = "; ".join(filter(None, [ml.error, *upload_errors])) or None
+            if ml.run_id and not error and train_result.get("memo_key"):
+                cache = memo.ResultCache(build_artifact_store(settings), settings.result_cache_size)
+                cache.put_mlflow_run(train_result["memo_key"], ml.run_id)
             # Post-flight visibility to confirm MLflow outcome in Airflow task logs
-            print(f"[MLFLOW] END logging: run_id={ml.run_id}, error={ml.error}", flush=True)
-            return {"run_id": ml.run_id, "mlflow_error": ml.error}
+            print(f"[MLFLOW] END logging: run_id={ml.run_id}, error={error}", flush=True)
+            return {"run_id": ml.run_id, "mlflow_error": error}
 
         @task()
         def persist(eval_result: Dict[str, Any], mlflow_result: Dict[str, Any]) -> Dict[str, Any]:
-            engine = db_mod.get_engine(settings)
-            db_mod.ensure_tables(engine, settings)
-            ctx = get_current_context()
-            ds = ctx.get("ds")
+            from iris_pipeline import db as db_mod
+            from iris_pipeline.perf import profile_stage
+
+            settings = _settings()
             # Echo the incoming MLflow result to ensure at least one task surfaces it in logs
             print(
                 f"[MLFLOW] Persisting evaluation with run_id={mlflow_result.get('run_id')} "
                 f"error={mlflow_result.get('mlflow_error')}",
                 flush=True,
             )
-            payload = {
-                "run_id": mlflow_result.get("run_id"),
-                "accuracy": eval_result["metrics"]["accuracy"],
-                "precision_weighted": eval_result["metrics"]["precision_weighted"],
-                "recall_weighted": eval_result["metrics"]["recall_weighted"],
-                "execution_date": pd.to_datetime(ds).date(),
-            }
-            pd.DataFrame([payload]).to_sql(settings.eval_table, engine, if_exists="append", index=False)
+            # Tables were created by `ingestion.create_iris_table` earlier in this run
+            with profile_stage("persist") as stage:
+                # cv_folds / interval columns are NULL when not cross-validated / no bootstrap
+                payload = db_mod.write_evaluation(
+                    db_mod.get_engine(settings),
+                    settings,
+                    mlflow_result.get("run_id"),
+                    eval_result["metrics"],
+                    date.fromisoformat(get_current_context()["ds"]),
+                )
+                stage.rows = 1
+            record_perf(settings)
             return payload
 
         eval_result = compute(train_result)
         mlflow_result = log_mlflow(train_result, eval_result)
         return persist(eval_result, mlflow_result)
 
-    ing = ingestion_group()
-    tr = training_group()
-    # Ensure ingestion (table creation + data load) completes before training reads from the table
-    ing >> tr
-    _ = evaluation_group(tr)
+    @task_group(group_id="scoring")
+    def scoring_group(train_result: Dict[str, Any], persisted: Dict[str, Any]):
+        @task()
+        def publish_model(train_result: Dict[str, Any], persisted: Dict[str, Any]) -> Dict[str, Any]:
+            from dataclasses import asdict
+
+            from iris_pipeline.artifacts import build_artifact_store
+            from iris_pipeline.types import ArtifactRef
+
+            settings = _settings()
+            # Pin the evaluated (and persisted) model as the latest one for scoring/serving
+            store = build_artifact_store(settings)
+            ref = store.publish(
+                "model",
+                ArtifactRef(**train_result["model_ref"]),
+                metadata={
+                    "params": train_result["params"],
+                    "features": train_result["features"],
+                    "mlflow_run_id": persisted.get("run_id"),
+                    # latest ingestion_date seen in training; the next warm start begins after it
+                    "trained_through": train_result.get("trained_through"),
+                    "run": run_namespace(),
+                },
+            )
+            return asdict(ref)
+
+        # Also runs when the drift gate skipped training: new rows are scored with the
+        # model published earlier
+        @task(trigger_rule="none_failed")
+        def score_partitions(published: Dict[str, Any]) -> Dict[str, Any]:
+            from iris_pipeline import scoring as scoring_mod
+
+            return scoring_mod.score_new_partitions(_settings())
+
+        return score_partitions(publish_model(train_result, persisted))
+
+    @task(trigger_rule="all_done")
+    def cleanup_artifacts() -> Dict[str, Any]:
+        from iris_pipeline.artifacts import cleanup_expired
+
+        # Retention-based GC of previous runs' artifacts; this run's are kept
+        return {"removed_namespaces": cleanup_expired(_settings(), keep=[run_namespace()])}
+
+    # Training takes the ingestion (drift gate) result, so it reads from the table only after the load
+    tr = training_group(ingestion_group())
+    ev = evaluation_group(tr)
+    # Only models that went through evaluation are published and used for scoring
+    sc = scoring_group(tr, ev)
+    sc >> cleanup_artifacts()
 
 
 dag = iris_mlflow_training_dag()
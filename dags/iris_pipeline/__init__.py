@@ -2,11 +2,21 @@
 
 Modules:
 - config: runtime configuration via environment variables
+- features: feature column names (lightweight, safe to import at DAG parse time)
 - db: database helpers (Postgres engine + ensure tables)
 - schemas: DDL definitions
 - ingest: dataset loading/transformation and persistence
 - train: model training and data loading utilities
 - metrics: evaluation metrics computations
+- scoring: batch scoring of new partitions with the latest published model
+- serving: online prediction server with model hot swap and micro-batching
 - mlflow_utils: pluggable metrics/artifacts logger (MLflow / NoOp)
 - types: typed DTOs for XCom-safe payloads
+- artifacts: content-addressed artifact store for task hand-offs
+- perf: per-stage profiler and task_perf records
+- memo: data fingerprint + LRU cache of training results
+- backfill: date-range ingestion and per-window training for backfills
+- drift: per-partition feature statistics and drift scores gating retraining
+- validation: declarative data-quality rules pushed down to the database
+- dataset_cache: local per-partition cache for incremental dataset loading
 """
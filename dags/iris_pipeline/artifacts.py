@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from dataclasses import asdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .config import Settings
+from .types import ArtifactRef
+
+
+_CHUNK_BYTES = 1 << 20
+
+# Namespace holding published artifacts (e.g. the latest model); never garbage-collected
+PUBLISHED_NAMESPACE = "_published"
+# Namespace of memoized training results (see memo.py); evicted by its own LRU policy
+MEMO_NAMESPACE = "_memo"
+_RESERVED_NAMESPACES = frozenset({PUBLISHED_NAMESPACE, MEMO_NAMESPACE})
+
+
+def namespace_for(dag_id: str, run_id: str) -> str:
+    """Filesystem-safe namespace for one DAG run."""
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", f"{dag_id}__{run_id}")
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(_CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    """Content-addressed store for artifacts handed off between tasks.
+
+    Artifacts live under a namespace (one per DAG run) and are addressed by the
+    SHA-256 of their content, so identical content is stored once per namespace.
+    """
+
+    def put_array(self, namespace: str, name: str, arr: np.ndarray) -> ArtifactRef:
+        raise NotImplementedError
+
+    def get_array(self, ref: ArtifactRef, mmap: bool = True) -> np.ndarray:
+        raise NotImplementedError
+
+    def put_file(self, namespace: str, name: str, src_path: str, move: bool = False) -> ArtifactRef:
+        raise NotImplementedError
+
+    def local_path(self, ref: ArtifactRef) -> str:
+        raise NotImplementedError
+
+    def delete(self, ref: ArtifactRef) -> None:
+        raise NotImplementedError
+
+    def put_json(self, namespace: str, name: str, payload: Dict[str, Any]) -> None:
+        """Write (or atomically replace) a small JSON document `name` in `namespace`."""
+        raise NotImplementedError
+
+    def get_json(self, namespace: str, name: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def list_json(self, namespace: str) -> List[str]:
+        raise NotImplementedError
+
+    def delete_json(self, namespace: str, name: str) -> None:
+        raise NotImplementedError
+
+    def gc(self, retention_seconds: float, keep: Iterable[str] = ()) -> List[str]:
+        raise NotImplementedError
+
+    def publish(self, name: str, ref: ArtifactRef, metadata: Optional[Dict[str, Any]] = None) -> ArtifactRef:
+        """Pin `ref` as the current version of `name`, outside any run namespace."""
+        raise NotImplementedError
+
+    def resolve(self, name: str) -> Optional[Tuple[ArtifactRef, Dict[str, Any]]]:
+        """Return the currently published `(ref, metadata)` for `name`, if any."""
+        raise NotImplementedError
+
+
+class LocalArtifactStore(ArtifactStore):
+    """Artifact store on a local (or shared, e.g. NFS) directory.
+
+    Layout: `<root>/<namespace>/<name>-<sha256[:16]><ext>`. Arrays are `.npy` files and
+    are read back with `np.load(mmap_mode="r")`, so hand-offs do not copy the data.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    def _target(self, namespace: str, name: str, digest: str, ext: str) -> str:
+        return os.path.join(namespace, f"{name}-{digest[:16]}{ext}")
+
+    def _scratch(self, suffix: str) -> str:
+        scratch_dir = os.path.join(self.root, ".tmp")
+        os.makedirs(scratch_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=scratch_dir)
+        os.close(fd)
+        return path
+
+    def _commit(self, namespace: str, name: str, path: str, ext: str, **extra) -> ArtifactRef:
+        digest = _file_sha256(path)
+        key = self._target(namespace, name, digest, ext)
+        dest = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        if os.path.exists(dest):
+            os.remove(path)
+        else:
+            shutil.move(path, dest)
+        return ArtifactRef(key=key, uri=dest, sha256=digest, size_bytes=os.path.getsize(dest), **extra)
+
+    def put_array(self, namespace: str, name: str, arr: np.ndarray) -> ArtifactRef:
+        arr = np.ascontiguousarray(arr)
+        path = self._scratch(".npy")
+        np.save(path, arr, allow_pickle=False)
+        return self._commit(namespace, name, path, ".npy", shape=tuple(arr.shape), dtype=str(arr.dtype))
+
+    def get_array(self, ref: ArtifactRef, mmap: bool = True) -> np.ndarray:
+        return np.load(self.local_path(ref), mmap_mode="r" if mmap else None, allow_pickle=False)
+
+    def put_file(self, namespace: str, name: str, src_path: str, move: bool = False) -> ArtifactRef:
+        ext = os.path.splitext(src_path)[1]
+        path = self._scratch(ext)
+        (shutil.move if move else shutil.copyfile)(src_path, path)
+        return self._commit(namespace, name, path, ext)
+
+    def local_path(self, ref: ArtifactRef) -> str:
+        return os.path.join(self.root, ref.key)
+
+    def delete(self, ref: ArtifactRef) -> None:
+        try:
+            os.remove(self.local_path(ref))
+        except FileNotFoundError:
+            pass
+
+    def _json_path(self, namespace: str, name: str) -> str:
+        return os.path.join(self.root, namespace, f"{name}.json")
+
+    def put_json(self, namespace: str, name: str, payload: Dict[str, Any]) -> None:
+        path = self._json_path(namespace, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = self._scratch(".json")
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(payload, fh)
+        os.replace(tmp_path, path)
+
+    def get_json(self, namespace: str, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._json_path(namespace, name), "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def list_json(self, namespace: str) -> List[str]:
+        directory = os.path.join(self.root, namespace)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(e.name[: -len(".json")] for e in os.scandir(directory) if e.name.endswith(".json"))
+
+    def delete_json(self, namespace: str, name: str) -> None:
+        try:
+            os.remove(self._json_path(namespace, name))
+        except FileNotFoundError:
+            pass
+
+    def gc(self, retention_seconds: float, keep: Iterable[str] = ()) -> List[str]:
+        """Delete namespaces not modified within `retention_seconds`; returns them."""
+        if not os.path.isdir(self.root):
+            return []
+        cutoff = time.time() - retention_seconds
+        keep = set(keep)
+        removed: List[str] = []
+        # The scratch directory is collected like a namespace once it has gone stale
+        for entry in os.scandir(self.root):
+            if not entry.is_dir() or entry.name in keep or entry.name in _RESERVED_NAMESPACES:
+                continue
+            if entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed.append(entry.name)
+        return removed
+
+    def _pointer_path(self, name: str) -> str:
+        return os.path.join(self.root, PUBLISHED_NAMESPACE, f"{name}.json")
+
+    def publish(self, name: str, ref: ArtifactRef, metadata: Optional[Dict[str, Any]] = None) -> ArtifactRef:
+        """Copy `ref` into the published namespace and atomically repoint `name` to it.
+
+        The previously published version is kept (readers may still be loading it);
+        older ones are removed.
+        """
+        pinned = self.put_file(PUBLISHED_NAMESPACE, name, self.local_path(ref))
+        current = self.resolve(name)
+        keep = {pinned.key} | ({current[0].key} if current else set())
+        pointer = {"ref": asdict(pinned), "metadata": metadata or {}, "published_at": time.time()}
+        tmp_path = self._pointer_path(name) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(pointer, fh)
+        os.replace(tmp_path, self._pointer_path(name))
+
+        published_dir = os.path.join(self.root, PUBLISHED_NAMESPACE)
+        for entry in os.scandir(published_dir):
+            key = os.path.join(PUBLISHED_NAMESPACE, entry.name)
+            if entry.name.startswith(f"{name}-") and key not in keep:
+                os.remove(entry.path)
+        return pinned
+
+    def resolve(self, name: str) -> Optional[Tuple[ArtifactRef, Dict[str, Any]]]:
+        try:
+            with open(self._pointer_path(name), "r", encoding="utf-8") as fh:
+                pointer = json.load(fh)
+        except FileNotFoundError:
+            return None
+        return ArtifactRef(**pointer["ref"]), pointer["metadata"]
+
+
+# Extension point for object stores: map a URI scheme to a store factory
+_STORE_FACTORIES: Dict[str, Callable[[str], ArtifactStore]] = {
+    "file": lambda uri: LocalArtifactStore(uri[len("file://") :] if uri.startswith("file://") else uri),
+}
+
+
+def register_artifact_store(scheme: str, factory: Callable[[str], ArtifactStore]) -> None:
+    _STORE_FACTORIES[scheme] = factory
+
+
+def build_artifact_store(settings: Settings, root: Optional[str] = None) -> ArtifactStore:
+    uri = root or settings.artifact_root
+    scheme = uri.split("://", 1)[0] if "://" in uri else "file"
+    if scheme not in _STORE_FACTORIES:
+        raise ValueError(f"No artifact store registered for scheme '{scheme}' (ARTIFACT_ROOT={uri})")
+    return _STORE_FACTORIES[scheme](uri)
+
+
+def put_confusion_matrix(store: ArtifactStore, namespace: str, matrix: Any) -> str:
+    """Store a confusion matrix as CSV (header = class indices) and return its local path."""
+    matrix = np.asarray(matrix)
+    tmp_dir = tempfile.mkdtemp(prefix="iris_eval_")
+    try:
+        tmp_path = os.path.join(tmp_dir, "confusion_matrix.csv")
+        header = ",".join(str(i) for i in range(matrix.shape[1]))
+        np.savetxt(tmp_path, matrix, fmt="%d", delimiter=",", header=header, comments="")
+        return store.local_path(store.put_file(namespace, "confusion_matrix", tmp_path, move=True))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def cleanup_expired(settings: Settings, keep: Iterable[str] = ()) -> List[str]:
+    """Retention-based GC of previous runs' namespaces (`settings.artifact_retention_hours`).
+
+    `keep` (e.g. the current run's namespace) is never removed; returns the removed ones.
+    """
+    return build_artifact_store(settings).gc(settings.artifact_retention_hours * 3600, keep=keep)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, Any, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .artifacts import ArtifactStore
+from .config import Settings
+from .db import ensure_tables, get_engine
+from .drift import FeatureStats, observe, write_stats
+from .ingest import iter_synthetic_wine, load_iris_df, write_iris_chunks
+from .metrics import bootstrap_intervals, compute_metrics
+from .train import expand_search_space, fit_model, read_arrays, select_best
+from .types import ArtifactRef
+
+
+# Training windows of a backfill: one over the whole range, or one per calendar period
+GRANULARITIES = {"all": None, "month": "M", "week": "W", "day": "D"}
+
+
+def backfill_days(start: str, end: str) -> List[date]:
+    """Every day from `start` to `end` (inclusive)."""
+    first, last = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    if last < first:
+        raise ValueError(f"Backfill end {last:%Y-%m-%d} is before its start {first:%Y-%m-%d}")
+    return [d.date() for d in pd.date_range(first, last, freq="D")]
+
+
+def backfill_windows(days: List[date], granularity: str = "all") -> List[Dict[str, str]]:
+    """Split `days` into training windows of `granularity` (see `GRANULARITIES`).
+
+    Windows are clipped to the backfilled range; each one is trained on every row
+    ingested up to and including its `end` day.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unsupported granularity: {granularity!r} (choose from {', '.join(GRANULARITIES)})")
+    if not days:
+        return []
+    index = pd.DatetimeIndex(sorted(days))
+    freq = GRANULARITIES[granularity]
+    groups = [index] if freq is None else [index[index.to_period(freq) == p] for p in index.to_period(freq).unique()]
+    return [{"start": f"{g[0]:%Y-%m-%d}", "end": f"{g[-1]:%Y-%m-%d}"} for g in groups]
+
+
+def iter_backfill_frames(settings: Settings, days: List[date]) -> Iterator[pd.DataFrame]:
+    """Rows of every day in `days`, batched into frames of about `settings.ingest_chunk_rows`.
+
+    Days hold the same rows a daily run would ingest for them (the wine dataset, or
+    `settings.synthetic_rows` synthetic rows seeded by the day). Small days are
+    combined, so the number of bulk-load calls follows the row count, not the day count.
+    """
+    labels = not settings.compact_schema
+    base = None if settings.synthetic_rows else load_iris_df(labels=labels)
+    pending: List[pd.DataFrame] = []
+    buffered = 0
+    for day in days:
+        ds = f"{day:%Y-%m-%d}"
+        if base is not None:
+            frames = iter([base.assign(ingestion_date=pd.Timestamp(ds))])
+        else:
+            frames = iter_synthetic_wine(settings.synthetic_rows, ds, settings.ingest_chunk_rows, labels=labels)
+        for df in frames:
+            pending.append(df)
+            buffered += len(df)
+            if buffered >= settings.ingest_chunk_rows:
+                yield pd.concat(pending, ignore_index=True)
+                pending, buffered = [], 0
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
+
+
+def ingest_range(settings: Settings, days: List[date]) -> int:
+    """Create the tables once and replace all `days` partitions in a single transaction.
+
+    Drift sketches of every day are computed from the same frames and written after.
+    """
+    engine = get_engine(settings)
+    ensure_tables(engine, settings)
+    stats: Dict[date, FeatureStats] = {}
+    rows = write_iris_chunks(settings, observe(iter_backfill_frames(settings, days), stats), days)
+    write_stats(engine, settings, stats)
+    return rows
+
+
+def load_window(settings: Settings, end: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Features and labels of every row ingested up to and including `end`."""
+    hi = pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+    return read_arrays(get_engine(settings), settings, " WHERE ingestion_date < :hi", {"hi": f"{hi:%Y-%m-%d}"})
+
+
+def train_window(settings: Settings, window: Dict[str, str], store: ArtifactStore, namespace: str) -> Dict[str, Any]:
+    """Run the sweep on one window's data and evaluate the best candidate.
+
+    Every candidate is fitted in memory (`train.fit_model`), incremental ones included,
+    since the window is a bounded slice of the table. Returns the selected `fit` result
+    with the window, its row count and the holdout `metrics` (with bootstrap intervals) /
+    confusion matrix added.
+    """
+    X, y = load_window(settings, window["end"])
+    results = [
+        fit_model(settings, X, y, store=store, namespace=namespace, candidate=candidate)
+        for candidate in expand_search_space(settings)
+    ]
+    best = select_best(results, settings.sweep_metric)
+    y_test = store.get_array(ArtifactRef(**best["y_test"]))
+    y_pred = store.get_array(ArtifactRef(**best["y_pred"]))
+    eval_metrics, cm = compute_metrics(y_test, y_pred)
+    return {
+        **best,
+        "window": window,
+        "rows": int(len(y)),
+        "trained_through": window["end"],
+        "metrics": {
+            "accuracy": eval_metrics.accuracy,
+            "precision_weighted": eval_metrics.precision_weighted,
+            "recall_weighted": eval_metrics.recall_weighted,
+            "f1_weighted": eval_metrics.f1_weighted,
+            "precision_macro": eval_metrics.precision_macro,
+            "recall_macro": eval_metrics.recall_macro,
+            "f1_macro": eval_metrics.f1_macro,
+            **bootstrap_intervals(cm, settings.bootstrap_samples, settings.ci_level, settings.random_state),
+        },
+        "confusion_matrix": cm.tolist(),
+    }
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+import tempfile
 from dataclasses import dataclass
 
 
@@ -9,18 +10,111 @@ class Settings:
     # Airflow connection id for PostgresHook
     postgres_conn_id: str = "postgres_default"
 
+    # SQLAlchemy connection pool of the cached per-process engine
+    db_pool_size: int = 5
+    db_pool_pre_ping: bool = True
+    db_pool_recycle: int = 1800  # seconds
+
     # Tables
     iris_table: str = "wine_data"
     eval_table: str = "wine_evaluation"
+    predictions_table: str = "wine_predictions"
+    perf_table: str = "wine_task_perf"  # per-stage timings (see perf.py)
+    stats_table: str = "wine_feature_stats"  # per-partition drift sketches (see drift.py)
+    validation_table: str = "wine_validation"  # per-partition rule results (see validation.py)
+    # Range-partition the feature table by ingestion_date (new tables only)
+    partitioned_tables: bool = False
+    # Compact feature table (new tables only): `smallint` target with class names in
+    # `labels_table` instead of a `target_name` per row; `real` (float4) features
+    compact_schema: bool = False
+    labels_table: str = "wine_labels"
+    real_features: bool = False
 
     # ML/experiment
     experiment_name: str = "WineClassifier"
-    model_type: str = "logreg"  # or "rf"
+    model_type: str = "logreg"  # or "rf"; "sgd"/"nb" train out of core
     test_size: float = 0.2
     random_state: int = 42
+    n_jobs: int = -1  # RandomForest cores per fit (also LogisticRegression one-vs-rest fits)
+    incremental_epochs: int = 1  # partial_fit passes for the "sgd"/"nb" model types
+    # LogisticRegression: feature scaler fitted in the same Pipeline ("standard",
+    # "minmax", "robust" or "none"), solver and stopping criteria
+    scaler: str = "standard"
+    logreg_solver: str = "lbfgs"
+    logreg_tol: float = 1e-4
+    logreg_max_iter: int = 400
+
+    # Warm-start retraining from the published model: train on partitions newer than
+    # the ones it was trained through plus a replay sample of about `replay_rows`
+    # older rows; RandomForest replaces its `warm_start_trees` oldest trees
+    warm_start: bool = False
+    replay_rows: int = 50_000
+    warm_start_trees: int = 20
+
+    # Batch scoring: worker processes (0 = all cores) and rows per predict chunk
+    scoring_workers: int = 0
+    scoring_chunk_rows: int = 100_000
+
+    # Online prediction server (see serving.py): requests arriving together are
+    # coalesced into one predict call of up to `serving_max_batch` rows, waiting at
+    # most `serving_max_wait_ms` for more; the published model is re-checked every
+    # `serving_refresh_seconds`; request bodies over `serving_max_body_bytes` get a 413
+    serving_host: str = "127.0.0.1"
+    serving_port: int = 8000
+    serving_max_batch: int = 256
+    serving_max_wait_ms: float = 1.0
+    serving_refresh_seconds: float = 5.0
+    serving_max_body_bytes: int = 1 << 20
+
+    # Hyperparameter sweep: JSON {model_type: {param: [values]}}; unset = single fit
+    search_space: str | None = None
+    sweep_metric: str = "accuracy"  # any of metrics.SWEEP_METRICS
+
+    # Evaluation: `cv_folds` >= 2 adds stratified k-fold cross-validation of each
+    # candidate, folds fitted in `cv_workers` processes (0 = one per fold, up to the
+    # cores); percentile bootstrap intervals at `ci_level` from `bootstrap_samples`
+    # resamples (0 disables them)
+    cv_folds: int = 0
+    cv_workers: int = 0
+    bootstrap_samples: int = 1000
+    ci_level: float = 0.95
+
+    # Artifact store shared by the tasks of a DAG run (local/shared directory or URI)
+    artifact_root: str = os.path.join(tempfile.gettempdir(), "wine_artifacts")
+    artifact_retention_hours: float = 72.0
 
     # Optional MLflow tracking URI
     mlflow_tracking_uri: str | None = None
+    # Opt-in batched tracking calls + background artifact uploads (see
+    # BatchedMLflowMetricsLogger); the model goes up as the raw file, without the sklearn flavor
+    mlflow_async_logging: bool = False
+    mlflow_upload_workers: int = 4
+    mlflow_max_retries: int = 3
+
+    # Dataset loading: rows per server-side cursor fetch and in-memory feature dtype
+    load_chunk_rows: int = 50_000
+    feature_dtype: str = "float64"  # or "float32" to halve memory
+
+    # Synthetic ingestion for load tests: rows generated per `ds` (0 = real 178-row
+    # dataset), written in chunks of `ingest_chunk_rows`
+    synthetic_rows: int = 0
+    ingest_chunk_rows: int = 100_000
+
+    # Data validation after ingestion: "fail" stops the run before training, "warn"
+    # only records the results, "off" skips the checks
+    validation_mode: str = "fail"
+
+    # Drift gate: training is skipped when no feature's PSI between the new partition
+    # and the `drift_reference_days` before it reaches `drift_threshold` (0 = always train)
+    drift_threshold: float = 0.0
+    drift_reference_days: int = 28
+
+    # Memoized training results keyed by data fingerprint + settings (0 disables)
+    result_cache_size: int = 16
+
+    # Incremental dataset loading: local per-partition cache (disabled when unset)
+    dataset_cache_dir: str | None = None
+    full_refresh: bool = False
 
 
 def _get_env(name: str, default: str | None = None) -> str | None:
@@ -28,14 +122,70 @@ def _get_env(name: str, default: str | None = None) -> str | None:
     return val if val not in (None, "") else default
 
 
+def _get_bool(name: str, default: bool = False) -> bool:
+    val = _get_env(name)
+    if val is None:
+        return default
+    return val.strip().lower() in ("1", "true", "yes", "on")
+
+
 def load_settings_from_env() -> Settings:
     return Settings(
         postgres_conn_id=_get_env("POSTGRES_CONN_ID", "postgres_default"),
+        db_pool_size=int(_get_env("DB_POOL_SIZE", "5")),
+        db_pool_pre_ping=_get_bool("DB_POOL_PRE_PING", True),
+        db_pool_recycle=int(_get_env("DB_POOL_RECYCLE", "1800")),
         iris_table=_get_env("IRIS_TABLE", "iris_data"),
         eval_table=_get_env("EVAL_TABLE", "iris_evaluation"),
+        predictions_table=_get_env("PREDICTIONS_TABLE", "iris_predictions"),
+        perf_table=_get_env("PERF_TABLE", "iris_task_perf"),
+        stats_table=_get_env("STATS_TABLE", "iris_feature_stats"),
+        validation_table=_get_env("VALIDATION_TABLE", "iris_validation"),
+        partitioned_tables=_get_bool("PARTITIONED_TABLES"),
+        compact_schema=_get_bool("COMPACT_SCHEMA"),
+        labels_table=_get_env("LABELS_TABLE", "iris_labels"),
+        real_features=_get_bool("REAL_FEATURES"),
         experiment_name=_get_env("EXPERIMENT_NAME", "IrisClassifier"),
         model_type=_get_env("MODEL_TYPE", "logreg"),
         test_size=float(_get_env("TEST_SIZE", "0.2")),
         random_state=int(_get_env("RANDOM_STATE", "42")),
+        n_jobs=int(_get_env("N_JOBS", "-1")),
+        incremental_epochs=int(_get_env("INCREMENTAL_EPOCHS", "1")),
+        scaler=_get_env("SCALER", "standard"),
+        logreg_solver=_get_env("LOGREG_SOLVER", "lbfgs"),
+        logreg_tol=float(_get_env("LOGREG_TOL", "1e-4")),
+        logreg_max_iter=int(_get_env("LOGREG_MAX_ITER", "400")),
+        warm_start=_get_bool("WARM_START"),
+        replay_rows=int(_get_env("REPLAY_ROWS", "50000")),
+        warm_start_trees=int(_get_env("WARM_START_TREES", "20")),
+        scoring_workers=int(_get_env("SCORING_WORKERS", "0")),
+        scoring_chunk_rows=int(_get_env("SCORING_CHUNK_ROWS", "100000")),
+        serving_host=_get_env("SERVING_HOST", "127.0.0.1"),
+        serving_port=int(_get_env("SERVING_PORT", "8000")),
+        serving_max_batch=int(_get_env("SERVING_MAX_BATCH", "256")),
+        serving_max_wait_ms=float(_get_env("SERVING_MAX_WAIT_MS", "1")),
+        serving_refresh_seconds=float(_get_env("SERVING_REFRESH_SECONDS", "5")),
+        serving_max_body_bytes=int(_get_env("SERVING_MAX_BODY_BYTES", "1048576")),
+        search_space=_get_env("SEARCH_SPACE"),
+        sweep_metric=_get_env("SWEEP_METRIC", "accuracy"),
+        cv_folds=int(_get_env("CV_FOLDS", "0")),
+        cv_workers=int(_get_env("CV_WORKERS", "0")),
+        bootstrap_samples=int(_get_env("BOOTSTRAP_SAMPLES", "1000")),
+        ci_level=float(_get_env("CI_LEVEL", "0.95")),
         mlflow_tracking_uri=_get_env("MLFLOW_TRACKING_URI"),
+        mlflow_async_logging=_get_bool("MLFLOW_ASYNC_LOGGING"),
+        mlflow_upload_workers=int(_get_env("MLFLOW_UPLOAD_WORKERS", "4")),
+        mlflow_max_retries=int(_get_env("MLFLOW_MAX_RETRIES", "3")),
+        artifact_root=_get_env("ARTIFACT_ROOT", os.path.join(tempfile.gettempdir(), "wine_artifacts")),
+        artifact_retention_hours=float(_get_env("ARTIFACT_RETENTION_HOURS", "72")),
+        load_chunk_rows=int(_get_env("LOAD_CHUNK_ROWS", "50000")),
+        feature_dtype=_get_env("FEATURE_DTYPE", "float64"),
+        synthetic_rows=int(float(_get_env("SYNTHETIC_ROWS", "0"))),
+        ingest_chunk_rows=int(_get_env("INGEST_CHUNK_ROWS", "100000")),
+        validation_mode=_get_env("VALIDATION_MODE", "fail"),
+        drift_threshold=float(_get_env("DRIFT_THRESHOLD", "0")),
+        drift_reference_days=int(_get_env("DRIFT_REFERENCE_DAYS", "28")),
+        result_cache_size=int(_get_env("RESULT_CACHE_SIZE", "16")),
+        dataset_cache_dir=_get_env("DATASET_CACHE_DIR"),
+        full_refresh=_get_bool("FULL_REFRESH"),
     )
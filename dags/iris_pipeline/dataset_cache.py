@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+
+# Partition key used for rows ingested without an `ingestion_date`
+UNDATED = "undated"
+
+
+class PartitionCache:
+    """Local columnar cache of the feature table, one `.npz` file per `ingestion_date`.
+
+    A small JSON manifest records the cached partitions and the watermark (the most
+    recent `ingestion_date` loaded), so the next load only needs to fetch partitions
+    at or after the watermark from the database.
+    """
+
+    MANIFEST = "manifest.json"
+
+    def __init__(self, root: str, table: str) -> None:
+        self.path = os.path.join(root, table)
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.path, self.MANIFEST)
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self._manifest_path(), "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return {"watermark": None, "partitions": {}}
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        tmp_path = self._manifest_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._manifest_path())
+
+    def watermark(self) -> Optional[str]:
+        return self._read_manifest()["watermark"]
+
+    def partitions(self) -> List[str]:
+        return sorted(self._read_manifest()["partitions"])
+
+    def write_partition(self, ingestion_date: str, X: np.ndarray, y: np.ndarray) -> None:
+        """Store (or replace) one partition and advance the watermark."""
+        os.makedirs(self.path, exist_ok=True)
+        file_name = f"{ingestion_date}.npz"
+        tmp_path = os.path.join(self.path, f".{file_name}.tmp")
+        with open(tmp_path, "wb") as fh:
+            np.savez(fh, X=X, y=y)
+        os.replace(tmp_path, os.path.join(self.path, file_name))
+
+        manifest = self._read_manifest()
+        manifest["partitions"][ingestion_date] = {"file": file_name, "rows": int(len(y))}
+        if ingestion_date != UNDATED and (manifest["watermark"] is None or ingestion_date > manifest["watermark"]):
+            manifest["watermark"] = ingestion_date
+        self._write_manifest(manifest)
+
+    def load(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Concatenate all cached partitions (ordered by date) into `X`, `y`."""
+        manifest = self._read_manifest()
+        X_parts, y_parts = [], []
+        for key in sorted(manifest["partitions"]):
+            with np.load(os.path.join(self.path, manifest["partitions"][key]["file"])) as npz:
+                X_parts.append(npz["X"])
+                y_parts.append(npz["y"])
+        if not X_parts:
+            return np.empty((0, 0)), np.empty((0,))
+        return np.concatenate(X_parts), np.concatenate(y_parts)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
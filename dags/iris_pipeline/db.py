@@ -1,23 +1,327 @@
 from __future__ import annotations
 
-from typing import Any
+import io
+import itertools
+import os
+import threading
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
 from sqlalchemy.engine import Engine
 
 from airflow.providers.postgres.hooks.postgres import PostgresHook
 
 from . import schemas
 from .config import Settings
+from .metrics import INTERVAL_COLUMNS
+
+
+# Process-wide registries: one engine (and pool) per connection id, and the set of
+# (database, tables, layout) whose DDL already ran in this process.
+_ENGINES: Dict[str, Engine] = {}
+_ENSURED: Set[Tuple[str, ...]] = set()
+_LOCK = threading.Lock()
+# Names of server-side cursors (unique per connection)
+_CURSOR_IDS = itertools.count()
+
+
+def _forget_engines_after_fork() -> None:
+    # Pooled connections must not be shared with a forked child; let it build its own.
+    # `dispose(close=False)` drops the inherited pools without closing (or letting GC
+    # close) the parent's sockets. The lock may have been held by another thread at
+    # fork time, so the child gets a fresh one.
+    global _LOCK
+    _LOCK = threading.Lock()
+    for engine in _ENGINES.values():
+        engine.dispose(close=False)
+    _ENGINES.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_engines_after_fork)
 
 
 def get_engine(settings: Settings) -> Engine:
-    """Return a SQLAlchemy engine from the Airflow Postgres connection."""
-    hook = PostgresHook(postgres_conn_id=settings.postgres_conn_id)
-    return hook.get_sqlalchemy_engine()  # type: ignore[return-value]
+    """Return the cached SQLAlchemy engine for the Airflow Postgres connection.
+
+    The engine is created once per process and connection id, with the pool settings
+    from `settings`.
+    """
+    engine = _ENGINES.get(settings.postgres_conn_id)
+    if engine is None:
+        with _LOCK:
+            engine = _ENGINES.get(settings.postgres_conn_id)
+            if engine is None:
+                hook = PostgresHook(postgres_conn_id=settings.postgres_conn_id)
+                engine = hook.get_sqlalchemy_engine(  # type: ignore[assignment]
+                    engine_kwargs={
+                        "pool_size": settings.db_pool_size,
+                        "pool_pre_ping": settings.db_pool_pre_ping,
+                        "pool_recycle": settings.db_pool_recycle,
+                    }
+                )
+                _ENGINES[settings.postgres_conn_id] = engine
+    return engine  # type: ignore[return-value]
+
+
+def register_engine(settings: Settings, engine: Engine) -> None:
+    """Use `engine` for `settings.postgres_conn_id` (e.g. a local stand-in database)."""
+    with _LOCK:
+        _ENGINES[settings.postgres_conn_id] = engine
+
+
+def dispose_engines() -> None:
+    """Dispose and forget all cached engines and schema memos."""
+    with _LOCK:
+        for engine in _ENGINES.values():
+            engine.dispose()
+        _ENGINES.clear()
+        _ENSURED.clear()
 
 
 def ensure_tables(engine: Engine, settings: Settings) -> None:
-    """Create required tables if they do not exist (idempotent)."""
+    """Create required tables and indexes if they do not exist (idempotent, once per process)."""
+    key = (
+        str(engine.url),
+        settings.iris_table,
+        settings.eval_table,
+        settings.predictions_table,
+        settings.perf_table,
+        settings.stats_table,
+        settings.validation_table,
+        settings.labels_table if settings.compact_schema else "",
+        # Layout of the feature table: a settings object with another layout must still run its DDL
+        "partitioned" if settings.partitioned_tables else "",
+        "real" if settings.real_features else "",
+    )
+    if key in _ENSURED:
+        return
+    postgres = engine.dialect.name == "postgresql"
+    partitioned = settings.partitioned_tables and postgres
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                schemas.create_iris_table_sql(
+                    settings.iris_table,
+                    partitioned=partitioned,
+                    compact=settings.compact_schema,
+                    real_features=settings.real_features,
+                )
+            )
+        )
+        if settings.compact_schema:
+            conn.execute(text(schemas.create_labels_table_sql(settings.labels_table)))
+        conn.execute(text(schemas.create_eval_table_sql(settings.eval_table)))
+        conn.execute(text(schemas.create_predictions_table_sql(settings.predictions_table)))
+        conn.execute(text(schemas.create_perf_table_sql(settings.perf_table)))
+        conn.execute(text(schemas.create_stats_table_sql(settings.stats_table)))
+        conn.execute(text(schemas.create_validation_table_sql(settings.validation_table)))
+        if partitioned:
+            conn.execute(text(schemas.create_iris_default_partition_sql(settings.iris_table)))
+        if postgres:
+            # Tables created before the row key existed
+            conn.execute(text(schemas.add_iris_row_id_sql(settings.iris_table)))
+            for stmt in schemas.add_eval_interval_columns_sql(settings.eval_table):
+                conn.execute(text(stmt))
+            for stmt in (
+                schemas.create_iris_indexes_sql(settings.iris_table)
+                + schemas.create_eval_indexes_sql(settings.eval_table)
+                + schemas.create_predictions_indexes_sql(settings.predictions_table)
+                + schemas.create_perf_indexes_sql(settings.perf_table)
+                + schemas.create_stats_indexes_sql(settings.stats_table)
+                + schemas.create_validation_indexes_sql(settings.validation_table)
+            ):
+                conn.execute(text(stmt))
+    _ENSURED.add(key)
+
+
+def ensure_labels(engine: Engine, settings: Settings, names: Sequence[str]) -> None:
+    """Populate the class-name lookup table of the compact layout (once per process).
+
+    `names[i]` is the name of `target == i`; existing rows are kept.
+    """
+    key = (str(engine.url), settings.labels_table, *names)
+    if key in _ENSURED:
+        return
+    rows = [{"target": i, "target_name": str(name)} for i, name in enumerate(names)]
     with engine.begin() as conn:
-        conn.execute(schemas.create_iris_table_sql(settings.iris_table))
-        conn.execute(schemas.create_eval_table_sql(settings.eval_table))
+        conn.execute(text(schemas.insert_labels_sql(settings.labels_table)), rows)
+    _ENSURED.add(key)
+
+
+def ensure_partitions(engine: Engine, settings: Settings, days: Iterable[date]) -> None:
+    """Create the daily feature-table partitions for `days` (no-op unless partitioned)."""
+    if not settings.partitioned_tables or engine.dialect.name != "postgresql":
+        return
+    missing = [d for d in days if (str(engine.url), settings.iris_table, d.isoformat()) not in _ENSURED]
+    if not missing:
+        return
+    with engine.begin() as conn:
+        for day in missing:
+            conn.execute(text(schemas.create_iris_partition_sql(settings.iris_table, day)))
+    _ENSURED.update((str(engine.url), settings.iris_table, d.isoformat()) for d in missing)
+
+
+def copy_dataframe(cursor: Any, table: str, df: pd.DataFrame, chunk_rows: int = 100_000) -> int:
+    """Bulk-load `df` into `table` with `COPY ... FROM STDIN` (CSV) on a DB-API cursor.
+
+    The frame is serialized in chunks of `chunk_rows` so memory stays bounded. Runs
+    inside the caller's transaction; the caller commits.
+    """
+    columns: List[str] = list(df.columns)
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    for start in range(0, len(df), chunk_rows):
+        buf = io.StringIO()
+        df.iloc[start : start + chunk_rows].to_csv(buf, header=False, index=False)
+        buf.seek(0)
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            cursor.copy_expert(sql, buf)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(buf.getvalue())
+    return len(df)
+
+
+def _partition_keys(df: pd.DataFrame, partition_col: Optional[str]) -> List[date]:
+    if not partition_col or partition_col not in df.columns:
+        return []
+    return sorted(pd.to_datetime(df[partition_col].dropna()).dt.date.unique())
+
+
+@contextmanager
+def partition_writer(
+    engine: Engine,
+    table: str,
+    keys: Iterable[date],
+    partition_col: str = "ingestion_date",
+    dependents: Sequence[str] = (),
+) -> Iterator[Callable[[pd.DataFrame], int]]:
+    """Delete the `keys` partitions of `table` and yield a bulk-load function.
+
+    Everything written through the yielded `write(df)` lands in the same transaction
+    as the delete, which commits when the block exits (and rolls back on error), so
+    partitions are replaced atomically and callers can stream frames chunk by chunk.
+    The same partitions of the `dependents` tables (rows derived from `table`, e.g.
+    predictions) are deleted in that transaction too. Postgres uses `COPY`; other
+    dialects (e.g. SQLite used in tests) fall back to `DataFrame.to_sql`.
+    """
+    keys = list(keys)
+    tables = [table, *dependents]
+    if engine.dialect.name != "postgresql":
+        with engine.begin() as conn:
+            for name in tables:
+                if not keys or not engine.dialect.has_table(conn, name):
+                    continue
+                # Half-open day ranges also match date values stored as timestamps/text
+                stmt = text(f"DELETE FROM {name} WHERE {partition_col} >= :lo AND {partition_col} < :hi")
+                for key in keys:
+                    day = pd.Timestamp(key)
+                    conn.execute(stmt, {"lo": f"{day:%Y-%m-%d}", "hi": f"{day + pd.Timedelta(days=1):%Y-%m-%d}"})
+
+            def write_sql(df: pd.DataFrame) -> int:
+                df.to_sql(table, conn, if_exists="append", index=False)
+                return len(df)
+
+            yield write_sql
+        return
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        try:
+            if keys:
+                cursor.execute(f"DELETE FROM {table} WHERE {partition_col} = ANY(%s)", (keys,))
+                for name in dependents:
+                    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (name,))
+                    if cursor.fetchone()[0]:
+                        cursor.execute(f"DELETE FROM {name} WHERE {partition_col} = ANY(%s)", (keys,))
+            yield lambda df: copy_dataframe(cursor, table, df)
+        finally:
+            cursor.close()
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+
+def replace_partitions(
+    engine: Engine,
+    table: str,
+    df: pd.DataFrame,
+    partition_col: Optional[str] = "ingestion_date",
+    dependents: Sequence[str] = (),
+) -> int:
+    """Atomically replace the `partition_col` values present in `df` with its rows.
+
+    Deletes the partitions (and those of `dependents`, see `partition_writer`) and
+    bulk-loads the frame in a single transaction, so task retries never duplicate rows.
+    """
+    keys = _partition_keys(df, partition_col)
+    with partition_writer(engine, table, keys, partition_col or "ingestion_date", dependents) as write:
+        return write(df)
+
+
+def write_evaluation(
+    engine: Engine, settings: Settings, run_id: Optional[str], metrics: Dict[str, Any], execution_date: date
+) -> Dict[str, Any]:
+    """Append one row to the evaluation table and return it.
+
+    `metrics` holds the holdout metrics plus, when computed, `cv_folds` and the
+    `metrics.INTERVAL_COLUMNS` (NULL otherwise).
+    """
+    row = {
+        "run_id": run_id,
+        "accuracy": metrics["accuracy"],
+        "precision_weighted": metrics["precision_weighted"],
+        "recall_weighted": metrics["recall_weighted"],
+        "execution_date": execution_date,
+        "cv_folds": metrics.get("cv_folds"),
+        **{col: metrics.get(col) for col in INTERVAL_COLUMNS},
+    }
+    pd.DataFrame([row]).to_sql(settings.eval_table, engine, if_exists="append", index=False)
+    return row
+
+
+def row_key_sql(engine: Engine) -> str:
+    """Column expression of the stable per-row key of the feature table."""
+    # SQLite stand-ins (tests, benchmarks) use the implicit rowid
+    return "row_id" if engine.dialect.name == "postgresql" else "rowid"
+
+
+def iter_row_chunks(
+    engine: Engine, query: str, params: Optional[Dict[str, Any]] = None, chunk_rows: int = 50_000
+) -> Iterator[np.ndarray]:
+    """Stream a numeric query as float64 arrays of up to `chunk_rows` rows.
+
+    Batches come straight from the DB-API cursor's `fetchmany` (a named, server-side
+    cursor on psycopg2, so only one batch is held in memory at a time) and each batch
+    of plain tuples becomes an array in a single `np.array` call, without building a
+    result row object per row. NULLs become NaN.
+    """
+    params = params or {}
+    compiled = text(query).compile(dialect=engine.dialect)
+    args = [params[name] for name in compiled.positiontup] if compiled.positional else params
+    raw = engine.raw_connection()
+    try:
+        if engine.dialect.name == "postgresql":
+            cursor = raw.cursor(name=f"iter_row_chunks_{next(_CURSOR_IDS)}")
+            cursor.itersize = chunk_rows
+        else:
+            cursor = raw.cursor()
+        try:
+            cursor.execute(str(compiled), args)
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                yield np.array(rows, dtype=np.float64)
+        finally:
+            cursor.close()
+    finally:
+        raw.close()
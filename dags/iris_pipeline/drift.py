@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import json
+from datetime import date
+from typing import Dict, Any, Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from .config import Settings
+from .db import partition_writer
+from .features import FEATURE_COLS, FEATURE_RANGES
+
+
+# Equal-width bins inside each FEATURE_RANGES interval, plus an underflow and an
+# overflow bin
+DRIFT_BINS = 20
+
+# Floor for empty histogram bins in PSI (log of zero otherwise)
+_PSI_EPSILON = 1e-4
+
+_STATS_COLUMNS = ["feature", "row_count", "value_sum", "value_sum_sq", "value_min", "value_max", "histogram"]
+
+_LOW = np.array([FEATURE_RANGES[col][0] for col in FEATURE_COLS])
+_WIDTH = np.array([FEATURE_RANGES[col][1] - FEATURE_RANGES[col][0] for col in FEATURE_COLS]) / DRIFT_BINS
+
+
+class FeatureStats:
+    """Mergeable per-feature summary: count, sum, sum of squares, min, max, histogram.
+
+    Histograms use the fixed edges of `FEATURE_RANGES` (see `DRIFT_BINS`), so stats of
+    chunks, partitions or whole windows merge by addition. `update` is one vectorized
+    pass over a chunk (a single `np.bincount` for all histograms); NaNs are skipped.
+    """
+
+    def __init__(self) -> None:
+        n = len(FEATURE_COLS)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.total = np.zeros(n)
+        self.total_sq = np.zeros(n)
+        self.minimum = np.full(n, np.inf)
+        self.maximum = np.full(n, -np.inf)
+        self.hist = np.zeros((n, DRIFT_BINS + 2), dtype=np.int64)
+
+    def update(self, X: np.ndarray) -> "FeatureStats":
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(FEATURE_COLS):
+            raise ValueError(f"Expected an (n, {len(FEATURE_COLS)}) feature array, got {X.shape}")
+        if len(X) == 0:
+            return self
+        valid = ~np.isnan(X)
+        self.count += valid.sum(axis=0)
+        self.total += np.nansum(X, axis=0)
+        self.total_sq += np.nansum(X * X, axis=0)
+        with np.errstate(all="ignore"):
+            self.minimum = np.fmin(self.minimum, np.nanmin(X, axis=0))
+            self.maximum = np.fmax(self.maximum, np.nanmax(X, axis=0))
+            bins = np.floor((X - _LOW) / _WIDTH)
+        # 0 = underflow, 1..DRIFT_BINS = interior bins, DRIFT_BINS + 1 = overflow; NaN -> dropped slot
+        codes = np.where(valid, np.clip(bins, -1, DRIFT_BINS) + 1, DRIFT_BINS + 2).astype(np.int64)
+        width = DRIFT_BINS + 3
+        codes += np.arange(X.shape[1]) * width
+        counts = np.bincount(codes.ravel(), minlength=X.shape[1] * width).reshape(X.shape[1], width)
+        self.hist += counts[:, : DRIFT_BINS + 2]
+        return self
+
+    def merge(self, other: "FeatureStats") -> "FeatureStats":
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.minimum = np.fmin(self.minimum, other.minimum)
+        self.maximum = np.fmax(self.maximum, other.maximum)
+        self.hist += other.hist
+        return self
+
+    @property
+    def rows(self) -> int:
+        return int(self.count.max()) if len(self.count) else 0
+
+    def mean(self) -> np.ndarray:
+        with np.errstate(all="ignore"):
+            return self.total / self.count
+
+    def std(self) -> np.ndarray:
+        with np.errstate(all="ignore"):
+            var = self.total_sq / self.count - self.mean() ** 2
+        return np.sqrt(np.maximum(var, 0.0))
+
+    def to_frame(self, day: date) -> pd.DataFrame:
+        """One row per feature for the stats table."""
+        return pd.DataFrame(
+            {
+                "ingestion_date": [day] * len(FEATURE_COLS),
+                "feature": FEATURE_COLS,
+                "row_count": self.count,
+                "value_sum": self.total,
+                "value_sum_sq": self.total_sq,
+                "value_min": np.where(np.isfinite(self.minimum), self.minimum, np.nan),
+                "value_max": np.where(np.isfinite(self.maximum), self.maximum, np.nan),
+                "histogram": [json.dumps(h.tolist()) for h in self.hist],
+            }
+        )
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "FeatureStats":
+        """Merge stats-table rows (any number of days) into one summary."""
+        stats = cls()
+        for i, col in enumerate(FEATURE_COLS):
+            rows = df[df["feature"] == col]
+            if rows.empty:
+                continue
+            stats.count[i] = int(rows["row_count"].sum())
+            stats.total[i] = float(rows["value_sum"].sum())
+            stats.total_sq[i] = float(rows["value_sum_sq"].sum())
+            stats.minimum[i] = np.fmin.reduce(rows["value_min"].to_numpy(dtype=np.float64), initial=np.inf)
+            stats.maximum[i] = np.fmax.reduce(rows["value_max"].to_numpy(dtype=np.float64), initial=-np.inf)
+            stats.hist[i] = np.sum([json.loads(h) for h in rows["histogram"]], axis=0)
+        return stats
+
+
+def observe(chunks: Iterable[pd.DataFrame], stats: Dict[date, FeatureStats]) -> Iterator[pd.DataFrame]:
+    """Pass `chunks` through, accumulating per-`ingestion_date` stats into `stats`.
+
+    Lets ingestion compute the sketches while it streams frames to the database,
+    without a second read of the partition.
+    """
+    for df in chunks:
+        if "ingestion_date" in df.columns and len(df):
+            days = pd.to_datetime(df["ingestion_date"]).dt.date
+            for day, idx in df.groupby(days.to_numpy(), sort=False).indices.items():
+                stats.setdefault(day, FeatureStats()).update(df[FEATURE_COLS].to_numpy()[idx])
+        yield df
+
+
+def frame_stats(df: pd.DataFrame) -> Dict[date, FeatureStats]:
+    """Per-`ingestion_date` stats of one in-memory frame."""
+    stats: Dict[date, FeatureStats] = {}
+    for _ in observe([df], stats):
+        pass
+    return stats
+
+
+def write_stats(engine: Engine, settings: Settings, stats: Dict[date, FeatureStats]) -> int:
+    """Replace the stats rows of the days in `stats` (one transaction)."""
+    if not stats:
+        return 0
+    frame = pd.concat([s.to_frame(day) for day, s in stats.items()], ignore_index=True)
+    frame["computed_at"] = pd.Timestamp.now(tz="UTC").tz_localize(None)
+    with partition_writer(engine, settings.stats_table, list(stats)) as write:
+        return write(frame)
+
+
+def load_stats(engine: Engine, settings: Settings, start: str, end: str) -> Optional[FeatureStats]:
+    """Merged stats of the days in [`start`, `end`); None when no day has stats."""
+    query = text(
+        f"SELECT {', '.join(_STATS_COLUMNS)} FROM {settings.stats_table}"
+        " WHERE ingestion_date >= :lo AND ingestion_date < :hi"
+    )
+    with engine.connect() as conn:
+        rows = conn.execute(query, {"lo": start, "hi": end}).fetchall()
+    if not rows:
+        return None
+    return FeatureStats.from_frame(pd.DataFrame(rows, columns=_STATS_COLUMNS))
+
+
+def _proportions(hist: np.ndarray) -> np.ndarray:
+    totals = hist.sum(axis=1, keepdims=True)
+    return hist / np.maximum(totals, 1)
+
+
+def drift_scores(current: FeatureStats, reference: FeatureStats) -> Dict[str, Any]:
+    """Per-feature PSI and binned KS distance of `current` against `reference`.
+
+    PSI = sum((p - q) * ln(p / q)) over the histogram bins (rule of thumb: < 0.1
+    stable, > 0.25 shifted); KS is the largest gap between the binned CDFs.
+    """
+    p = np.clip(_proportions(current.hist), _PSI_EPSILON, None)
+    q = np.clip(_proportions(reference.hist), _PSI_EPSILON, None)
+    psi = np.sum((p - q) * np.log(p / q), axis=1)
+    cdf_gap = np.cumsum(_proportions(current.hist), axis=1) - np.cumsum(_proportions(reference.hist), axis=1)
+    ks = np.abs(cdf_gap).max(axis=1)
+    summary = {"mean": current.mean(), "ref_mean": reference.mean(), "std": current.std(), "ref_std": reference.std()}
+    features = {
+        col: {"psi": float(psi[i]), "ks": float(ks[i]), **{k: float(v[i]) for k, v in summary.items()}}
+        for i, col in enumerate(FEATURE_COLS)
+    }
+    return {
+        "features": features,
+        "max_psi": float(psi.max()),
+        "max_ks": float(ks.max()),
+        "rows": current.rows,
+        "reference_rows": reference.rows,
+    }
+
+
+def check_drift(
+    engine: Engine, settings: Settings, ds: str, trained_through: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """Drift of the `ds` partition against the `settings.drift_reference_days` reference window.
+
+    With `trained_through` (the last partition the published model saw) the window
+    ends with that day, so it stays anchored to the training data and slow drift
+    accumulates across skipped runs; without it, the window is the days before `ds`.
+    Returns None when either side has no stats (e.g. the first runs).
+    """
+    day = pd.Timestamp(ds).normalize()
+    end = day
+    if trained_through:
+        end = min(pd.Timestamp(trained_through).normalize() + pd.Timedelta(days=1), day)
+    current = load_stats(engine, settings, f"{day:%Y-%m-%d}", f"{day + pd.Timedelta(days=1):%Y-%m-%d}")
+    reference = load_stats(
+        engine, settings, f"{end - pd.Timedelta(days=settings.drift_reference_days):%Y-%m-%d}", f"{end:%Y-%m-%d}"
+    )
+    if current is None or reference is None or current.rows == 0 or reference.rows == 0:
+        return None
+    return {**drift_scores(current, reference), "reference_end": f"{end - pd.Timedelta(days=1):%Y-%m-%d}"}
+
+
+def retrain_needed(settings: Settings, report: Optional[Dict[str, Any]]) -> bool:
+    """Whether the drift `report` warrants training (`settings.drift_threshold` on max PSI).
+
+    Always True when gating is off (threshold 0) or there is nothing to compare.
+    """
+    if settings.drift_threshold <= 0 or report is None:
+        return True
+    return report["max_psi"] >= settings.drift_threshold
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+# Kept free of numpy/pandas/sklearn so that it can be imported at DAG parse time
+
+FEATURE_COLS: List[str] = [
+    "alcohol",
+    "malic_acid",
+    "ash",
+    "alcalinity_of_ash",
+    "magnesium",
+    "total_phenols",
+    "flavanoids",
+    "nonflavanoid_phenols",
+    "proanthocyanins",
+    "color_intensity",
+    "hue",
+    "od280_od315_of_diluted_wines",
+    "proline",
+]
+
+# Fixed histogram range per feature (about the wine data's min/max), used for drift
+# sketches: every partition is binned on the same edges, so histograms merge by
+# addition. Values outside a range land in its underflow/overflow bins.
+FEATURE_RANGES: Dict[str, Tuple[float, float]] = {
+    "alcohol": (11.0, 15.0),
+    "malic_acid": (0.0, 6.0),
+    "ash": (1.0, 3.5),
+    "alcalinity_of_ash": (10.0, 30.0),
+    "magnesium": (70.0, 170.0),
+    "total_phenols": (0.5, 4.0),
+    "flavanoids": (0.0, 5.5),
+    "nonflavanoid_phenols": (0.1, 0.7),
+    "proanthocyanins": (0.3, 3.7),
+    "color_intensity": (1.0, 13.0),
+    "hue": (0.4, 1.8),
+    "od280_od315_of_diluted_wines": (1.2, 4.0),
+    "proline": (250.0, 1700.0),
+}
+
+# Plausible value bounds per feature for data validation (see validation.py); much
+# wider than FEATURE_RANGES, they only reject physically impossible values
+FEATURE_BOUNDS: Dict[str, Tuple[float, float]] = {
+    "alcohol": (0.0, 25.0),
+    "malic_acid": (0.0, 20.0),
+    "ash": (0.0, 10.0),
+    "alcalinity_of_ash": (0.0, 60.0),
+    "magnesium": (0.0, 400.0),
+    "total_phenols": (0.0, 10.0),
+    "flavanoids": (0.0, 10.0),
+    "nonflavanoid_phenols": (0.0, 2.0),
+    "proanthocyanins": (0.0, 10.0),
+    "color_intensity": (0.0, 30.0),
+    "hue": (0.0, 5.0),
+    "od280_od315_of_diluted_wines": (0.0, 10.0),
+    "proline": (0.0, 5000.0),
+}
+
+# Known class labels of `target`
+TARGET_CLASSES: Tuple[int, ...] = (0, 1, 2)
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
-from typing import Dict, Any
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 from sklearn import datasets
 
 from .config import Settings
-from .db import get_engine
-from .schemas import create_iris_table_sql
+from .db import ensure_labels, ensure_partitions, ensure_tables, get_engine, partition_writer, replace_partitions
+from .features import FEATURE_COLS
 
 
 RENAME_MAP = {
@@ -16,11 +19,11 @@ RENAME_MAP = {
 }
 
 
-def load_iris_df(ds: str | None = None) -> pd.DataFrame:
+def load_iris_df(ds: str | None = None, labels: bool = True) -> pd.DataFrame:
     """Load the wine dataset (keeps function name for compatibility).
 
-    Returns a dataframe with feature columns, `target`, `target_name`, and optionally
-    `ingestion_date` when `ds` is provided.
+    Returns a dataframe with feature columns, `target`, `target_name` (unless `labels`
+    is False, as for the compact layout), and `ingestion_date` when `ds` is provided.
     """
     wine = datasets.load_wine()
     df = pd.DataFrame(wine.data, columns=wine.feature_names)
@@ -32,19 +35,117 @@ def load_iris_df(ds: str | None = None) -> pd.DataFrame:
         target_names = wine.target_names
     except Exception:
         target_names = [str(x) for x in sorted(set(wine.target))]
-    df["target_name"] = df["target"].apply(lambda i: target_names[i])
+    if labels:
+        df["target_name"] = np.asarray(target_names)[df["target"].to_numpy()]
     if ds:
         df["ingestion_date"] = pd.to_datetime(ds).normalize()
     return df
 
 
+@lru_cache(maxsize=1)
+def _class_distributions() -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Per-class priors, means and covariance Cholesky factors fitted on the wine data."""
+    wine = datasets.load_wine()
+    X = pd.DataFrame(wine.data, columns=wine.feature_names).rename(columns=RENAME_MAP)[FEATURE_COLS].to_numpy()
+    classes = np.unique(wine.target)
+    priors = np.bincount(wine.target) / len(wine.target)
+    means = np.stack([X[wine.target == c].mean(axis=0) for c in classes])
+    chol = np.stack([np.linalg.cholesky(np.cov(X[wine.target == c], rowvar=False)) for c in classes])
+    return priors, means, chol, np.asarray(wine.target_names)
+
+
+def iter_synthetic_wine(
+    n_rows: int,
+    ds: Optional[str] = None,
+    chunk_rows: int = 100_000,
+    seed: Optional[int] = None,
+    labels: bool = True,
+) -> Iterator[pd.DataFrame]:
+    """Yield `n_rows` synthetic wine rows in frames of at most `chunk_rows` rows.
+
+    Each class is drawn from a multivariate normal fitted to that class of the real
+    dataset (features clipped at 0), with classes in their original proportions.
+    Columns match `load_iris_df(ds, labels)`. The seed defaults to one derived from `ds`, so
+    re-running the same day (e.g. on retry) regenerates identical rows.
+    """
+    priors, means, chol, target_names = _class_distributions()
+    if seed is None:
+        seed = int(pd.Timestamp(ds).strftime("%Y%m%d")) if ds else 0
+    rng = np.random.default_rng(seed)
+    day = pd.to_datetime(ds).normalize() if ds else None
+    for start in range(0, n_rows, chunk_rows):
+        n = min(chunk_rows, n_rows - start)
+        y = rng.choice(len(priors), size=n, p=priors)
+        X = rng.standard_normal((n, means.shape[1]))
+        for c in range(len(priors)):
+            rows = y == c
+            X[rows] = means[c] + X[rows] @ chol[c].T
+        np.maximum(X, 0.0, out=X)
+        df = pd.DataFrame(X, columns=FEATURE_COLS)
+        df["target"] = y
+        if labels:
+            df["target_name"] = target_names[y]
+        if day is not None:
+            df["ingestion_date"] = day
+        yield df
+
+
+def label_names() -> List[str]:
+    """Class names indexed by `target`."""
+    return [str(name) for name in _class_distributions()[3]]
+
+
+def to_table_layout(settings: Settings, df: pd.DataFrame) -> pd.DataFrame:
+    """Cast a `load_iris_df`-shaped frame to the feature table's layout.
+
+    The compact layout drops `target_name` and narrows `target` to int16; with
+    `settings.real_features` the features are written as float32 (shorter COPY text).
+    """
+    if settings.compact_schema:
+        df = df.drop(columns="target_name", errors="ignore").astype({"target": np.int16})
+    if settings.real_features:
+        df = df.astype({col: np.float32 for col in FEATURE_COLS})
+    return df
+
+
 def ensure_iris_table(settings: Settings) -> None:
-    engine = get_engine(settings)
-    with engine.begin() as conn:
-        conn.execute(create_iris_table_sql(settings.iris_table))
+    ensure_tables(get_engine(settings), settings)
 
 
 def write_iris(settings: Settings, df: pd.DataFrame) -> int:
+    """Write the batch, replacing its `ingestion_date` partition(s) atomically.
+
+    Re-running the task for the same `ds` (e.g. on retry) never duplicates rows. The
+    predictions of the replaced partitions are deleted with them, so none point at
+    deleted rows, and the next `scoring.score_new_partitions` rebuilds them (whatever
+    the date, see `scoring.partitions_to_score`). With partitioned tables the daily
+    partitions are created first; with the compact layout the label lookup table is
+    populated (once per process).
+    """
+    engine = get_engine(settings)
+    df = to_table_layout(settings, df)
+    if settings.compact_schema:
+        ensure_labels(engine, settings, label_names())
+    if "ingestion_date" in df.columns:
+        ensure_partitions(engine, settings, pd.to_datetime(df["ingestion_date"].dropna()).dt.date.unique())
+    return replace_partitions(engine, settings.iris_table, df, dependents=[settings.predictions_table])
+
+
+def write_iris_chunks(settings: Settings, chunks: Iterable[pd.DataFrame], days: Iterable[date]) -> int:
+    """Replace the `days` partitions with the rows of `chunks`, streaming one frame at a time.
+
+    All chunks are written in one transaction (see `db.partition_writer`), so memory is
+    bounded by the chunk size and a failed or retried load never leaves a partial day.
+    Predictions of the replaced days are deleted in the same transaction and rebuilt by
+    the next scoring run.
+    """
+    days = list(days)
     engine = get_engine(settings)
-    df.to_sql(settings.iris_table, engine, if_exists="append", index=False)
-    return len(df)
+    ensure_partitions(engine, settings, days)
+    if settings.compact_schema:
+        ensure_labels(engine, settings, label_names())
+    rows = 0
+    with partition_writer(engine, settings.iris_table, days, dependents=[settings.predictions_table]) as write:
+        for df in chunks:
+            rows += write(to_table_layout(settings, df))
+    return rows
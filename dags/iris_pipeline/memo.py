@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from .artifacts import MEMO_NAMESPACE, ArtifactStore
+from .config import Settings
+from .features import FEATURE_COLS
+from .types import ArtifactRef
+
+
+# Settings that change what `fit` produces from the same rows and candidate
+_KEY_SETTINGS = (
+    "test_size",
+    "random_state",
+    "feature_dtype",
+    "sweep_metric",
+    "incremental_epochs",
+    "load_chunk_rows",
+    "scaler",
+    "logreg_solver",
+    "logreg_tol",
+    "logreg_max_iter",
+    "cv_folds",
+    "bootstrap_samples",
+    "ci_level",
+    "replay_rows",
+    "warm_start_trees",
+)
+
+# Fixed-point scales of the fingerprint terms; products get fewer digits to stay well inside BIGINT
+_FIXED_POINT = 1_000_000
+_FIXED_POINT_PRODUCT = 1_000
+
+
+def data_fingerprint(engine: Engine, settings: Settings) -> str:
+    """Digest of the feature table: row count and content aggregates per `ingestion_date`.
+
+    One aggregate query, no rows leave the database. Per feature it sums the column,
+    the column times `target` (so relabels and label swaps between rows show up) and
+    the column times the next one (so values moved between rows show up). Every term
+    is rounded to a fixed-point integer before summing: the sums are exact, so the
+    summation order cannot change the digest while a correction of 1e-6 still does.
+    """
+    cols = list(FEATURE_COLS)
+    terms = [("target", _FIXED_POINT)]
+    for col, nxt in zip(cols, cols[1:] + cols[:1]):
+        terms += [(col, _FIXED_POINT), (f"target * {col}", _FIXED_POINT), (f"{col} * {nxt}", _FIXED_POINT_PRODUCT)]
+    sums = ", ".join(f"SUM(CAST(ROUND(({expr}) * {scale}) AS BIGINT))" for expr, scale in terms)
+    query = f"SELECT ingestion_date, COUNT(*), {sums} FROM {settings.iris_table} GROUP BY ingestion_date"
+    with engine.connect() as conn:
+        rows = conn.execute(text(query)).fetchall()
+    lines = sorted(
+        "|".join([str(day)[:10], str(count), *(str(int(v or 0)) for v in values)]) for day, count, *values in rows
+    )
+    return hashlib.sha256("\n".join([settings.iris_table, *lines]).encode("utf-8")).hexdigest()
+
+
+def cache_key(
+    fingerprint: str, settings: Settings, candidate: Dict[str, Any], base_model_sha256: Optional[str] = None
+) -> str:
+    """Memo key of one sweep candidate trained on data with `fingerprint`."""
+    payload = {
+        "fingerprint": fingerprint,
+        "candidate": candidate,
+        "features": FEATURE_COLS,
+        "base_model": base_model_sha256,
+        **{name: getattr(settings, name) for name in _KEY_SETTINGS},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """LRU cache of training results (model, holdout labels, metrics, MLflow run).
+
+    Entries are JSON documents in the artifact store's memo namespace; the artifacts
+    they reference are copied there too, so they outlive the run that produced them.
+    At most `max_entries` entries are kept; the least recently used ones are evicted
+    together with the artifacts no other entry references.
+    """
+
+    def __init__(self, store: ArtifactStore, max_entries: int) -> None:
+        self.store = store
+        self.max_entries = max_entries
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.store.get_json(MEMO_NAMESPACE, key)
+        if entry is not None:
+            entry["last_used"] = time.time()
+            self.store.put_json(MEMO_NAMESPACE, key, entry)
+        return entry
+
+    def put_result(self, key: str, result: Dict[str, Any]) -> None:
+        """Cache a `fit` result; its model and `y_test`/`y_pred` are copied (not `X_test`)."""
+        store = self.store
+        model_ref = store.put_file(MEMO_NAMESPACE, "model", store.local_path(ArtifactRef(**result["model_ref"])))
+        arrays = {
+            name: store.put_array(MEMO_NAMESPACE, name, store.get_array(ArtifactRef(**result[name])))
+            for name in ("y_test", "y_pred")
+        }
+        cached = {
+            **result,
+            "model_path": store.local_path(model_ref),
+            "model_ref": asdict(model_ref),
+            "X_test": None,
+            **{name: asdict(ref) for name, ref in arrays.items()},
+            "memo_key": key,
+        }
+        entry = {"result": cached, "metrics": None, "mlflow_run_id": None, "last_used": time.time()}
+        entry["refs"] = [asdict(model_ref), *(asdict(ref) for ref in arrays.values())]
+        store.put_json(MEMO_NAMESPACE, key, entry)
+        self._evict()
+
+    def put_metrics(self, key: str, eval_result: Dict[str, Any]) -> None:
+        entry = self.store.get_json(MEMO_NAMESPACE, key)
+        if entry is None:
+            return
+        metrics = dict(eval_result)
+        if metrics.get("confusion_matrix_path"):
+            ref = self.store.put_file(MEMO_NAMESPACE, "confusion_matrix", metrics["confusion_matrix_path"])
+            metrics["confusion_matrix_path"] = self.store.local_path(ref)
+            entry["refs"].append(asdict(ref))
+        entry["metrics"] = metrics
+        self.store.put_json(MEMO_NAMESPACE, key, entry)
+
+    def put_mlflow_run(self, key: str, run_id: str) -> None:
+        entry = self.store.get_json(MEMO_NAMESPACE, key)
+        if entry is not None:
+            entry["mlflow_run_id"] = run_id
+            self.store.put_json(MEMO_NAMESPACE, key, entry)
+
+    def _evict(self) -> List[str]:
+        entries = {key: self.store.get_json(MEMO_NAMESPACE, key) for key in self.store.list_json(MEMO_NAMESPACE)}
+        entries = {key: entry for key, entry in entries.items() if entry is not None}
+        order = sorted(entries, key=lambda k: entries[k].get("last_used", 0.0))
+        victims = order[: max(len(order) - self.max_entries, 0)]
+        # Content-addressed artifacts may be shared between entries
+        live = {ref["key"] for key in order[len(victims) :] for ref in entries[key].get("refs", [])}
+        for key in victims:
+            for ref in entries[key].get("refs", []):
+                if ref["key"] not in live:
+                    self.store.delete(ArtifactRef(**ref))
+            self.store.delete_json(MEMO_NAMESPACE, key)
+        return victims
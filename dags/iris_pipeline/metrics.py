@@ -1,16 +1,196 @@
 from __future__ import annotations
 
-from typing import Tuple
+from typing import Dict, Iterable, Optional, Tuple
 
 import numpy as np
-from sklearn.metrics import accuracy_score, precision_score, recall_score, confusion_matrix
 
 from .types import EvalMetrics
 
 
-def compute_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> Tuple[EvalMetrics, np.ndarray]:
-    acc = float(accuracy_score(y_true, y_pred))
-    prec = float(precision_score(y_true, y_pred, average="weighted", zero_division=0))
-    rec = float(recall_score(y_true, y_pred, average="weighted", zero_division=0))
-    cm = confusion_matrix(y_true, y_pred)
-    return EvalMetrics(accuracy=acc, precision_weighted=prec, recall_weighted=rec), cm
+class ConfusionAccumulator:
+    """Confusion matrix built with one vectorized `np.bincount` per chunk.
+
+    Accumulators can be updated chunk by chunk and merged, so evaluation can stream
+    over predictions that do not fit in memory. Labels are the sorted union of all
+    labels seen (as in sklearn); rows are true labels, columns predicted labels.
+    """
+
+    def __init__(self, labels: Optional[np.ndarray] = None) -> None:
+        self.labels = np.unique(np.asarray(labels)) if labels is not None else np.empty(0, dtype=np.int64)
+        self.matrix = np.zeros((len(self.labels), len(self.labels)), dtype=np.int64)
+
+    def _extend_labels(self, new_labels: np.ndarray) -> None:
+        labels = np.union1d(self.labels, new_labels)
+        if len(labels) == len(self.labels):
+            return
+        idx = np.searchsorted(labels, self.labels)
+        matrix = np.zeros((len(labels), len(labels)), dtype=np.int64)
+        matrix[np.ix_(idx, idx)] = self.matrix
+        self.labels, self.matrix = labels, matrix
+
+    def update(self, y_true: np.ndarray, y_pred: np.ndarray) -> "ConfusionAccumulator":
+        y_true = np.asarray(y_true).ravel()
+        y_pred = np.asarray(y_pred).ravel()
+        if y_true.shape != y_pred.shape:
+            raise ValueError(f"y_true and y_pred lengths differ: {len(y_true)} != {len(y_pred)}")
+        self._extend_labels(np.union1d(y_true, y_pred))
+        k = len(self.labels)
+        codes = np.searchsorted(self.labels, y_true) * k + np.searchsorted(self.labels, y_pred)
+        self.matrix += np.bincount(codes, minlength=k * k).reshape(k, k)
+        return self
+
+    def merge(self, other: "ConfusionAccumulator") -> "ConfusionAccumulator":
+        self._extend_labels(other.labels)
+        idx = np.searchsorted(self.labels, other.labels)
+        self.matrix[np.ix_(idx, idx)] += other.matrix
+        return self
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[Tuple[np.ndarray, np.ndarray]]) -> "ConfusionAccumulator":
+        acc = cls()
+        for y_true, y_pred in chunks:
+            acc.update(y_true, y_pred)
+        return acc
+
+    def metrics(self) -> EvalMetrics:
+        """Derive accuracy and weighted/macro/per-class precision, recall and F1.
+
+        Zero denominators yield 0, like sklearn's `zero_division=0`.
+        """
+        cm = self.matrix.astype(np.float64)
+        tp = np.diag(cm)
+        support = cm.sum(axis=1)
+        predicted = cm.sum(axis=0)
+        total = support.sum()
+
+        precision = _safe_divide(tp, predicted)
+        recall = _safe_divide(tp, support)
+        f1 = _safe_divide(2 * tp, support + predicted)
+
+        def weighted(values: np.ndarray) -> float:
+            return float(np.average(values, weights=support)) if total else 0.0
+
+        def macro(values: np.ndarray) -> float:
+            return float(np.mean(values)) if len(values) else 0.0
+
+        per_class: Dict[str, Dict[str, float]] = {
+            str(label): {
+                "precision": float(precision[i]),
+                "recall": float(recall[i]),
+                "f1": float(f1[i]),
+                "support": int(support[i]),
+            }
+            for i, label in enumerate(self.labels.tolist())
+        }
+        return EvalMetrics(
+            accuracy=float(tp.sum() / total) if total else 0.0,
+            precision_weighted=weighted(precision),
+            recall_weighted=weighted(recall),
+            f1_weighted=weighted(f1),
+            precision_macro=macro(precision),
+            recall_macro=macro(recall),
+            f1_macro=macro(f1),
+            per_class=per_class,
+        )
+
+
+def _safe_divide(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    out = np.zeros_like(num, dtype=np.float64)
+    np.divide(num, den, out=out, where=den != 0)
+    return out
+
+
+def compute_metrics(
+    y_true: np.ndarray, y_pred: np.ndarray, chunk_size: int = 1_000_000
+) -> Tuple[EvalMetrics, np.ndarray]:
+    # Accepts arrays directly (including read-only memory-mapped ones from the artifact
+    # store); they are consumed in slices of `chunk_size` to bound memory.
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
+    acc = ConfusionAccumulator.from_chunks(
+        (y_true[i : i + chunk_size], y_pred[i : i + chunk_size]) for i in range(0, len(y_true), chunk_size)
+    )
+    return acc.metrics(), acc.matrix
+
+
+# `EvalMetrics` fields a sweep can rank candidates by (`SWEEP_METRIC`)
+SWEEP_METRICS = (
+    "accuracy",
+    "precision_weighted",
+    "recall_weighted",
+    "f1_weighted",
+    "precision_macro",
+    "recall_macro",
+    "f1_macro",
+)
+
+# Metrics with fold statistics and bootstrap intervals (columns of the eval table)
+INTERVAL_METRICS = ("accuracy", "precision_weighted", "recall_weighted")
+INTERVAL_COLUMNS = [f"{m}_{stat}" for m in INTERVAL_METRICS for stat in ("mean", "std", "ci_low", "ci_high")]
+
+
+def confusion_metrics(matrices: np.ndarray) -> Dict[str, np.ndarray]:
+    """Accuracy and weighted precision/recall/F1 of a stack of confusion matrices.
+
+    `matrices` is `(..., k, k)`; every metric comes back with the leading shape, so
+    thousands of matrices (folds, bootstrap replicates) are scored in a few array ops.
+    """
+    cm = np.asarray(matrices, dtype=np.float64)
+    tp = np.diagonal(cm, axis1=-2, axis2=-1)
+    support = cm.sum(axis=-1)
+    predicted = cm.sum(axis=-2)
+    total = support.sum(axis=-1)
+
+    def weighted(values: np.ndarray) -> np.ndarray:
+        return _safe_divide((values * support).sum(axis=-1), total)
+
+    return {
+        "accuracy": _safe_divide(tp.sum(axis=-1), total),
+        "precision_weighted": weighted(_safe_divide(tp, predicted)),
+        "recall_weighted": weighted(_safe_divide(tp, support)),
+        "f1_weighted": weighted(_safe_divide(2 * tp, support + predicted)),
+    }
+
+
+def bootstrap_intervals(
+    matrix: np.ndarray, n_samples: int = 1000, level: float = 0.95, seed: int = 0
+) -> Dict[str, float]:
+    """Percentile bootstrap intervals of `INTERVAL_METRICS` from a confusion matrix.
+
+    Resampling n evaluated rows with replacement only changes how many land in each
+    (true, predicted) cell, so a replicate is one multinomial draw over the cells:
+    all `n_samples` replicates are drawn in one call and scored with
+    `confusion_metrics`, without touching the rows. Returns `<metric>_ci_low` and
+    `<metric>_ci_high`; empty when `n_samples` is 0 or the matrix is empty.
+    """
+    cm = np.asarray(matrix, dtype=np.int64)
+    n = int(cm.sum())
+    if n_samples <= 0 or n == 0:
+        return {}
+    if not 0 < level < 1:
+        raise ValueError(f"Confidence level must be in (0, 1), got {level}")
+    rng = np.random.default_rng(seed)
+    replicates = rng.multinomial(n, cm.ravel() / n, size=n_samples).reshape(n_samples, *cm.shape)
+    scores = confusion_metrics(replicates)
+    alpha = (1 - level) / 2
+    out: Dict[str, float] = {}
+    for name in INTERVAL_METRICS:
+        low, high = np.quantile(scores[name], [alpha, 1 - alpha])
+        out[f"{name}_ci_low"], out[f"{name}_ci_high"] = float(low), float(high)
+    return out
+
+
+def fold_summary(matrices: np.ndarray, n_samples: int = 1000, level: float = 0.95, seed: int = 0) -> Dict[str, float]:
+    """Mean and standard deviation over folds, and bootstrap intervals of the pooled folds.
+
+    `matrices` holds one `(k, k)` confusion matrix per fold, on the same labels.
+    Returns the `INTERVAL_COLUMNS` keys (intervals only when `n_samples` > 0).
+    """
+    matrices = np.asarray(matrices)
+    scores = confusion_metrics(matrices)
+    out: Dict[str, float] = {}
+    for name in INTERVAL_METRICS:
+        out[f"{name}_mean"] = float(scores[name].mean())
+        out[f"{name}_std"] = float(scores[name].std(ddof=1)) if len(matrices) > 1 else 0.0
+    out.update(bootstrap_intervals(matrices.sum(axis=0), n_samples, level, seed))
+    return out
@@ -2,7 +2,14 @@ from __future__ import annotations
 
 import logging
 import os
-from typing import Dict, Any, Optional
+import atexit
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Any, List, Optional, Tuple
 
 from .config import Settings
 from .types import MlflowResult
@@ -33,6 +40,40 @@ def _emit_log(level: str, msg: str, *args: Any) -> None:
         print(msg, flush=True)
 
 
+# Experiment IDs resolved in this process, keyed by (tracking_uri, experiment_name)
+_EXPERIMENT_IDS: Dict[Tuple[str, str], str] = {}
+
+
+def _resolve_experiment_id(client: Any, tracking_uri: str, experiment_name: str) -> str:
+    key = (str(tracking_uri), experiment_name)
+    if key in _EXPERIMENT_IDS:
+        return _EXPERIMENT_IDS[key]
+    _emit_log("info", "Ensuring MLflow experiment exists: %s", experiment_name)
+    exp = client.get_experiment_by_name(experiment_name)
+    if exp is None:
+        try:
+            exp_id = client.create_experiment(experiment_name)
+            _emit_log("info", "Created MLflow experiment '%s' with id=%s", experiment_name, exp_id)
+        except Exception as ce:
+            # There can be a race if multiple tasks try to create simultaneously; re-fetch
+            _emit_log("warning", "Creating MLflow experiment failed (%s). Will retry fetching it.", ce)
+            exp = client.get_experiment_by_name(experiment_name)
+            if exp is None:
+                raise
+            exp_id = exp.experiment_id
+    else:
+        exp_id = exp.experiment_id
+    _EXPERIMENT_IDS[key] = exp_id
+    return exp_id
+
+
+def _write_features(directory: str, features: List[str]) -> str:
+    path = os.path.join(directory, "features.txt")
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write("\n".join(features))
+    return path
+
+
 class MetricsLogger:
     def log_all(
         self,
@@ -41,9 +82,14 @@ class MetricsLogger:
         model_path: str,
         features: list[str],
         confusion_matrix_path: Optional[str] = None,
+        candidates: Optional[List[Dict[str, Any]]] = None,
     ) -> MlflowResult:
         raise NotImplementedError
 
+    def flush(self, timeout: Optional[float] = None) -> List[str]:
+        """Wait for pending background uploads; returns their error messages."""
+        return []
+
 
 class NoOpMetricsLogger(MetricsLogger):
     def log_all(
@@ -53,6 +99,7 @@ class NoOpMetricsLogger(MetricsLogger):
         model_path: str,
         features: list[str],
         confusion_matrix_path: Optional[str] = None,
+        candidates: Optional[List[Dict[str, Any]]] = None,
     ) -> MlflowResult:
         return MlflowResult(run_id=None, error=None)
 
@@ -69,6 +116,7 @@ class MLflowMetricsLogger(MetricsLogger):
         model_path: str,
         features: list[str],
         confusion_matrix_path: Optional[str] = None,
+        candidates: Optional[List[Dict[str, Any]]] = None,
     ) -> MlflowResult:
         try:
             import mlflow
@@ -84,29 +132,10 @@ class MLflowMetricsLogger(MetricsLogger):
                 mlflow.get_tracking_uri(),
                 self.experiment_name,
             )
-            _emit_log("info", "Ensuring MLflow experiment exists: %s", self.experiment_name)
 
-            # Robustly ensure the experiment exists and obtain its ID
+            # Robustly ensure the experiment exists and obtain its ID (cached per process)
             client = MlflowClient()
-            exp = client.get_experiment_by_name(self.experiment_name)
-            if exp is None:
-                try:
-                    exp_id = client.create_experiment(self.experiment_name)
-                    _emit_log(
-                        "info",
-                        "Created MLflow experiment '%s' with id=%s",
-                        self.experiment_name,
-                        exp_id,
-                    )
-                except Exception as ce:
-                    # There can be a race if multiple tasks try to create simultaneously; re-fetch
-                    _emit_log("warning", "Creating MLflow experiment failed (%s). Will retry fetching it.", ce)
-                    exp = client.get_experiment_by_name(self.experiment_name)
-                    if exp is None:
-                        raise
-                    exp_id = exp.experiment_id
-            else:
-                exp_id = exp.experiment_id
+            exp_id = _resolve_experiment_id(client, mlflow.get_tracking_uri(), self.experiment_name)
 
             _emit_log("info", "Using MLflow experiment '%s' (id=%s)", self.experiment_name, exp_id)
 
@@ -126,24 +155,192 @@ class MLflowMetricsLogger(MetricsLogger):
                     pass
 
                 # Artifacts
-                # Save features list
-                feats_path = os.path.join(os.path.dirname(model_path), "features.txt")
-                with open(feats_path, "w", encoding="utf-8") as fh:
-                    fh.write("\n".join(features))
-                mlflow.log_artifact(feats_path, artifact_path="artifacts")
+                # Save features list (in a scratch dir: the model may live in the shared memo namespace)
+                with tempfile.TemporaryDirectory(prefix="iris_mlflow_") as tmp_dir:
+                    feats_path = _write_features(tmp_dir, features)
+                    mlflow.log_artifact(feats_path, artifact_path="artifacts")
 
                 if confusion_matrix_path and os.path.exists(confusion_matrix_path):
                     mlflow.log_artifact(confusion_matrix_path, artifact_path="artifacts")
 
+                # Sweep candidates as nested runs under this (best) run
+                if candidates and len(candidates) > 1:
+                    for i, cand in enumerate(candidates):
+                        with mlflow.start_run(experiment_id=exp_id, run_name=f"candidate-{i}", nested=True):
+                            mlflow.log_params(cand["params"])
+                            mlflow.log_metric(cand["metric"], cand["score"])
+
                 return MlflowResult(run_id=run_id, error=None)
         except Exception as e:
             _emit_log("warning", "MLflow logging failed: %s", e)
             return MlflowResult(run_id=None, error=str(e))
 
 
+# Loggers with uploads in flight, flushed at interpreter exit
+_LIVE_LOGGERS: "weakref.WeakSet[BatchedMLflowMetricsLogger]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_loggers() -> None:
+    for logger in list(_LIVE_LOGGERS):
+        logger.flush()
+
+
+class BatchedMLflowMetricsLogger(MetricsLogger):
+    """MLflow logger that batches tracking calls and uploads artifacts in the background.
+
+    Params, metrics and tags go out in a single `log_batch` call per run; the already
+    serialized model file is uploaded as an artifact (no `joblib.load` + `log_model`
+    round-trip). Each run gets one background job, tracked before `log_all` returns,
+    that uploads its artifacts in parallel on the upload pool (bounded retries) and
+    then terminates the run, so `flush()` returns only once every run is closed.
+    Call `flush()` before the process exits (an `atexit` hook also flushes, but
+    forked task runners may skip it).
+    """
+
+    def __init__(
+        self,
+        tracking_uri: Optional[str],
+        experiment_name: str,
+        max_workers: int = 4,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+        client_factory: Optional[Callable[[Optional[str]], Any]] = None,
+    ) -> None:
+        self.tracking_uri = tracking_uri
+        self.experiment_name = experiment_name
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._client_factory = client_factory
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mlflow-upload")
+        # Per-run jobs wait on their uploads, so they need their own threads
+        self._runs = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mlflow-run")
+        self._pending: List[Future] = []
+        self._errors: List[str] = []
+        self._lock = threading.Lock()
+        _LIVE_LOGGERS.add(self)
+
+    def _client(self) -> Any:
+        if self._client_factory is not None:
+            return self._client_factory(self.tracking_uri)
+        from mlflow.tracking import MlflowClient
+
+        return MlflowClient(tracking_uri=self.tracking_uri)
+
+    def _with_retries(self, fn: Callable[..., Any], *args: Any) -> Any:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return fn(*args)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    with self._lock:
+                        self._errors.append(f"{getattr(fn, '__name__', fn)}: {e}")
+                    _emit_log("warning", "MLflow upload failed after %s attempts: %s", attempt + 1, e)
+                    return None
+                time.sleep(self.retry_backoff * (2**attempt))
+
+    def _upload_then_terminate(
+        self, client: Any, run_id: str, uploads: List[Tuple[str, str]], scratch_dir: Optional[str] = None
+    ) -> None:
+        # One job per run: artifacts upload in parallel, then the run is closed
+        try:
+            wait([self._executor.submit(self._with_retries, client.log_artifact, run_id, p, d) for p, d in uploads])
+            self._with_retries(client.set_terminated, run_id, "FINISHED")
+        finally:
+            if scratch_dir:
+                shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    def log_all(
+        self,
+        params: Dict[str, Any],
+        metrics: Dict[str, float],
+        model_path: str,
+        features: list[str],
+        confusion_matrix_path: Optional[str] = None,
+        candidates: Optional[List[Dict[str, Any]]] = None,
+    ) -> MlflowResult:
+        try:
+            from mlflow.entities import Metric, Param, RunTag
+
+            client = self._client()
+            tracking_uri = self.tracking_uri or getattr(client, "tracking_uri", "")
+            _emit_log("info", "MLflow logging: tracking_uri=%s, experiment=%s", tracking_uri, self.experiment_name)
+            exp_id = _resolve_experiment_id(client, tracking_uri, self.experiment_name)
+
+            now_ms = int(time.time() * 1000)
+            run_id = client.create_run(exp_id).info.run_id
+            client.log_batch(
+                run_id,
+                metrics=[Metric(k, float(v), now_ms, 0) for k, v in metrics.items()],
+                params=[Param(k, str(v)) for k, v in params.items()],
+                tags=[RunTag("model_file", os.path.basename(model_path))],
+            )
+
+            # Scratch dir, removed after the upload: the model may live in the shared memo namespace
+            scratch_dir = tempfile.mkdtemp(prefix="iris_mlflow_")
+            uploads = [(model_path, "model"), (_write_features(scratch_dir, features), "artifacts")]
+            if confusion_matrix_path and os.path.exists(confusion_matrix_path):
+                uploads.append((confusion_matrix_path, "artifacts"))
+            self._track(self._runs.submit(self._upload_then_terminate, client, run_id, uploads, scratch_dir))
+
+            # Sweep candidates as nested runs, one batch each
+            if candidates and len(candidates) > 1:
+                for i, cand in enumerate(candidates):
+                    self._track(self._executor.submit(self._log_candidate, client, exp_id, run_id, i, cand, now_ms))
+
+            return MlflowResult(run_id=run_id, error=None)
+        except Exception as e:
+            _emit_log("warning", "MLflow logging failed: %s", e)
+            return MlflowResult(run_id=None, error=str(e))
+
+    def _log_candidate(self, client: Any, exp_id: str, parent_run_id: str, i: int, cand: Dict[str, Any], ts: int) -> None:
+        from mlflow.entities import Metric, Param
+
+        def log() -> None:
+            child = client.create_run(
+                exp_id, tags={"mlflow.parentRunId": parent_run_id, "mlflow.runName": f"candidate-{i}"}
+            ).info.run_id
+            client.log_batch(
+                child,
+                metrics=[Metric(cand["metric"], float(cand["score"]), ts, 0)],
+                params=[Param(k, str(v)) for k, v in cand["params"].items()],
+            )
+            client.set_terminated(child, "FINISHED")
+
+        self._with_retries(log)
+
+    def _track(self, future: Future) -> None:
+        with self._lock:
+            self._pending.append(future)
+
+    def flush(self, timeout: Optional[float] = None) -> List[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            # Jobs tracked while we wait (runs logged meanwhile) are picked up on the next pass
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                break
+            _, not_done = wait(pending, timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+            if not_done:
+                with self._lock:
+                    self._pending.extend(not_done)
+                break
+        with self._lock:
+            errors, self._errors = self._errors, []
+        return errors
+
+
 def build_metrics_logger(settings: Settings) -> MetricsLogger:
     # Prefer explicit setting; if missing, fall back to environment.
     tracking_uri = settings.mlflow_tracking_uri or os.getenv("MLFLOW_TRACKING_URI")
     # Always return an MLflow logger so we surface errors instead of silently NoOp'ing.
     # If tracking_uri is None, MLflow uses its default local store; this still helps with debugging.
+    if settings.mlflow_async_logging:
+        return BatchedMLflowMetricsLogger(
+            tracking_uri,
+            settings.experiment_name,
+            max_workers=settings.mlflow_upload_workers,
+            max_retries=settings.mlflow_max_retries,
+        )
     return MLflowMetricsLogger(tracking_uri, settings.experiment_name)
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import resource
+import sys
+import time
+from dataclasses import asdict
+from datetime import date
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from .config import Settings
+from .db import get_engine
+from .types import StagePerf
+
+try:  # installed with Airflow; byte counters are skipped without it
+    import psutil
+except ImportError:  # pragma: no cover
+    psutil = None
+
+
+# Stages finished in this process and not yet written (see `drain`)
+_RECORDS: List[StagePerf] = []
+
+
+def _cpu_seconds() -> float:
+    # This process (all threads) plus reaped child processes, e.g. a scoring pool
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def _io_bytes() -> Tuple[Optional[int], Optional[int]]:
+    if psutil is None:
+        return None, None
+    try:
+        io = psutil.Process().io_counters()
+    except (AttributeError, NotImplementedError, psutil.Error):
+        return None, None
+    # read_chars/write_chars (Linux) also count socket traffic, i.e. database I/O
+    return getattr(io, "read_chars", io.read_bytes), getattr(io, "write_chars", io.write_bytes)
+
+
+class StageProfiler:
+    """Measure one pipeline stage: wall and CPU time, peak RSS, rows and bytes.
+
+    Set `rows` inside the block. On exit the `StagePerf` is available as `result`
+    and queued for `drain`. Peak RSS is the high-water mark of the process, so it
+    includes earlier stages run by the same task.
+
+        with profile_stage("ingest") as stage:
+            stage.rows = write_iris(settings, df)
+    """
+
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+        self.rows = 0
+        self.result: Optional[StagePerf] = None
+
+    def __enter__(self) -> "StageProfiler":
+        self._started_at = time.time()
+        self._wall = time.perf_counter()
+        self._cpu = _cpu_seconds()
+        self._io = _io_bytes()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        read, written = (
+            (end - start if start is not None and end is not None else None)
+            for start, end in zip(self._io, _io_bytes())
+        )
+        self.result = StagePerf(
+            stage=self.stage,
+            started_at=self._started_at,
+            wall_seconds=time.perf_counter() - self._wall,
+            cpu_seconds=_cpu_seconds() - self._cpu,
+            peak_rss_mb=_peak_rss_mb(),
+            rows_processed=int(self.rows),
+            bytes_read=read,
+            bytes_written=written,
+        )
+        _RECORDS.append(self.result)
+
+
+def profile_stage(stage: str) -> StageProfiler:
+    return StageProfiler(stage)
+
+
+def drain() -> List[StagePerf]:
+    """Return and forget the stages profiled in this process so far."""
+    records = list(_RECORDS)
+    _RECORDS.clear()
+    return records
+
+
+def write_perf(engine: Engine, table: str, records: Iterable[StagePerf], **run_fields: Any) -> int:
+    """Append `records` to `table`; `run_fields` (dag_id, dag_run_id, task_id, ...) go on every row."""
+    rows = [{**run_fields, **asdict(r)} for r in records]
+    if not rows:
+        return 0
+    frame = pd.DataFrame(rows)
+    frame["started_at"] = pd.to_datetime(frame["started_at"], unit="s")
+    frame.to_sql(table, engine, if_exists="append", index=False)
+    return len(frame)
+
+
+def record_task_perf(settings: Settings, context: Mapping[str, Any], execution_date: date) -> int:
+    """Write the stages profiled by this task instance to `settings.perf_table`.
+
+    `context` is the Airflow task context (`dag`, `run_id`, `ti`). Never raises:
+    stage timings are best effort and must not fail the task.
+    """
+    ti = context["ti"]
+    try:
+        return write_perf(
+            get_engine(settings),
+            settings.perf_table,
+            drain(),
+            dag_id=context["dag"].dag_id,
+            dag_run_id=context["run_id"],
+            task_id=ti.task_id,
+            map_index=ti.map_index,
+            execution_date=execution_date,
+        )
+    except Exception as exc:
+        print(f"[PERF] could not record stage timings: {exc}", flush=True)
+        return 0
+
+
+def load_run_perf(engine: Engine, table: str, dag_run_id: str) -> List[Dict[str, Any]]:
+    query = text(
+        f"SELECT stage, wall_seconds, cpu_seconds, peak_rss_mb, rows_processed, bytes_read, bytes_written"
+        f" FROM {table} WHERE dag_run_id = :run_id"
+    )
+    with engine.connect() as conn:
+        return [dict(row._mapping) for row in conn.execute(query, {"run_id": dag_run_id})]
+
+
+def perf_metrics(records: Iterable[Dict[str, Any]]) -> Dict[str, float]:
+    """Flatten per-stage records into MLflow metrics `perf.<stage>.<field>`.
+
+    Repeated stages (e.g. one `fit` per sweep candidate) are summed, except peak RSS
+    which is the maximum.
+    """
+    out: Dict[str, float] = {}
+    for record in records:
+        for field in ("wall_seconds", "cpu_seconds", "peak_rss_mb", "rows_processed", "bytes_read", "bytes_written"):
+            value = record.get(field)
+            if value is None:
+                continue
+            key = f"perf.{record['stage']}.{field}"
+            if field == "peak_rss_mb":
+                out[key] = max(out.get(key, 0.0), float(value))
+            else:
+                out[key] = out.get(key, 0.0) + float(value)
+    return out
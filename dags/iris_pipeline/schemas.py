@@ -1,37 +1,192 @@
 from __future__ import annotations
 
+from datetime import date, timedelta
+from typing import List
 
-def create_iris_table_sql(table: str) -> str:
-    # Schema adapted for the wine dataset features
+from .features import FEATURE_COLS
+from .metrics import INTERVAL_COLUMNS
+
+
+def create_iris_table_sql(
+    table: str, partitioned: bool = False, compact: bool = False, real_features: bool = False
+) -> str:
+    # Schema adapted for the wine dataset features.
+    # When partitioned, rows are range-partitioned by `ingestion_date` (one partition
+    # per day, see `create_iris_partition_sql`). The compact layout stores `target` as
+    # `smallint` and keeps class names in a lookup table (`create_labels_table_sql`)
+    # instead of a `target_name` per row; `real_features` uses 4-byte floats. These
+    # options only apply to new tables.
+    partition_clause = " PARTITION BY RANGE (ingestion_date)" if partitioned else ""
+    feature_type = "real" if real_features else "double precision"
+    columns = [f"{col} {feature_type}" for col in FEATURE_COLS]
+    columns += ["target smallint"] if compact else ["target integer", "target_name text"]
+    columns += ["ingestion_date date", "row_id bigserial"]
+    body = ",\n        ".join(columns)
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        {body}
+    ){partition_clause}
+    """
+
+
+def create_labels_table_sql(table: str) -> str:
+    # Class names of the compact feature table, one row per `target`
     return f"""
     CREATE TABLE IF NOT EXISTS {table} (
-        alcohol double precision,
-        malic_acid double precision,
-        ash double precision,
-        alcalinity_of_ash double precision,
-        magnesium double precision,
-        total_phenols double precision,
-        flavanoids double precision,
-        nonflavanoid_phenols double precision,
-        proanthocyanins double precision,
-        color_intensity double precision,
-        hue double precision,
-        od280_od315_of_diluted_wines double precision,
-        proline double precision,
-        target integer,
-        target_name text,
-        ingestion_date date
+        target smallint PRIMARY KEY,
+        target_name text NOT NULL
     )
     """
 
 
+def insert_labels_sql(table: str) -> str:
+    return f"INSERT INTO {table} (target, target_name) VALUES (:target, :target_name) ON CONFLICT (target) DO NOTHING"
+
+
+def add_iris_row_id_sql(table: str) -> str:
+    # Stable row key, used to join predictions back to feature rows
+    return f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS row_id bigserial"
+
+
+def iris_partition_name(table: str, day: date) -> str:
+    return f"{table}_p{day:%Y%m%d}"
+
+
+def create_iris_partition_sql(table: str, day: date) -> str:
+    return f"""
+    CREATE TABLE IF NOT EXISTS {iris_partition_name(table, day)}
+    PARTITION OF {table}
+    FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')
+    """
+
+
+def create_iris_default_partition_sql(table: str) -> str:
+    # Catches rows without `ingestion_date`
+    return f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"
+
+
+def create_iris_indexes_sql(table: str) -> List[str]:
+    # BRIN stays tiny and fits append-only, date-ordered ingestion
+    return [f"CREATE INDEX IF NOT EXISTS {table}_ingestion_date_brin ON {table} USING brin (ingestion_date)"]
+
+
 def create_eval_table_sql(table: str) -> str:
+    interval_columns = ",\n        ".join(_eval_interval_columns())
     return f"""
     CREATE TABLE IF NOT EXISTS {table} (
         run_id text,
         accuracy double precision,
         precision_weighted double precision,
         recall_weighted double precision,
-        execution_date date
+        execution_date date,
+        {interval_columns}
     )
     """
+
+
+def _eval_interval_columns() -> List[str]:
+    # Cross-validation folds, fold mean/std and bootstrap intervals (see metrics.fold_summary)
+    return ["cv_folds integer"] + [f"{col} double precision" for col in INTERVAL_COLUMNS]
+
+
+def add_eval_interval_columns_sql(table: str) -> List[str]:
+    # Evaluation tables created before the interval columns existed
+    return [f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column}" for column in _eval_interval_columns()]
+
+
+def create_eval_indexes_sql(table: str) -> List[str]:
+    return [
+        f"CREATE INDEX IF NOT EXISTS {table}_execution_date_idx ON {table} (execution_date)",
+        f"CREATE INDEX IF NOT EXISTS {table}_run_id_idx ON {table} (run_id)",
+    ]
+
+
+def create_predictions_table_sql(table: str) -> str:
+    # One row per scored feature row; `probabilities` is ordered like `model.classes_`
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        row_id bigint,
+        ingestion_date date,
+        prediction integer,
+        probability double precision,
+        probabilities double precision[],
+        model_sha256 text,
+        scored_at timestamp
+    )
+    """
+
+
+def create_predictions_indexes_sql(table: str) -> List[str]:
+    return [f"CREATE INDEX IF NOT EXISTS {table}_ingestion_date_row_id_idx ON {table} (ingestion_date, row_id)"]
+
+
+def create_perf_table_sql(table: str) -> str:
+    # One row per profiled stage of a task instance (see perf.py)
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        dag_id text,
+        dag_run_id text,
+        task_id text,
+        map_index integer,
+        stage text,
+        execution_date date,
+        started_at timestamp,
+        wall_seconds double precision,
+        cpu_seconds double precision,
+        peak_rss_mb double precision,
+        rows_processed bigint,
+        bytes_read bigint,
+        bytes_written bigint
+    )
+    """
+
+
+def create_perf_indexes_sql(table: str) -> List[str]:
+    return [
+        # trend one stage across days
+        f"CREATE INDEX IF NOT EXISTS {table}_stage_date_idx ON {table} (stage, execution_date)",
+        f"CREATE INDEX IF NOT EXISTS {table}_dag_run_id_idx ON {table} (dag_run_id)",
+    ]
+
+
+def create_stats_table_sql(table: str) -> str:
+    # Per-partition, per-feature drift sketches (see drift.py); histograms are JSON
+    # arrays of counts over fixed bins, so days merge by addition
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        ingestion_date date,
+        feature text,
+        row_count bigint,
+        value_sum double precision,
+        value_sum_sq double precision,
+        value_min double precision,
+        value_max double precision,
+        histogram text,
+        computed_at timestamp
+    )
+    """
+
+
+def create_stats_indexes_sql(table: str) -> List[str]:
+    return [f"CREATE INDEX IF NOT EXISTS {table}_ingestion_date_idx ON {table} (ingestion_date)"]
+
+
+def create_validation_table_sql(table: str) -> str:
+    # One row per validation rule and feature-table partition (see validation.py)
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        dag_run_id text,
+        ingestion_date date,
+        rule text,
+        column_name text,
+        failed_rows bigint,
+        row_count bigint,
+        passed boolean,
+        detail text,
+        validated_at timestamp
+    )
+    """
+
+
+def create_validation_indexes_sql(table: str) -> List[str]:
+    return [f"CREATE INDEX IF NOT EXISTS {table}_ingestion_date_idx ON {table} (ingestion_date)"]
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from .artifacts import build_artifact_store
+from .config import Settings
+from .db import get_engine, iter_row_chunks, partition_writer, row_key_sql
+from .features import FEATURE_COLS
+
+
+# Per-process model cache: sha256 -> fitted estimator (one model kept at a time)
+_MODEL_CACHE: Dict[str, Any] = {}
+
+
+def load_model(path: str, sha256: str) -> Any:
+    """Load a serialized model once per process; a new digest replaces the cached one."""
+    model = _MODEL_CACHE.get(sha256)
+    if model is None:
+        model = joblib.load(path)
+        _MODEL_CACHE.clear()
+        _MODEL_CACHE[sha256] = model
+    return model
+
+
+def _init_worker(path: str, sha256: str) -> None:
+    load_model(path, sha256)
+
+
+def _predict_chunk(path: str, sha256: str, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    model = load_model(path, sha256)
+    proba = model.predict_proba(X)
+    return model.classes_[proba.argmax(axis=1)], proba
+
+
+def _pg_array_literals(values: np.ndarray) -> np.ndarray:
+    """Format each row of a 2-D float array as a Postgres array literal, vectorized."""
+    out = np.char.mod("%.6g", values[:, 0])
+    for j in range(1, values.shape[1]):
+        out = np.char.add(np.char.add(out, ","), np.char.mod("%.6g", values[:, j]))
+    return np.char.add(np.char.add("{", out), "}")
+
+
+def partitions_to_score(engine: Engine, settings: Settings) -> List[date]:
+    """Feature partitions whose rows are not all scored, oldest first.
+
+    Every partition's row count and range of row keys is compared with its
+    predictions': a partition is scored again when they differ, e.g. when a re-run
+    ingest or a backfill replaced it (which deletes its predictions) at any date, or
+    gave it new `row_id`s with the same number of rows. Both sides are one grouped
+    aggregate query; no rows leave the database.
+    """
+    keys = {settings.iris_table: row_key_sql(engine), settings.predictions_table: "row_id"}
+    summaries = []
+    with engine.connect() as conn:
+        for table, key in keys.items():
+            rows = conn.execute(
+                text(f"SELECT ingestion_date, COUNT(*), MIN({key}), MAX({key}) FROM {table} GROUP BY ingestion_date")
+            ).fetchall()
+            frame = pd.DataFrame(rows, columns=["day", "n", "lo", "hi"]).dropna(subset=["day"])
+            frame["day"] = pd.to_datetime(frame["day"]).dt.date
+            # Dates may come back as several values per day (e.g. timestamps in SQLite)
+            grouped = frame.groupby("day").agg(n=("n", "sum"), lo=("lo", "min"), hi=("hi", "max"))
+            summaries.append({day: (int(r.n), int(r.lo), int(r.hi)) for day, r in grouped.iterrows()})
+    features, scored = summaries
+    return sorted(day for day, summary in features.items() if scored.get(day) != summary)
+
+
+def _predict_stream(
+    chunks: Iterable[np.ndarray], executor: Executor, path: str, sha256: str, max_in_flight: int
+) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    # Keep a bounded number of chunks in flight so reading, predicting and writing overlap
+    pending: deque = deque()
+    for block in chunks:
+        pending.append((block[:, 0], executor.submit(_predict_chunk, path, sha256, block[:, 1:])))
+        if len(pending) >= max_in_flight:
+            row_ids, future = pending.popleft()
+            yield (row_ids, *future.result())
+    while pending:
+        row_ids, future = pending.popleft()
+        yield (row_ids, *future.result())
+
+
+def score_partition(
+    engine: Engine, settings: Settings, day: date, executor: Executor, path: str, sha256: str, max_in_flight: int
+) -> int:
+    """Score one `ingestion_date` partition and replace its predictions atomically."""
+    day_ts = pd.Timestamp(day)
+    query = (
+        f"SELECT {row_key_sql(engine)}, {', '.join(FEATURE_COLS)} FROM {settings.iris_table}"
+        " WHERE ingestion_date >= :lo AND ingestion_date < :hi"
+    )
+    params = {"lo": f"{day_ts:%Y-%m-%d}", "hi": f"{day_ts + pd.Timedelta(days=1):%Y-%m-%d}"}
+    chunks = iter_row_chunks(engine, query, params, settings.scoring_chunk_rows)
+    scored_at = pd.Timestamp.now(tz="UTC").tz_localize(None).floor("s")
+    rows = 0
+    with partition_writer(engine, settings.predictions_table, [day]) as write:
+        for row_ids, pred, proba in _predict_stream(chunks, executor, path, sha256, max_in_flight):
+            frame = pd.DataFrame(
+                {
+                    "row_id": row_ids.astype(np.int64),
+                    "ingestion_date": day,
+                    "prediction": pred,
+                    "probability": proba.max(axis=1),
+                    "probabilities": _pg_array_literals(proba),
+                    "model_sha256": sha256,
+                    "scored_at": scored_at,
+                }
+            )
+            rows += write(frame)
+    return rows
+
+
+def score_new_partitions(settings: Settings) -> Dict[str, Any]:
+    """Apply the latest published model to feature partitions that are not scored yet.
+
+    Chunks are streamed from the feature table and predicted in a process pool whose
+    workers load the model once; predictions (with class probabilities) are
+    bulk-written to `settings.predictions_table` per `ingestion_date`.
+    """
+    published = build_artifact_store(settings).resolve("model")
+    if published is None:
+        return {"partitions": [], "rows_scored": 0, "model_sha256": None}
+    ref, _ = published
+    path = build_artifact_store(settings).local_path(ref)
+
+    engine = get_engine(settings)
+    days = partitions_to_score(engine, settings)
+    workers = settings.scoring_workers or os.cpu_count() or 1
+    rows = 0
+    if days:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path, ref.sha256)) as pool:
+            for day in days:
+                rows += score_partition(engine, settings, day, pool, path, ref.sha256, max_in_flight=2 * workers)
+    return {"partitions": [d.isoformat() for d in days], "rows_scored": rows, "model_sha256": ref.sha256}
@@ -0,0 +1,352 @@
+from __future__ import annotations
+
+# Online predictions from the latest published model, on stdlib asyncio only:
+#
+#   cd dags && ARTIFACT_ROOT=/shared/iris_artifacts python -m iris_pipeline.serving --port 8000
+#   curl -s localhost:8000/predict -d '{"features": {"alcohol": 13.2, ...}}'
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from .artifacts import ArtifactStore, build_artifact_store
+from .config import Settings, load_settings_from_env
+from .features import FEATURE_COLS
+from .scoring import load_model
+
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    model: Any
+    sha256: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    loaded_at: float = 0.0
+
+
+class ModelCache:
+    """The published model, loaded once and swapped when the pointer moves.
+
+    `refresh` resolves the `name` pointer of the artifact store and loads a new
+    version only when its digest changed. The swap is a single reference assignment:
+    batches already running keep the model they started with, and the previous file
+    stays in the store until the next publish (see `ArtifactStore.publish`).
+    """
+
+    def __init__(self, store: ArtifactStore, name: str = "model") -> None:
+        self.store = store
+        self.name = name
+        self.current: Optional[LoadedModel] = None
+
+    def refresh(self) -> bool:
+        """Load the published model if it changed; True when a new one was swapped in."""
+        published = self.store.resolve(self.name)
+        if published is None:
+            return False
+        ref, metadata = published
+        if self.current is not None and self.current.sha256 == ref.sha256:
+            return False
+        model = load_model(self.store.local_path(ref), ref.sha256)
+        self.current = LoadedModel(model, ref.sha256, metadata, time.time())
+        return True
+
+
+def parse_rows(payload: Dict[str, Any]) -> np.ndarray:
+    """Feature rows of a request body, in `FEATURE_COLS` order.
+
+    Accepts `{"features": row}` or `{"instances": [row, ...]}`, where a row is a list
+    of `len(FEATURE_COLS)` numbers or a `{feature: value}` mapping.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Expected a JSON object with 'features' or 'instances'")
+    if "instances" in payload:
+        rows = payload["instances"]
+    elif "features" in payload:
+        rows = [payload["features"]]
+    else:
+        raise ValueError("Expected a JSON object with 'features' or 'instances'")
+    if not isinstance(rows, list) or not rows:
+        raise ValueError("'instances' must be a non-empty list")
+    values = []
+    for row in rows:
+        if isinstance(row, dict):
+            missing = [col for col in FEATURE_COLS if col not in row]
+            if missing:
+                raise ValueError(f"Missing features: {', '.join(missing)}")
+            row = [row[col] for col in FEATURE_COLS]
+        if not isinstance(row, list) or len(row) != len(FEATURE_COLS):
+            raise ValueError(f"Each row needs {len(FEATURE_COLS)} feature values")
+        values.append(row)
+    try:
+        X = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"Feature values must be numbers: {exc}") from exc
+    if not np.isfinite(X).all():
+        raise ValueError("Feature values must be finite")
+    return X
+
+
+class MicroBatcher:
+    """Coalesces concurrent requests into one vectorized `predict_proba` call.
+
+    Requests queue their rows; the batching loop takes what is queued (waiting up to
+    `max_wait_ms` for more when the batch is not full) up to `max_batch` rows, and
+    predicts the stacked array on a worker thread. While one batch is predicting,
+    the next one fills up, so under load batches grow without any added wait.
+    """
+
+    def __init__(self, cache: ModelCache, max_batch: int = 256, max_wait_ms: float = 1.0) -> None:
+        self.cache = cache
+        self.max_batch = max(int(max_batch), 1)
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+        self.batches = 0
+        self.rows = 0
+        self._queue: Optional[asyncio.Queue] = None
+        # One thread: predictions run off the event loop, one batch at a time
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="predict")
+
+    async def predict(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, LoadedModel]:
+        """Predicted classes and class probabilities of the rows of `X`, and the model used."""
+        if self._queue is None:
+            raise RuntimeError("MicroBatcher.run() is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((X, future))
+        return await future
+
+    def _take(self, batch: List[Tuple[np.ndarray, asyncio.Future]], rows: int) -> int:
+        while rows < self.max_batch and not self._queue.empty():
+            item = self._queue.get_nowait()
+            batch.append(item)
+            rows += len(item[0])
+        return rows
+
+    async def run(self) -> None:
+        self._queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                rows = self._take(batch, len(batch[0][0]))
+                if rows < self.max_batch and self.max_wait > 0:
+                    await asyncio.sleep(self.max_wait)
+                    rows = self._take(batch, rows)
+                # Whole batch on one model, even if a swap lands meanwhile
+                loaded = self.cache.current
+                if loaded is None:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(LookupError("No published model"))
+                    continue
+                X = np.concatenate([x for x, _ in batch]) if len(batch) > 1 else batch[0][0]
+                try:
+                    proba = await loop.run_in_executor(self._executor, loaded.model.predict_proba, X)
+                except Exception as exc:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(exc)
+                    continue
+                pred = loaded.model.classes_[proba.argmax(axis=1)]
+                self.batches += 1
+                self.rows += rows
+                start = 0
+                for x, future in batch:
+                    stop = start + len(x)
+                    if not future.done():
+                        future.set_result((pred[start:stop], proba[start:stop], loaded))
+                    start = stop
+        finally:
+            self._queue = None
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+class PredictionServer:
+    """Minimal HTTP/1.1 server (keep-alive) around a `ModelCache` and `MicroBatcher`.
+
+    `POST /predict` takes `{"features": row}` or `{"instances": [rows]}` (see
+    `parse_rows`) and returns `predictions`, `probabilities`, `classes` and
+    `model_sha256`; `GET /health` reports the loaded model and batching counters.
+    """
+
+    def __init__(self, settings: Settings, store: Optional[ArtifactStore] = None) -> None:
+        self.settings = settings
+        self.cache = ModelCache(store or build_artifact_store(settings))
+        self.batcher = MicroBatcher(self.cache, settings.serving_max_batch, settings.serving_max_wait_ms)
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks: List[asyncio.Task] = []
+        # Model loads run here so they never stall the event loop or the predictions
+        self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+
+    @property
+    def port(self) -> Optional[int]:
+        return self._server.sockets[0].getsockname()[1] if self._server else None
+
+    async def start(self, host: Optional[str] = None, port: Optional[int] = None) -> "PredictionServer":
+        """Load the published model (if any) and start listening; port 0 picks a free one."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._loader, self.cache.refresh)
+        self._tasks = [asyncio.create_task(self.batcher.run()), asyncio.create_task(self._refresh_loop())]
+        self._server = await asyncio.start_server(
+            self._handle,
+            host or self.settings.serving_host,
+            self.settings.serving_port if port is None else port,
+        )
+        return self
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.batcher.close()
+        self._loader.shutdown(wait=False)
+
+    async def refresh(self) -> bool:
+        """Check the published pointer now; True when a new model was swapped in."""
+        swapped = await asyncio.get_running_loop().run_in_executor(self._loader, self.cache.refresh)
+        if swapped:
+            print(f"[SERVING] serving model {self.cache.current.sha256[:12]}", flush=True)
+        return swapped
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.settings.serving_refresh_seconds)
+            try:
+                await self.refresh()
+            except Exception as exc:
+                # Keep serving the loaded model; retried on the next tick
+                print(f"[SERVING] could not load the published model: {exc}", flush=True)
+
+    def health(self) -> Dict[str, Any]:
+        loaded = self.cache.current
+        return {
+            "status": "ok" if loaded else "no_model",
+            "model_sha256": loaded.sha256 if loaded else None,
+            "trained_through": loaded.metadata.get("trained_through") if loaded else None,
+            "loaded_at": loaded.loaded_at if loaded else None,
+            "requests": self.requests,
+            "batches": self.batcher.batches,
+            "rows": self.batcher.rows,
+        }
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        path = path.split("?", 1)[0]
+        if path == "/health":
+            return (200, self.health()) if method == "GET" else (405, {"error": "use GET"})
+        if path != "/predict":
+            return 404, {"error": f"unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        self.requests += 1
+        try:
+            X = parse_rows(json.loads(body or b"null"))
+        except ValueError as exc:  # includes JSONDecodeError
+            return 400, {"error": str(exc)}
+        try:
+            pred, proba, loaded = await self.batcher.predict(X)
+        except LookupError as exc:
+            return 503, {"error": str(exc)}
+        except Exception as exc:
+            # The model failed on these rows; answer instead of dropping the connection
+            return 500, {"error": f"prediction failed: {exc}"}
+        return 200, {
+            "predictions": pred.tolist(),
+            "probabilities": proba.round(6).tolist(),
+            "classes": loaded.model.classes_.tolist(),
+            "model_sha256": loaded.sha256,
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                length = headers.get("content-length") or "0"
+                limit = self.settings.serving_max_body_bytes
+                body: Optional[bytes] = None
+                if not (length.isascii() and length.isdigit()):
+                    status, payload = 400, {"error": f"invalid Content-Length {length!r}"}
+                elif int(length) > limit:
+                    status, payload = 413, {"error": f"request body larger than {limit} bytes"}
+                else:
+                    body = await reader.readexactly(int(length))
+                    status, payload = await self.dispatch(method.upper(), path, body)
+                if body is None:
+                    # The rejected body is still unread, so the connection cannot carry another request
+                    keep_alive = False
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+                    + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            # Client went away or sent something that is not HTTP (dispatch answers its own errors)
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(settings: Settings, host: Optional[str] = None, port: Optional[int] = None) -> None:
+    server = await PredictionServer(settings).start(host, port)
+    loaded = server.cache.current
+    print(
+        f"[SERVING] listening on port {server.port}, model "
+        f"{loaded.sha256[:12] if loaded else '(none published yet)'}",
+        flush=True,
+    )
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve predictions from the latest published model.")
+    parser.add_argument("--host", default=None, help="default: SERVING_HOST")
+    parser.add_argument("--port", type=int, default=None, help="default: SERVING_PORT")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(load_settings_from_env(), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,71 +1,594 @@
 from __future__ import annotations
 
+import itertools
+import json
 import os
+import shutil
 import tempfile
-from typing import Dict, Any, List, Tuple
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, replace
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 
 import joblib
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.naive_bayes import GaussianNB
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler, RobustScaler, StandardScaler
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
 
+from .artifacts import ArtifactStore, build_artifact_store
 from .config import Settings
-from .db import get_engine
-
-
-FEATURE_COLS: List[str] = [
-    "alcohol",
-    "malic_acid",
-    "ash",
-    "alcalinity_of_ash",
-    "magnesium",
-    "total_phenols",
-    "flavanoids",
-    "nonflavanoid_phenols",
-    "proanthocyanins",
-    "color_intensity",
-    "hue",
-    "od280_od315_of_diluted_wines",
-    "proline",
-]
+from .dataset_cache import PartitionCache, UNDATED
+from .db import get_engine, iter_row_chunks, row_key_sql
+from .features import FEATURE_COLS
+from .metrics import INTERVAL_METRICS, SWEEP_METRICS, ConfusionAccumulator, compute_metrics, fold_summary
+
+
+def read_arrays(
+    engine: Engine,
+    settings: Settings,
+    where: str = "",
+    params: Optional[Dict[str, Any]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Stream feature rows into NumPy arrays.
+
+    Rows are fetched through a server-side cursor (see `db.iter_row_chunks`) in chunks
+    of `settings.load_chunk_rows` and copied straight into `X` (dtype
+    `settings.feature_dtype`) and `y`, without a DataFrame intermediate. The buffers
+    start at one chunk and double when full (no `COUNT(*)` pass to size them); the
+    slack is trimmed in place at the end.
+    """
+    params = params or {}
+    query = f"SELECT {', '.join(FEATURE_COLS)}, target FROM {settings.iris_table}{where}"
+    n_features = len(FEATURE_COLS)
+    X = np.empty((0, n_features), dtype=settings.feature_dtype)
+    y = np.empty(0, dtype=np.int64)
+    pos = 0
+    for block in iter_row_chunks(engine, query, params, settings.load_chunk_rows):
+        end = pos + len(block)
+        if end > len(y):
+            capacity = max(end, 2 * len(y))
+            X, y = _grow(X, capacity, pos), _grow(y, capacity, pos)
+        X[pos:end] = block[:, :n_features]
+        y[pos:end] = block[:, n_features]
+        pos = end
+    # Shrinks the allocation without a copy of the rows
+    X.resize((pos, n_features), refcheck=False)
+    y.resize(pos, refcheck=False)
+    return X, y
+
+
+def _grow(a: np.ndarray, rows: int, filled: int) -> np.ndarray:
+    grown = np.empty((rows, *a.shape[1:]), dtype=a.dtype)
+    grown[:filled] = a[:filled]
+    return grown
 
 
 def load_dataset(settings: Settings) -> Tuple[np.ndarray, np.ndarray]:
+    """Load features and labels from the feature table.
+
+    When `settings.dataset_cache_dir` is set, only partitions at or after the cached
+    watermark are fetched and merged into the local partition cache; the watermark
+    partition itself is re-read so rows appended to it later are picked up.
+    `settings.full_refresh` drops the cache and reloads the whole table.
+    """
     engine = get_engine(settings)
-    df = pd.read_sql(f"SELECT * FROM {settings.iris_table}", con=engine)
-    X = df[FEATURE_COLS].values
-    y = df["target"].values
+    if not settings.dataset_cache_dir:
+        return read_arrays(engine, settings)
+
+    cache = PartitionCache(settings.dataset_cache_dir, settings.iris_table)
+    if settings.full_refresh:
+        cache.clear()
+    since = cache.watermark()
+
+    query = f"SELECT DISTINCT ingestion_date FROM {settings.iris_table}"
+    params: Dict[str, Any] = {}
+    if since is not None:
+        query += " WHERE ingestion_date >= :since"
+        params["since"] = since
+    with engine.connect() as conn:
+        days = pd.to_datetime(pd.Series([r[0] for r in conn.execute(text(query), params)], dtype=object))
+
+    # Half-open day ranges also match date values stored as timestamps/text
+    for day in sorted(days.dropna().dt.normalize().unique()):
+        lo, hi = pd.Timestamp(day), pd.Timestamp(day) + pd.Timedelta(days=1)
+        X, y = read_arrays(
+            engine,
+            settings,
+            " WHERE ingestion_date >= :lo AND ingestion_date < :hi",
+            {"lo": f"{lo:%Y-%m-%d}", "hi": f"{hi:%Y-%m-%d}"},
+        )
+        cache.write_partition(f"{lo:%Y-%m-%d}", X, y)
+    if days.isna().any():
+        cache.write_partition(UNDATED, *read_arrays(engine, settings, " WHERE ingestion_date IS NULL"))
+
+    X, y = cache.load()
+    if X.size == 0:
+        X = X.reshape(0, len(FEATURE_COLS))
     return X, y
 
 
-def fit_model(settings: Settings, X: np.ndarray, y: np.ndarray):
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=settings.test_size, random_state=settings.random_state, stratify=y
-    )
+def latest_ingestion_date(engine: Engine, settings: Settings) -> Optional[str]:
+    with engine.connect() as conn:
+        latest = conn.execute(text(f"SELECT MAX(ingestion_date) FROM {settings.iris_table}")).scalar()
+    return f"{pd.Timestamp(latest):%Y-%m-%d}" if latest is not None else None
+
+
+def _rows_before(engine: Engine, settings: Settings, day: str) -> int:
+    """Rows of the partitions before `day`, from the per-partition drift stats when present.
+
+    Ingest and backfill record every partition's row count in `settings.stats_table`
+    (see `drift.write_stats`), which spares a `COUNT(*)` scan of the feature table;
+    the count is the fallback when no stats were written.
+    """
+    with engine.connect() as conn:
+        if engine.dialect.has_table(conn, settings.stats_table):
+            rows = conn.execute(
+                text(
+                    f"SELECT SUM(n) FROM (SELECT MAX(row_count) AS n FROM {settings.stats_table}"
+                    " WHERE ingestion_date < :day GROUP BY ingestion_date) AS days"
+                ),
+                {"day": day},
+            ).scalar()
+            if rows:
+                return int(rows)
+        query = f"SELECT COUNT(*) FROM {settings.iris_table} WHERE ingestion_date < :day"
+        return int(conn.execute(text(query), {"day": day}).scalar() or 0)
+
+
+def load_warm_start_dataset(settings: Settings, trained_through: str) -> Tuple[np.ndarray, np.ndarray, Dict[str, int]]:
+    """Rows of partitions after `trained_through` plus a replay sample of older rows.
+
+    The replay sample keeps about `settings.replay_rows` older rows, picked by row key
+    modulo with an offset that moves with `trained_through`, so successive runs
+    revisit different parts of the history.
+    """
+    engine = get_engine(settings)
+    after = f"{pd.Timestamp(trained_through) + pd.Timedelta(days=1):%Y-%m-%d}"
+    X_new, y_new = read_arrays(engine, settings, " WHERE ingestion_date >= :after", {"after": after})
+
+    X_old, y_old = np.empty((0, X_new.shape[1]), dtype=X_new.dtype), np.empty(0, dtype=y_new.dtype)
+    if settings.replay_rows > 0:
+        old_rows = _rows_before(engine, settings, after)
+        if old_rows:
+            step = -(-int(old_rows) // settings.replay_rows)  # ceil
+            offset = pd.Timestamp(trained_through).toordinal() % step
+            X_old, y_old = read_arrays(
+                engine,
+                settings,
+                f" WHERE ingestion_date < :after AND {row_key_sql(engine)} % :step = :offset",
+                {"after": after, "step": step, "offset": offset},
+            )
+    counts = {"new_rows": len(y_new), "replay_rows": len(y_old)}
+    return np.concatenate([X_new, X_old]), np.concatenate([y_new, y_old]), counts
+
+
+def load_training_set(settings: Settings, store: ArtifactStore) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    """Load the training data for this run, warm-start aware.
+
+    With `settings.warm_start`, when the published model was trained through an
+    earlier `ingestion_date` with the same model type as every sweep candidate, only
+    newer partitions plus a replay sample are loaded and `info["base_model"]` is the
+    published model's reference. Otherwise (or when nothing new arrived, or on
+    `settings.full_refresh`) the whole dataset is loaded.
+    """
+    engine = get_engine(settings)
+    info: Dict[str, Any] = {"trained_through": latest_ingestion_date(engine, settings), "base_model": None}
+    published = store.resolve("model") if settings.warm_start and not settings.full_refresh else None
+    if published is not None:
+        ref, metadata = published
+        model_names = {MODEL_NAMES.get(c["model_type"]) for c in expand_search_space(settings)}
+        if metadata.get("trained_through") and model_names == {metadata.get("params", {}).get("model")}:
+            X, y, counts = load_warm_start_dataset(settings, metadata["trained_through"])
+            if counts["new_rows"]:
+                return X, y, {**info, **counts, "base_model": asdict(ref)}
+    X, y = load_dataset(settings)
+    return X, y, {**info, "new_rows": len(y), "replay_rows": 0}
+
+
+def stage_training_set(settings: Settings, store: ArtifactStore, namespace: str) -> Dict[str, Any]:
+    """Load the training set (see `load_training_set`) and put `X`/`y` in the artifact store.
+
+    Returns their references (XCom-safe) together with the load info.
+    """
+    X, y, info = load_training_set(settings, store)
+    return {"X": asdict(store.put_array(namespace, "X", X)), "y": asdict(store.put_array(namespace, "y", y)), **info}
+
+
+MODEL_NAMES: Dict[str, str] = {
+    "logreg": "LogisticRegression",
+    "rf": "RandomForestClassifier",
+    "sgd": "SGDClassifier",
+    "nb": "GaussianNB",
+}
+
+# Model types trained out of core with `partial_fit` over chunks streamed from the table
+INCREMENTAL_MODELS = frozenset({"sgd", "nb"})
+
+
+# `settings.scaler` choices for LogisticRegression ("none" fits on raw features)
+SCALERS: Dict[str, Any] = {"standard": StandardScaler, "minmax": MinMaxScaler, "robust": RobustScaler}
+
+
+def is_incremental(model_type: str) -> bool:
+    return model_type in INCREMENTAL_MODELS
+
+
+def _check_sweep_metric(metric: str) -> None:
+    if metric not in SWEEP_METRICS:
+        raise ValueError(f"Unknown SWEEP_METRIC={metric}; use one of {', '.join(SWEEP_METRICS)}")
+
+
+def expand_search_space(settings: Settings) -> List[Dict[str, Any]]:
+    """Expand `settings.search_space` into a list of sweep candidates.
+
+    The search space is a JSON object mapping a model type to a grid of
+    hyperparameters, e.g. `{"logreg": {"C": [0.1, 1.0]}, "rf": {"max_depth": [null, 8]}}`.
+    Without a search space the single configured `model_type` is the only candidate.
+    `settings.sweep_metric` is checked here, before anything is fitted.
+    """
+    _check_sweep_metric(settings.sweep_metric)
+    if not settings.search_space:
+        return [{"model_type": settings.model_type, "params": {}}]
+    space = json.loads(settings.search_space)
+    candidates: List[Dict[str, Any]] = []
+    for model_type, grid in space.items():
+        if model_type not in MODEL_NAMES:
+            raise ValueError(f"Unknown model type in search space: {model_type}")
+        names = sorted(grid or {})
+        for values in itertools.product(*(grid[n] for n in names)):
+            candidates.append({"model_type": model_type, "params": dict(zip(names, values))})
+    return candidates
+
+
+def build_model(settings: Settings, model_type: str, hyperparams: Optional[Dict[str, Any]] = None):
+    """Return `(estimator, params)` where `params` is what gets logged to MLflow."""
+    hyperparams = dict(hyperparams or {})
+    if model_type == "rf":
+        kwargs: Dict[str, Any] = {"random_state": settings.random_state, "n_jobs": settings.n_jobs, **hyperparams}
+        model = RandomForestClassifier(**kwargs)
+    elif model_type == "sgd":
+        # Logistic loss for predict_proba; SGD needs standardized features
+        kwargs = {"loss": "log_loss", "random_state": settings.random_state, **hyperparams}
+        model = Pipeline([("scaler", StandardScaler()), ("clf", SGDClassifier(**kwargs))])
+    elif model_type == "nb":
+        kwargs = dict(hyperparams)
+        model = GaussianNB(**kwargs)
+    else:
+        kwargs = {"solver": settings.logreg_solver, "tol": settings.logreg_tol, "max_iter": settings.logreg_max_iter}
+        if settings.logreg_solver != "liblinear":
+            # liblinear is single-threaded and warns about n_jobs
+            kwargs["n_jobs"] = settings.n_jobs
+        kwargs.update(hyperparams)
+        model = LogisticRegression(**kwargs)
+        # Wine features span orders of magnitude (proline ~1e3, hue ~1): scaling them
+        # lets the solver converge in far fewer iterations. The scaler is pickled with
+        # the model, so scoring applies the same transform.
+        if settings.scaler != "none":
+            if settings.scaler not in SCALERS:
+                raise ValueError(f"Unsupported scaler: {settings.scaler} (choose from {', '.join([*SCALERS, 'none'])})")
+            model = Pipeline([("scaler", SCALERS[settings.scaler]()), ("clf", model)])
+        kwargs = {"scaler": settings.scaler, **kwargs}
+    return model, {"model": MODEL_NAMES.get(model_type, "LogisticRegression"), **kwargs}
+
+
+def fit_stats(model: Any, fit_seconds: float) -> Dict[str, float]:
+    """Fit time and, for iterative solvers, iterations used and whether they converged.
 
-    if settings.model_type == "rf":
-        model = RandomForestClassifier(random_state=settings.random_state)
-        params: Dict[str, Any] = {"model": "RandomForestClassifier", "random_state": settings.random_state}
+    Logged as MLflow metrics next to the evaluation metrics.
+    """
+    estimator = model.steps[-1][1] if isinstance(model, Pipeline) else model
+    stats = {"fit_seconds": float(fit_seconds)}
+    n_iter = getattr(estimator, "n_iter_", None)
+    if n_iter is not None:
+        stats["n_iter"] = float(np.max(n_iter))
+        max_iter = getattr(estimator, "max_iter", None)
+        if max_iter:
+            # Hitting the cap means the solver stopped before `tol` was reached
+            stats["converged"] = float(np.max(n_iter) < max_iter)
+    return stats
+
+
+def warm_start_model(settings: Settings, previous: Any, model: Any, y: np.ndarray) -> Optional[Any]:
+    """Prepare the previously trained `previous` to continue training as `model` would.
+
+    LogisticRegression reuses its coefficients as the solver's starting point;
+    RandomForest keeps its newest trees and grows `settings.warm_start_trees` new ones,
+    so the forest size stays at `n_estimators`. In a Pipeline only the final estimator
+    is continued; the scaler is refitted. Returns None when `previous` cannot be
+    continued (different estimator or scaler, feature count or classes).
+    """
+    if isinstance(model, Pipeline):
+        step_types = [type(step) for _, step in model.steps]
+        if not isinstance(previous, Pipeline) or [type(step) for _, step in previous.steps] != step_types:
+            return None
+        warm = warm_start_model(settings, previous.steps[-1][1], model.steps[-1][1], y)
+        if warm is None:
+            return None
+        return Pipeline([*model.steps[:-1], (model.steps[-1][0], warm)])
+    if type(previous) is not type(model) or not isinstance(model, (LogisticRegression, RandomForestClassifier)):
+        return None
+    if getattr(previous, "n_features_in_", None) != len(FEATURE_COLS):
+        return None
+    if not np.array_equal(np.unique(y), previous.classes_):
+        return None
+    params = model.get_params()
+    if isinstance(model, RandomForestClassifier):
+        keep = max(params["n_estimators"] - settings.warm_start_trees, 0)
+        previous.estimators_ = previous.estimators_[len(previous.estimators_) - keep :] if keep else []
+        params["n_estimators"] = len(previous.estimators_) + min(settings.warm_start_trees, params["n_estimators"])
+    previous.set_params(**{**params, "warm_start": True})
+    return previous
+
+
+def _save_model(store: ArtifactStore, namespace: str, model: Any):
+    tmp_dir = tempfile.mkdtemp(prefix="wine_model_")
+    try:
+        model_path = os.path.join(tmp_dir, "model.joblib")
+        joblib.dump(model, model_path)
+        return store.put_file(namespace, "model", model_path, move=True)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def fit_model(
+    settings: Settings,
+    X: np.ndarray,
+    y: np.ndarray,
+    store: Optional[ArtifactStore] = None,
+    namespace: str = "adhoc",
+    candidate: Optional[Dict[str, Any]] = None,
+    base_model_path: Optional[str] = None,
+    holdout_rows: Optional[int] = None,
+):
+    """Fit one candidate on in-memory `X`, `y` with a stratified holdout.
+
+    With `base_model_path` (warm start, see `warm_start_model`) training continues
+    from that model when it is compatible, otherwise it starts from scratch. With
+    `holdout_rows`, the holdout is drawn from the first `holdout_rows` rows only: the
+    new partitions of `load_warm_start_dataset`, so replayed rows the base model was
+    already trained on never inflate the holdout metrics (they all go to training).
+    """
+    _check_sweep_metric(settings.sweep_metric)
+    if holdout_rows is None or holdout_rows >= len(y):
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=settings.test_size, random_state=settings.random_state, stratify=y
+        )
     else:
-        model = LogisticRegression(max_iter=400, multi_class="auto")
-        params = {"model": "LogisticRegression", "max_iter": 400}
+        fresh_train, test_idx = train_test_split(
+            np.arange(holdout_rows),
+            test_size=settings.test_size,
+            random_state=settings.random_state,
+            stratify=y[:holdout_rows],
+        )
+        train_idx = np.concatenate([fresh_train, np.arange(holdout_rows, len(y))])
+        X_train, X_test, y_train, y_test = X[train_idx], X[test_idx], y[train_idx], y[test_idx]
 
+    candidate = candidate or {"model_type": settings.model_type, "params": {}}
+    model, params = build_model(settings, candidate["model_type"], candidate.get("params"))
+    if base_model_path:
+        warm = warm_start_model(settings, joblib.load(base_model_path), model, y_train)
+        params = {**params, "warm_start": warm is not None}
+        model = warm if warm is not None else model
+
+    started = time.perf_counter()
     model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
     y_pred = model.predict(X_test)
+    score = getattr(compute_metrics(y_test, y_pred)[0], settings.sweep_metric)
 
-    # Persist model to a temp path to avoid XCom heavy objects
-    tmp_dir = tempfile.mkdtemp(prefix="wine_model_")
-    model_path = os.path.join(tmp_dir, "model.joblib")
-    joblib.dump(model, model_path)
+    # Persist model to the artifact store to avoid XCom heavy objects
+    store = store or build_artifact_store(settings)
+    model_ref = _save_model(store, namespace, model)
 
-    # Important: make XCom-safe payload (avoid numpy arrays in XCom)
+    # Important: make XCom-safe payload. Arrays go to the artifact store as .npy;
+    # XCom only carries their references (path, shape, dtype, sha256).
     return {
-        "model_path": model_path,
+        "model_path": store.local_path(model_ref),
+        "model_ref": asdict(model_ref),
         "params": params,
-        "X_test": X_test.tolist(),
-        "y_test": y_test.tolist(),
-        "y_pred": y_pred.tolist(),
+        "candidate": candidate,
+        "score": float(score),
+        "X_test": asdict(store.put_array(namespace, "X_test", X_test)),
+        "y_test": asdict(store.put_array(namespace, "y_test", y_test)),
+        "y_pred": asdict(store.put_array(namespace, "y_pred", y_pred)),
         "features": FEATURE_COLS,
+        "fit_stats": fit_stats(model, fit_seconds),
     }
+
+
+def _fit_fold(
+    settings: Settings, candidate: Dict[str, Any], X_path: str, y_path: str, fold: int
+) -> Tuple[np.ndarray, float]:
+    # Runs in a pool worker: the arrays are memory-mapped from the .npy files, only
+    # paths and the fold number cross the process boundary
+    X = np.load(X_path, mmap_mode="r")
+    y = np.load(y_path, mmap_mode="r")
+    splitter = StratifiedKFold(settings.cv_folds, shuffle=True, random_state=settings.random_state)
+    train_idx, test_idx = list(splitter.split(np.zeros(len(y)), y))[fold]
+    model, _ = build_model(settings, candidate["model_type"], candidate.get("params"))
+    started = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_seconds = time.perf_counter() - started
+    acc = ConfusionAccumulator(np.unique(y)).update(y[test_idx], model.predict(X[test_idx]))
+    return acc.matrix, fit_seconds
+
+
+def _check_cv_metric(metric: str) -> None:
+    if metric not in INTERVAL_METRICS:
+        raise ValueError(
+            f"SWEEP_METRIC={metric} is not computed over cross-validation folds; "
+            f"use one of {', '.join(INTERVAL_METRICS)} or set CV_FOLDS=0"
+        )
+
+
+def cross_validate(
+    settings: Settings, X_path: str, y_path: str, candidate: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Stratified `settings.cv_folds`-fold cross-validation of one candidate.
+
+    `X_path`/`y_path` are `.npy` files (e.g. `ArtifactStore.local_path` of the
+    training arrays); each fold is fitted from scratch in a process pool of
+    `settings.cv_workers` workers that memory-map them, with one core per fit. The
+    folds' confusion matrices give the mean/std of `metrics.INTERVAL_METRICS` across
+    folds and bootstrap intervals over the pooled out-of-fold predictions (see
+    `metrics.fold_summary`).
+    """
+    folds = settings.cv_folds
+    if folds < 2:
+        raise ValueError(f"Cross-validation needs at least 2 folds, got {folds}")
+    # Checked before any fold is fitted: selection ranks on the fold mean of this metric
+    _check_cv_metric(settings.sweep_metric)
+    candidate = candidate or {"model_type": settings.model_type, "params": {}}
+    workers = min(settings.cv_workers or os.cpu_count() or 1, folds)
+    started = time.perf_counter()
+    if workers > 1:
+        fold_settings = replace(settings, n_jobs=1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_fit_fold, fold_settings, candidate, X_path, y_path, i) for i in range(folds)]
+            outputs = [f.result() for f in futures]
+    else:
+        outputs = [_fit_fold(settings, candidate, X_path, y_path, i) for i in range(folds)]
+    matrices = np.stack([matrix for matrix, _ in outputs])
+    return {
+        "folds": folds,
+        "workers": workers,
+        "wall_seconds": time.perf_counter() - started,
+        "fit_seconds": [float(seconds) for _, seconds in outputs],
+        "metrics": fold_summary(matrices, settings.bootstrap_samples, settings.ci_level, settings.random_state),
+        "confusion_matrix": matrices.sum(axis=0).tolist(),
+    }
+
+
+def hash_split(keys: np.ndarray, test_size: float, seed: int) -> np.ndarray:
+    """Holdout mask for row keys: a stable hash of `(key, seed)` below `test_size`.
+
+    Each row's side of the split depends only on its key, so the split is the same on
+    every pass over the table and for any chunking, without storing the holdout.
+    """
+    with np.errstate(over="ignore"):
+        # splitmix64 finalizer over key + seed
+        z = keys.astype(np.int64).astype(np.uint64) + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53) < test_size
+
+
+def _iter_split_chunks(engine: Engine, settings: Settings, holdout: bool) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    # (X, y) chunks of the train (holdout=False) or test side of the hash split
+    query = f"SELECT {row_key_sql(engine)}, {', '.join(FEATURE_COLS)}, target FROM {settings.iris_table}"
+    for block in iter_row_chunks(engine, query, chunk_rows=settings.load_chunk_rows):
+        rows = hash_split(block[:, 0], settings.test_size, settings.random_state) == holdout
+        if rows.any():
+            yield block[rows, 1:-1].astype(settings.feature_dtype), block[rows, -1].astype(np.int64)
+
+
+def fit_incremental(
+    settings: Settings,
+    store: Optional[ArtifactStore] = None,
+    namespace: str = "adhoc",
+    candidate: Optional[Dict[str, Any]] = None,
+):
+    """Train an incremental model (`INCREMENTAL_MODELS`) out of core.
+
+    Rows are streamed from the feature table in chunks of `settings.load_chunk_rows`
+    and split by `hash_split` on the row key. Pipeline transformers (the SGD scaler)
+    get one `partial_fit` pass over the training rows, then the classifier gets
+    `settings.incremental_epochs` `partial_fit` passes; a final pass predicts the
+    holdout. Only `y_test`/`y_pred` are kept in memory. Returns the same payload as
+    `fit_model` (without `X_test`).
+    """
+    candidate = candidate or {"model_type": settings.model_type, "params": {}}
+    if not is_incremental(candidate["model_type"]):
+        raise ValueError(f"Model type '{candidate['model_type']}' does not support partial_fit")
+    _check_sweep_metric(settings.sweep_metric)
+    model, params = build_model(settings, candidate["model_type"], candidate.get("params"))
+    steps = [step for _, step in model.steps] if isinstance(model, Pipeline) else [model]
+    transformers, clf = steps[:-1], steps[-1]
+
+    engine = get_engine(settings)
+    with engine.connect() as conn:
+        classes = np.array(
+            sorted(r[0] for r in conn.execute(text(f"SELECT DISTINCT target FROM {settings.iris_table}"))),
+            dtype=np.int64,
+        )
+
+    def transform(X: np.ndarray) -> np.ndarray:
+        for step in transformers:
+            X = step.transform(X)
+        return X
+
+    for i, step in enumerate(transformers):
+        for X, _ in _iter_split_chunks(engine, settings, holdout=False):
+            for prev in transformers[:i]:
+                X = prev.transform(X)
+            step.partial_fit(X)
+    started = time.perf_counter()
+    train_rows = 0
+    for _ in range(max(settings.incremental_epochs, 1)):
+        train_rows = 0
+        for X, y in _iter_split_chunks(engine, settings, holdout=False):
+            clf.partial_fit(transform(X), y, classes=classes)
+            train_rows += len(y)
+    if train_rows == 0:
+        raise ValueError(f"No training rows in {settings.iris_table}")
+    fit_seconds = time.perf_counter() - started
+
+    acc = ConfusionAccumulator(classes)
+    y_test_parts, y_pred_parts = [], []
+    for X, y in _iter_split_chunks(engine, settings, holdout=True):
+        pred = model.predict(X)
+        acc.update(y, pred)
+        y_test_parts.append(y)
+        y_pred_parts.append(pred)
+    y_test = np.concatenate(y_test_parts) if y_test_parts else np.empty(0, dtype=np.int64)
+    y_pred = np.concatenate(y_pred_parts) if y_pred_parts else np.empty(0, dtype=np.int64)
+    score = getattr(acc.metrics(), settings.sweep_metric)
+
+    store = store or build_artifact_store(settings)
+    model_ref = _save_model(store, namespace, model)
+    return {
+        "model_path": store.local_path(model_ref),
+        "model_ref": asdict(model_ref),
+        "params": {**params, "train_rows": train_rows, "split": "hash"},
+        "candidate": candidate,
+        "score": float(score),
+        "X_test": None,
+        "y_test": asdict(store.put_array(namespace, "y_test", y_test)),
+        "y_pred": asdict(store.put_array(namespace, "y_pred", y_pred)),
+        "features": FEATURE_COLS,
+        # Classifier passes only; the scaler pass is part of the task's `fit` stage
+        "fit_stats": {"fit_seconds": float(fit_seconds)},
+    }
+
+
+def select_best(results: List[Dict[str, Any]], metric: str = "accuracy") -> Dict[str, Any]:
+    """Reduce sweep results to the best one (highest `score`); ties keep the first.
+
+    When every result is cross-validated (`cv`), they are compared on their mean
+    `metric` over folds instead of the single holdout score; a sweep where only some
+    candidates have folds (incremental models skip them) is compared on holdout
+    scores, so all candidates are ranked on the same basis. The returned result
+    carries a `candidates` summary of every fit for logging.
+    """
+    results = list(results)
+    if not results:
+        raise ValueError("No sweep results to select from")
+    use_cv = all(r.get("cv") for r in results)
+    if use_cv:
+        _check_cv_metric(metric)
+
+    def score(result: Dict[str, Any]) -> float:
+        return result["cv"]["metrics"][f"{metric}_mean"] if use_cv else result["score"]
+
+    best = max(results, key=score)
+    basis = "cv" if use_cv else "holdout"
+    summary = [{"params": r["params"], "metric": metric, "basis": basis, "score": score(r)} for r in results]
+    return {**best, "candidates": summary}
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Optional, Dict, Any
+from dataclasses import dataclass, field
+from typing import List, Optional, Dict, Any, Tuple
 
 
 @dataclass(frozen=True)
@@ -24,9 +24,50 @@ class EvalMetrics:
     precision_weighted: float
     recall_weighted: float
     confusion_matrix_path: Optional[str] = None
+    f1_weighted: float = 0.0
+    precision_macro: float = 0.0
+    recall_macro: float = 0.0
+    f1_macro: float = 0.0
+    # {label: {"precision", "recall", "f1", "support"}}
+    per_class: Dict[str, Dict[str, float]] = field(default_factory=dict)
 
 
 @dataclass(frozen=True)
 class MlflowResult:
     run_id: Optional[str]
     error: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ArtifactRef:
+    # XCom carries `dataclasses.asdict(ref)`; rebuild with `ArtifactRef(**payload)`
+    key: str
+    uri: str
+    sha256: str
+    size_bytes: int
+    shape: Optional[Tuple[int, ...]] = None
+    dtype: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class StagePerf:
+    # One profiled pipeline stage; a row of `settings.perf_table`
+    stage: str
+    started_at: float  # epoch seconds
+    wall_seconds: float
+    cpu_seconds: float
+    peak_rss_mb: float
+    rows_processed: int = 0
+    bytes_read: Optional[int] = None
+    bytes_written: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class RuleResult:
+    # Outcome of one validation rule on one partition; a row of `settings.validation_table`
+    rule: str
+    column: Optional[str]
+    failed_rows: int
+    row_count: int
+    passed: bool
+    detail: str = ""
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from datetime import date
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from .config import Settings
+from .db import partition_writer
+from .features import FEATURE_BOUNDS, FEATURE_COLS, TARGET_CLASSES
+from .types import RuleResult
+
+
+VALIDATION_MODES = ("fail", "warn", "off")
+
+
+@dataclass(frozen=True)
+class Rule:
+    """One declarative check on a feature-table column.
+
+    `kind` is "not_null", "range" (`low` <= value <= `high`) or "allowed_values"
+    (value in `values`). Each rule compiles to one `SUM(CASE ...)` aggregate counting
+    the violating rows, so any number of rules runs as a single scan.
+    """
+
+    kind: str
+    column: str
+    low: Optional[float] = None
+    high: Optional[float] = None
+    values: Tuple[int, ...] = ()
+
+    @property
+    def name(self) -> str:
+        return f"{self.kind}({self.column})"
+
+    def failed_rows_sql(self) -> str:
+        col = self.column
+        if self.kind == "not_null":
+            condition = f"{col} IS NULL"
+        elif self.kind == "range":
+            # NULLs are left to "not_null"; Postgres sorts NaN above every number
+            condition = f"{col} < {self.low!r} OR {col} > {self.high!r}"
+        elif self.kind == "allowed_values":
+            condition = f"{col} NOT IN ({', '.join(str(v) for v in self.values)})"
+        else:
+            raise ValueError(f"Unknown validation rule kind: {self.kind}")
+        return f"SUM(CASE WHEN {condition} THEN 1 ELSE 0 END)"
+
+    def describe(self) -> str:
+        if self.kind == "range":
+            return f"outside [{self.low:g}, {self.high:g}]"
+        if self.kind == "allowed_values":
+            return f"not in {list(self.values)}"
+        return "NULL"
+
+
+def default_rules() -> List[Rule]:
+    """Rules derived from the feature schema: `FEATURE_COLS`, `FEATURE_BOUNDS`, `TARGET_CLASSES`."""
+    rules: List[Rule] = []
+    for col in FEATURE_COLS:
+        low, high = FEATURE_BOUNDS[col]
+        rules += [Rule("not_null", col), Rule("range", col, low, high)]
+    rules += [Rule("not_null", "target"), Rule("allowed_values", "target", values=TARGET_CLASSES)]
+    return rules
+
+
+class ValidationError(ValueError):
+    """Raised when partitions fail validation; `results` holds the full per-rule report."""
+
+    def __init__(self, results: Dict[str, List[RuleResult]]) -> None:
+        self.results = results
+        failed = [f"{day} {r.rule}: {r.detail}" for day, rs in results.items() for r in rs if not r.passed]
+        shown = failed[:20] + ([f"... and {len(failed) - 20} more"] if len(failed) > 20 else [])
+        super().__init__(f"{len(failed)} validation rule(s) failed:\n" + "\n".join(shown))
+
+
+def validate_partitions(
+    engine: Engine, settings: Settings, days: Iterable[date], rules: Optional[List[Rule]] = None
+) -> Dict[str, List[RuleResult]]:
+    """Check the `days` partitions of the feature table against `rules`.
+
+    The schema (required columns present) is checked from the catalog; all value rules
+    of all days then run as one aggregate query grouped by `ingestion_date`, pushed down
+    to the database, so no rows are transferred. Every day also needs at least one row.
+    Returns `{YYYY-MM-DD: [RuleResult, ...]}`.
+    """
+    days = sorted(set(days))
+    rules = default_rules() if rules is None else rules
+    keys = [f"{d:%Y-%m-%d}" for d in days]
+    if not days:
+        return {}
+
+    columns = {c["name"] for c in inspect(engine).get_columns(settings.iris_table)}
+    required = list(dict.fromkeys([*FEATURE_COLS, "target", "ingestion_date", *(r.column for r in rules)]))
+    schema = [
+        RuleResult("schema", col, 0, 0, col in columns, "" if col in columns else "column missing") for col in required
+    ]
+    rules = [r for r in rules if r.column in columns]
+
+    counts: Dict[str, List[int]] = {key: [0] * (len(rules) + 1) for key in keys}
+    if "ingestion_date" in columns:
+        hi = pd.Timestamp(days[-1]) + pd.Timedelta(days=1)
+        aggregates = ", ".join(["COUNT(*)", *(r.failed_rows_sql() for r in rules)])
+        query = text(
+            f"SELECT ingestion_date, {aggregates} FROM {settings.iris_table}"
+            " WHERE ingestion_date >= :lo AND ingestion_date < :hi GROUP BY ingestion_date"
+        )
+        with engine.connect() as conn:
+            rows = conn.execute(query, {"lo": keys[0], "hi": f"{hi:%Y-%m-%d}"}).fetchall()
+        for day, *values in rows:
+            # Date values may come back as timestamps/text (e.g. SQLite)
+            key = str(day)[:10]
+            if key in counts:
+                counts[key] = [a + int(b or 0) for a, b in zip(counts[key], values)]
+
+    results: Dict[str, List[RuleResult]] = {}
+    for key in keys:
+        n_rows, *failed = counts[key]
+        day_results = [RuleResult(r.rule, r.column, r.failed_rows, n_rows, r.passed, r.detail) for r in schema]
+        day_results.append(RuleResult("min_rows", None, 0, n_rows, n_rows > 0, "" if n_rows else "no rows"))
+        for rule, n_failed in zip(rules, failed):
+            detail = f"{n_failed} of {n_rows} rows {rule.describe()}" if n_failed else ""
+            day_results.append(RuleResult(rule.name, rule.column, n_failed, n_rows, n_failed == 0, detail))
+        results[key] = day_results
+    return results
+
+
+def write_results(engine: Engine, settings: Settings, results: Dict[str, List[RuleResult]], **run_fields: Any) -> int:
+    """Replace the validation rows of the partitions in `results`; `run_fields` go on every row."""
+    rows = [
+        {**run_fields, "ingestion_date": date.fromisoformat(day), **asdict(r)}
+        for day, day_results in results.items()
+        for r in day_results
+    ]
+    if not rows:
+        return 0
+    frame = pd.DataFrame(rows).rename(columns={"column": "column_name"})
+    frame["validated_at"] = pd.Timestamp.now(tz="UTC").tz_localize(None)
+    with partition_writer(engine, settings.validation_table, [date.fromisoformat(d) for d in results]) as write:
+        return write(frame)
+
+
+def run_validation(engine: Engine, settings: Settings, days: Iterable[date], **run_fields: Any) -> Dict[str, Any]:
+    """Validate `days`, record the results and apply `settings.validation_mode`.
+
+    "fail" raises `ValidationError` when any rule fails, "warn" only reports it and
+    "off" skips validation. Returns a small XCom-safe summary.
+    """
+    if settings.validation_mode not in VALIDATION_MODES:
+        raise ValueError(f"Unsupported validation mode: {settings.validation_mode} (choose from {VALIDATION_MODES})")
+    if settings.validation_mode == "off":
+        return {"partitions": 0, "rules": 0, "failed": []}
+    results = validate_partitions(engine, settings, days)
+    write_results(engine, settings, results, **run_fields)
+    failed = [f"{day} {r.rule}" for day, rs in results.items() for r in rs if not r.passed]
+    if failed and settings.validation_mode == "fail":
+        raise ValidationError(results)
+    return {"partitions": len(results), "rules": sum(len(rs) for rs in results.values()), "failed": failed}
@@ -0,0 +1,98 @@
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+def test_local_store_roundtrip_is_content_addressed_and_mmapped(tmp_path):
+    from dags.iris_pipeline.artifacts import LocalArtifactStore
+
+    store = LocalArtifactStore(str(tmp_path))
+    arr = np.arange(12, dtype=np.float32).reshape(3, 4)
+
+    ref = store.put_array("run_1", "X", arr)
+    again = store.put_array("run_1", "X", arr.copy())
+    assert ref == again
+    assert ref.shape == (3, 4) and ref.dtype == "float32"
+    assert ref.key.startswith("run_1/X-") and ref.sha256[:16] in ref.key
+
+    loaded = store.get_array(ref)
+    assert isinstance(loaded, np.memmap)
+    np.testing.assert_array_equal(loaded, arr)
+
+    other = store.put_array("run_1", "X", arr + 1)
+    assert other.key != ref.key
+
+
+def test_put_file_and_gc_by_retention(tmp_path):
+    from dags.iris_pipeline.artifacts import LocalArtifactStore
+
+    store = LocalArtifactStore(str(tmp_path / "store"))
+    src = tmp_path / "model.joblib"
+    src.write_bytes(b"model-bytes")
+
+    old = store.put_file("old_run", "model", str(src))
+    new = store.put_file("new_run", "model", str(src), move=True)
+    assert not src.exists()
+    assert Path(store.local_path(new)).read_bytes() == b"model-bytes"
+
+    stale = time.time() - 7200
+    os.utime(os.path.join(store.root, "old_run"), (stale, stale))
+    removed = store.gc(retention_seconds=3600, keep=["new_run"])
+    assert removed == ["old_run"]
+    assert not os.path.exists(store.local_path(old))
+    assert os.path.exists(store.local_path(new))
+
+
+def test_confusion_matrix_csv_and_cleanup_helpers(tmp_path):
+    import pandas as pd
+
+    from dags.iris_pipeline.artifacts import LocalArtifactStore, cleanup_expired, put_confusion_matrix
+    from dags.iris_pipeline.config import Settings
+
+    settings = Settings(artifact_root=str(tmp_path / "store"), artifact_retention_hours=1)
+    store = LocalArtifactStore(settings.artifact_root)
+    path = put_confusion_matrix(store, "old_run", [[5, 1], [0, 7]])
+    # Same layout as DataFrame.to_csv(index=False)
+    assert Path(path).read_text() == "0,1\n5,1\n0,7\n"
+    pd.testing.assert_frame_equal(pd.read_csv(path), pd.DataFrame([[5, 1], [0, 7]]).rename(columns=str))
+
+    put_confusion_matrix(store, "this_run", [[1]])
+    stale = time.time() - 7200
+    for name in ("old_run", "this_run"):
+        os.utime(os.path.join(store.root, name), (stale, stale))
+    assert cleanup_expired(settings, keep=["this_run"]) == ["old_run"]
+
+
+def test_build_artifact_store_rejects_unknown_scheme():
+    import pytest
+
+    from dags.iris_pipeline.artifacts import LocalArtifactStore, build_artifact_store
+    from dags.iris_pipeline.config import Settings
+
+    assert isinstance(build_artifact_store(Settings(artifact_root="file:///tmp/x")), LocalArtifactStore)
+    with pytest.raises(ValueError):
+        build_artifact_store(Settings(artifact_root="s3://bucket/prefix"))
+
+
+def test_publish_repoints_latest_and_survives_gc(tmp_path):
+    from dags.iris_pipeline.artifacts import LocalArtifactStore
+
+    store = LocalArtifactStore(str(tmp_path))
+    assert store.resolve("model") is None
+
+    src = tmp_path / "m.joblib"
+    refs = []
+    for i in range(3):
+        src.write_bytes(f"model-{i}".encode())
+        refs.append(store.publish("model", store.put_file(f"run_{i}", "model", str(src)), metadata={"i": i}))
+
+    ref, meta = store.resolve("model")
+    assert ref == refs[-1] and meta == {"i": 2}
+    # Current and previous versions are kept, older ones pruned
+    assert os.path.exists(store.local_path(refs[1]))
+    assert not os.path.exists(store.local_path(refs[0]))
+
+    store.gc(retention_seconds=-1)
+    assert Path(store.local_path(store.resolve("model")[0])).read_bytes() == b"model-2"
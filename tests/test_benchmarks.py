@@ -0,0 +1,67 @@
+def test_benchmark_stages_run_and_report(tmp_path):
+    from benchmarks import run
+
+    results = [run.measure(stage, 500, str(tmp_path)) for stage in run.STAGES]
+
+    assert [r["stage"] for r in results] == list(run.STAGES)
+    for result in results:
+        assert result["rows"] == 500
+        assert result["wall_s"] > 0 and result["rows_per_s"] > 0
+        assert result["peak_rss_mb"] >= result["setup_rss_mb"] > 0
+
+
+def test_compare_flags_slowdowns_beyond_tolerance():
+    from benchmarks.run import compare
+
+    baseline = [
+        {"stage": "fit_model", "rows": 1000, "wall_s": 1.0, "peak_rss_mb": 100.0},
+        {"stage": "compute_metrics", "rows": 1000, "wall_s": 0.001, "peak_rss_mb": 100.0},
+    ]
+    results = [
+        {"stage": "fit_model", "rows": 1000, "wall_s": 1.5, "peak_rss_mb": 110.0},
+        # tiny timings are compared against the noise floor
+        {"stage": "compute_metrics", "rows": 1000, "wall_s": 0.004, "peak_rss_mb": 100.0},
+        {"stage": "write_iris", "rows": 1000, "wall_s": 9.0, "peak_rss_mb": 100.0},
+    ]
+
+    regressions = compare(results, baseline, tolerance=0.25)
+
+    assert [(r["stage"], r["metric"]) for r in regressions] == [("fit_model", "wall_s")]
+
+
+def test_missing_baseline_fails_before_running(tmp_path, capsys):
+    import pytest
+
+    from benchmarks import run
+
+    with pytest.raises(SystemExit) as exc:
+        run.main(["--sizes", "1e3", "--workdir", str(tmp_path), "--baseline", str(tmp_path / "bench.json")])
+    assert exc.value.code == 2
+    assert "record one first with --output" in capsys.readouterr().err
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_serving_load_generator_reports_latency_percentiles(tmp_path):
+    import asyncio
+
+    from benchmarks import serving as bench
+    from dags.iris_pipeline.config import Settings
+    from dags.iris_pipeline.serving import PredictionServer
+
+    rows = bench.publish_model(str(tmp_path / "artifacts"), rows=600)
+
+    async def scenario():
+        server = await PredictionServer(Settings(artifact_root=str(tmp_path / "artifacts"))).start("127.0.0.1", 0)
+        try:
+            result = await bench.generate_load("127.0.0.1", server.port, rows, requests=300, concurrency=8)
+            return result, server.health()
+        finally:
+            await server.close()
+
+    result, health = asyncio.run(scenario())
+
+    assert result["requests"] == 300 and result["errors"] == 0
+    latency = result["latency_ms"]
+    assert 0 < latency["p50"] <= latency["p90"] <= latency["p99"] <= latency["max"]
+    # Concurrent requests shared predict calls
+    assert health["rows"] == 300 and health["batches"] < 300
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+DAGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dags")
+
+# Modules the scheduler must not pay for when it parses the DAG file
+HEAVY_MODULES = {"numpy", "pandas", "sklearn", "scipy", "joblib", "mlflow", "pyarrow"}
+
+# Generous bound on top of Airflow's own import cost (a heavy import alone takes seconds)
+PARSE_BUDGET_SECONDS = 1.0
+
+_PROBE = """
+import json, sys, time
+import airflow.decorators, airflow.operators.python
+before = {m.split(".")[0] for m in sys.modules}
+start = time.perf_counter()
+module = __import__(sys.argv[1])
+elapsed = time.perf_counter() - start
+after = {m.split(".")[0] for m in sys.modules}
+print(json.dumps({"elapsed": elapsed, "new": sorted(after - before), "tasks": len(module.dag.task_ids)}))
+"""
+
+
+@pytest.mark.parametrize("dag_module", ["iris_mlflow_dag", "iris_backfill_dag"])
+def test_dag_parse_is_fast_and_imports_no_heavy_modules(tmp_path, dag_module):
+    pytest.importorskip("airflow")
+
+    # Fresh interpreter so modules imported by other tests do not hide the DAG's imports
+    env = dict(os.environ, AIRFLOW_HOME=str(tmp_path), PYTHONPATH=DAGS_DIR, PYTHONWARNINGS="ignore")
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE, dag_module], cwd=DAGS_DIR, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert proc.returncode == 0, proc.stderr
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    assert result["tasks"] > 0
+    assert not HEAVY_MODULES & set(result["new"]), result["new"]
+    assert result["elapsed"] < PARSE_BUDGET_SECONDS, result
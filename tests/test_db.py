@@ -0,0 +1,103 @@
+def test_get_engine_is_cached_per_conn_id(monkeypatch):
+    from sqlalchemy import create_engine
+
+    from dags.iris_pipeline import db
+    from dags.iris_pipeline.config import Settings
+
+    created = []
+
+    class FakeHook:
+        def __init__(self, postgres_conn_id):
+            self.conn_id = postgres_conn_id
+
+        def get_sqlalchemy_engine(self, engine_kwargs=None):
+            created.append((self.conn_id, engine_kwargs))
+            return create_engine("sqlite://")
+
+    monkeypatch.setattr(db, "PostgresHook", FakeHook)
+    db.dispose_engines()
+    try:
+        first = db.get_engine(Settings(postgres_conn_id="a", db_pool_size=3))
+        assert db.get_engine(Settings(postgres_conn_id="a")) is first
+        assert db.get_engine(Settings(postgres_conn_id="b")) is not first
+        assert [c[0] for c in created] == ["a", "b"]
+        assert created[0][1] == {"pool_size": 3, "pool_pre_ping": True, "pool_recycle": 1800}
+    finally:
+        db.dispose_engines()
+
+
+def test_ensure_tables_runs_ddl_once_per_process(tmp_path):
+    from dataclasses import replace
+
+    from sqlalchemy import create_engine, event, inspect
+
+    from dags.iris_pipeline import db
+    from dags.iris_pipeline.config import Settings
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'wine.db'}")
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    settings = Settings(iris_table="wine_data", eval_table="wine_evaluation", predictions_table="wine_predictions")
+
+    db.dispose_engines()
+    try:
+        db.ensure_tables(engine, settings)
+        db.ensure_tables(engine, settings)
+        assert sum("CREATE TABLE" in s for s in statements) == 6
+        assert {"wine_data", "wine_evaluation", "wine_predictions"} <= set(inspect(engine).get_table_names())
+        # Another layout of the same tables is not covered by the first run
+        db.ensure_tables(engine, replace(settings, real_features=True))
+        assert sum("CREATE TABLE" in s for s in statements) == 12
+    finally:
+        db.dispose_engines()
+
+
+def test_forked_child_drops_inherited_pools_without_closing_them(tmp_path):
+    import os
+
+    from sqlalchemy import create_engine, text
+
+    from dags.iris_pipeline import db
+    from dags.iris_pipeline.config import Settings
+
+    settings = Settings(postgres_conn_id="fork")
+    engine = create_engine(f"sqlite:///{tmp_path / 'wine.db'}")
+    db.register_engine(settings, engine)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        pool = engine.pool
+        pid = os.fork()
+        if pid == 0:
+            # Child: cache emptied, the pool replaced, and the parent's checked-in connection untouched
+            ok = settings.postgres_conn_id not in db._ENGINES and engine.pool is not pool and not db._LOCK.locked()
+            os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.WEXITSTATUS(status) == 0
+        # Parent keeps its engine and pooled connection
+        assert db._ENGINES[settings.postgres_conn_id] is engine and engine.pool is pool
+        assert pool.checkedin() == 1
+    finally:
+        db.dispose_engines()
+
+
+def test_write_evaluation_appends_metrics_and_intervals(tmp_path):
+    from datetime import date
+
+    import pandas as pd
+    from sqlalchemy import create_engine
+
+    from dags.iris_pipeline import db
+    from dags.iris_pipeline.config import Settings
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'wine.db'}")
+    settings = Settings(eval_table="wine_evaluation")
+    db.ensure_tables(engine, settings)
+    metrics = {"accuracy": 0.9, "precision_weighted": 0.91, "recall_weighted": 0.9, "accuracy_ci_low": 0.85}
+    row = db.write_evaluation(engine, settings, "run-1", metrics, date(2025, 1, 31))
+    db.write_evaluation(engine, settings, None, {**metrics, "cv_folds": 5}, date(2025, 2, 1))
+
+    assert row["accuracy_ci_low"] == 0.85 and row["accuracy_mean"] is None and row["cv_folds"] is None
+    stored = pd.read_sql("SELECT run_id, accuracy, cv_folds, accuracy_ci_low FROM wine_evaluation", engine)
+    assert stored["run_id"].tolist() == ["run-1", None] and stored["cv_folds"].tolist()[1] == 5
+    assert stored["accuracy_ci_low"].tolist() == [0.85, 0.85]
@@ -0,0 +1,106 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+
+def test_feature_stats_merge_matches_single_pass():
+    from dags.iris_pipeline.drift import DRIFT_BINS, FeatureStats
+    from dags.iris_pipeline.features import FEATURE_COLS
+    from dags.iris_pipeline.ingest import iter_synthetic_wine
+
+    df = pd.concat(iter_synthetic_wine(5_000, "2024-01-01", chunk_rows=5_000), ignore_index=True)
+    X = df[FEATURE_COLS].to_numpy()
+    X[0, 0] = np.nan  # skipped, not counted
+
+    whole = FeatureStats().update(X)
+    merged = FeatureStats().update(X[:1_234]).merge(FeatureStats().update(X[1_234:]))
+    for name in ("count", "total", "total_sq", "minimum", "maximum", "hist"):
+        np.testing.assert_allclose(getattr(whole, name), getattr(merged, name))
+
+    assert whole.hist.shape == (len(FEATURE_COLS), DRIFT_BINS + 2)
+    assert whole.count[0] == 4_999 and whole.count[1] == 5_000
+    assert (whole.hist.sum(axis=1) == whole.count).all()
+    np.testing.assert_allclose(whole.mean(), np.nanmean(X, axis=0))
+    np.testing.assert_allclose(whole.std(), np.nanstd(X, axis=0), rtol=1e-6)
+
+
+def test_drift_scores_flag_shifted_partition_and_gate_training(tmp_path):
+    from dataclasses import replace
+
+    from sqlalchemy import create_engine
+
+    from dags.iris_pipeline import db, drift
+    from dags.iris_pipeline.config import Settings
+    from dags.iris_pipeline.ingest import iter_synthetic_wine
+
+    settings = Settings(postgres_conn_id="drift", stats_table="wine_feature_stats", drift_threshold=0.2)
+    engine = create_engine(f"sqlite:///{tmp_path / 'wine.db'}")
+    db.ensure_tables(engine, settings)
+
+    # Stats are accumulated per ingestion_date while the chunks stream past
+    stats = {}
+    chunks = [df for ds in ("2024-01-01", "2024-01-02", "2024-01-03") for df in iter_synthetic_wine(2_000, ds, 700)]
+    assert sum(len(df) for df in drift.observe(chunks, stats)) == 6_000
+    assert sorted(stats) == [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)]
+    assert all(s.rows == 2_000 for s in stats.values())
+
+    # Shifted alcohol on the 4th day
+    shifted = pd.concat(iter_synthetic_wine(2_000, "2024-01-04", 2_000), ignore_index=True)
+    shifted["alcohol"] += 1.0
+    stats.update(drift.frame_stats(shifted))
+    assert drift.write_stats(engine, settings, stats) == 4 * 13
+    # Rewriting a day replaces its rows
+    drift.write_stats(engine, settings, {date(2024, 1, 3): stats[date(2024, 1, 3)]})
+    assert pd.read_sql("SELECT COUNT(*) AS n FROM wine_feature_stats", engine)["n"][0] == 4 * 13
+
+    stable = drift.check_drift(engine, settings, "2024-01-03")
+    assert stable["reference_rows"] == 4_000 and stable["max_psi"] < 0.05
+    assert not drift.retrain_needed(settings, stable)
+
+    moved = drift.check_drift(engine, settings, "2024-01-04")
+    assert moved["features"]["alcohol"]["psi"] > 1.0 and moved["features"]["alcohol"]["ks"] > 0.3
+    assert max(v["psi"] for k, v in moved["features"].items() if k != "alcohol") < 0.05
+    assert moved["features"]["alcohol"]["mean"] - moved["features"]["alcohol"]["ref_mean"] > 0.9
+    assert drift.retrain_needed(settings, moved)
+
+    # No reference yet, or gating disabled: always train
+    assert drift.check_drift(engine, settings, "2024-01-01") is None
+    assert drift.retrain_needed(settings, None)
+    assert drift.retrain_needed(replace(settings, drift_threshold=0.0), stable)
+
+
+def test_reference_window_stays_on_the_published_models_training_data(tmp_path):
+    from dataclasses import replace
+
+    from sqlalchemy import create_engine
+
+    from dags.iris_pipeline import db, drift
+    from dags.iris_pipeline.config import Settings
+    from dags.iris_pipeline.ingest import iter_synthetic_wine
+
+    settings = Settings(postgres_conn_id="drift", stats_table="wine_feature_stats", drift_threshold=0.2)
+    engine = create_engine(f"sqlite:///{tmp_path / 'wine.db'}")
+    db.ensure_tables(engine, settings)
+
+    # Alcohol creeps up a little every day after the model was trained (through 2024-01-02)
+    stats = {}
+    for i, ds in enumerate(["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05", "2024-01-06"]):
+        df = pd.concat(iter_synthetic_wine(2_000, ds, 2_000), ignore_index=True)
+        df["alcohol"] += 0.15 * max(i - 1, 0)
+        stats.update(drift.frame_stats(df))
+    drift.write_stats(engine, settings, stats)
+
+    # Day over day the change stays under the threshold...
+    sliding = drift.check_drift(engine, replace(settings, drift_reference_days=1), "2024-01-06")
+    assert not drift.retrain_needed(settings, sliding)
+    # ...but against the training window it has added up
+    anchored = drift.check_drift(engine, settings, "2024-01-06", trained_through="2024-01-02")
+    assert anchored["reference_end"] == "2024-01-02" and anchored["reference_rows"] == 4_000
+    assert anchored["features"]["alcohol"]["psi"] > sliding["features"]["alcohol"]["psi"]
+    assert drift.retrain_needed(settings, anchored)
+
+    # A model trained through ds (a re-run) still compares against the days before it
+    rerun = drift.check_drift(engine, settings, "2024-01-03", trained_through="2024-01-03")
+    assert rerun["reference_end"] == "2024-01-02"
+
@@ -15,3 +15,125 @@ def test_ingest_rename_and_date():
     # ingestion_date set and normalized to date
     assert "ingestion_date" in df.columns
     assert pd.to_datetime(df["ingestion_date"]).dt.time.eq(pd.to_datetime(ds).normalize().time()).all()
+
+
+def test_write_iris_replaces_partition_on_rerun(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+
+    from dags.iris_pipeline import ingest
+    from dags.iris_pipeline.config import Settings
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'wine.db'}")
+    monkeypatch.setattr(ingest, "get_engine", lambda settings: engine)
+    settings = Settings(iris_table="wine_data")
+
+    ingest.write_iris(settings, ingest.load_iris_df("2024-01-01"))
+    ingest.write_iris(settings, ingest.load_iris_df("2024-01-02"))
+    # Simulated retry of the same ds
+    ingest.write_iris(settings, ingest.load_iris_df("2024-01-02"))
+
+    counts = pd.read_sql("SELECT ingestion_date, COUNT(*) AS n FROM wine_data GROUP BY ingestion_date", engine)
+    assert counts["n"].tolist() == [178, 178]
+
+
+def test_synthetic_wine_chunks_are_deterministic_and_wine_shaped():
+    import numpy as np
+
+    from dags.iris_pipeline.ingest import iter_synthetic_wine, load_iris_df
+
+    chunks = list(iter_synthetic_wine(25_000, "2024-01-03", chunk_rows=10_000))
+    assert [len(c) for c in chunks] == [10_000, 10_000, 5_000]
+    df = pd.concat(chunks, ignore_index=True)
+    real = load_iris_df()
+    assert list(df.columns) == list(real.columns) + ["ingestion_date"]
+    assert (df["ingestion_date"] == pd.Timestamp("2024-01-03")).all()
+
+    # Same ds -> same rows (retries are idempotent); class names follow the labels
+    again = pd.concat(iter_synthetic_wine(25_000, "2024-01-03", chunk_rows=10_000), ignore_index=True)
+    pd.testing.assert_frame_equal(df, again)
+    assert (df["target_name"] == np.asarray(["class_0", "class_1", "class_2"])[df["target"]]).all()
+
+    # Class proportions and per-class means follow the real data
+    share = df["target"].value_counts(normalize=True).sort_index()
+    np.testing.assert_allclose(share, real["target"].value_counts(normalize=True).sort_index(), atol=0.02)
+    means = df.groupby("target")["alcohol"].mean()
+    np.testing.assert_allclose(means, real.groupby("target")["alcohol"].mean(), rtol=0.02)
+
+
+def test_write_iris_chunks_replaces_partition_on_rerun(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+
+    from dags.iris_pipeline import ingest
+    from dags.iris_pipeline.config import Settings
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'wine.db'}")
+    monkeypatch.setattr(ingest, "get_engine", lambda settings: engine)
+    settings = Settings(iris_table="wine_data")
+    day = pd.Timestamp("2024-01-02").date()
+
+    for _ in range(2):
+        rows = ingest.write_iris_chunks(settings, ingest.iter_synthetic_wine(1_000, "2024-01-02", chunk_rows=300), [day])
+        assert rows == 1_000
+
+    assert pd.read_sql("SELECT COUNT(*) AS n FROM wine_data", engine)["n"].item() == 1_000
+
+
+def test_copy_dataframe_streams_csv_chunks():
+    from dags.iris_pipeline.db import copy_dataframe
+    from dags.iris_pipeline.ingest import load_iris_df
+
+    class FakeCursor:
+        def __init__(self):
+            self.calls = []
+
+        def copy_expert(self, sql, fh):
+            self.calls.append((sql, fh.read()))
+
+    cursor = FakeCursor()
+    df = load_iris_df("2024-01-02")
+    assert copy_dataframe(cursor, "wine_data", df, chunk_rows=100) == 178
+
+    assert len(cursor.calls) == 2
+    sql, payload = cursor.calls[0]
+    assert sql.startswith("COPY wine_data (alcohol, malic_acid")
+    assert "FORMAT csv" in sql
+    assert payload.count("\n") == 100
+    assert "2024-01-02" in payload
+
+
+def test_compact_layout_stores_labels_once_and_loads_for_training(tmp_path):
+    import numpy as np
+    from sqlalchemy import create_engine, inspect
+
+    from dags.iris_pipeline import db, ingest, train
+    from dags.iris_pipeline.config import Settings
+
+    settings = Settings(
+        postgres_conn_id="compact",
+        iris_table="wine_data",
+        compact_schema=True,
+        real_features=True,
+        feature_dtype="float32",
+    )
+    engine = create_engine(f"sqlite:///{tmp_path / 'wine.db'}")
+    db.register_engine(settings, engine)
+    db.ensure_tables(engine, settings)
+
+    columns = {c["name"]: str(c["type"]) for c in inspect(engine).get_columns("wine_data")}
+    assert "target_name" not in columns
+    assert columns["target"] == "SMALLINT" and columns["alcohol"] == "REAL"
+
+    ingest.write_iris(settings, ingest.load_iris_df("2024-01-01", labels=False))
+    # Frames that still carry names are narrowed too; labels are not inserted twice
+    ingest.write_iris(settings, ingest.load_iris_df("2024-01-02"))
+    chunks = ingest.iter_synthetic_wine(500, "2024-01-03", chunk_rows=200, labels=False)
+    ingest.write_iris_chunks(settings, chunks, [pd.Timestamp("2024-01-03").date()])
+
+    labels = pd.read_sql("SELECT target, target_name FROM wine_labels ORDER BY target", engine)
+    assert labels["target_name"].tolist() == ["class_0", "class_1", "class_2"]
+
+    X, y = train.load_dataset(settings)
+    assert X.shape == (2 * 178 + 500, 13) and X.dtype == np.float32
+    wine = ingest.load_iris_df()
+    np.testing.assert_allclose(X[:178], wine[train.FEATURE_COLS].to_numpy(), rtol=1e-6)
+    assert (y[:178] == wine["target"].to_numpy()).all()
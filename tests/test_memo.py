@@ -0,0 +1,87 @@
+import numpy as np
+from sklearn import datasets
+
+
+def test_fingerprint_tracks_content_not_row_ids(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine, text
+
+    from dags.iris_pipeline import ingest, memo
+    from dags.iris_pipeline.config import Settings
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'wine.db'}")
+    monkeypatch.setattr(ingest, "get_engine", lambda settings: engine)
+    settings = Settings(iris_table="wine_data")
+
+    ingest.write_iris(settings, ingest.load_iris_df("2024-01-01"))
+    first = memo.data_fingerprint(engine, settings)
+    # Re-ingesting the same day (new row ids, same content) keeps the fingerprint
+    ingest.write_iris(settings, ingest.load_iris_df("2024-01-01"))
+    assert memo.data_fingerprint(engine, settings) == first
+
+    ingest.write_iris(settings, ingest.load_iris_df("2024-01-02"))
+    second = memo.data_fingerprint(engine, settings)
+    assert second != first
+
+    # Swapping the labels of a class-0 and a class-1 row keeps every column sum
+    with engine.begin() as conn:
+        a, b = (
+            conn.execute(text(f"SELECT MIN(rowid) FROM wine_data WHERE target = {label}")).scalar()
+            for label in (0, 1)
+        )
+        conn.execute(text(f"UPDATE wine_data SET target = 1 - target WHERE rowid IN ({a}, {b})"))
+    swapped = memo.data_fingerprint(engine, settings)
+    assert swapped != second
+    # A small correction to one value is not rounded away
+    with engine.begin() as conn:
+        conn.execute(text(f"UPDATE wine_data SET alcohol = alcohol + 1e-5 WHERE rowid = {a}"))
+    assert memo.data_fingerprint(engine, settings) not in (second, swapped)
+    with engine.begin() as conn:
+        conn.execute(text(f"UPDATE wine_data SET alcohol = alcohol - 1e-5 WHERE rowid = {a}"))
+        conn.execute(text(f"UPDATE wine_data SET target = 1 - target WHERE rowid IN ({a}, {b})"))
+    assert memo.data_fingerprint(engine, settings) == second
+
+    candidate = {"model_type": "logreg", "params": {}}
+    key = memo.cache_key(second, settings, candidate)
+    assert key == memo.cache_key(second, Settings(iris_table="wine_data"), dict(candidate))
+    assert key != memo.cache_key(second, Settings(iris_table="wine_data", random_state=7), candidate)
+    # Warm-start settings change what `fit` produces from the same base model
+    for change in ({"replay_rows": 10}, {"warm_start_trees": 5}):
+        assert key != memo.cache_key(second, Settings(iris_table="wine_data", **change), candidate)
+    assert key != memo.cache_key(second, settings, {"model_type": "rf", "params": {}})
+
+
+def test_result_cache_round_trip_and_lru_eviction(tmp_path):
+    import os
+
+    from dags.iris_pipeline.artifacts import MEMO_NAMESPACE, LocalArtifactStore
+    from dags.iris_pipeline.config import Settings
+    from dags.iris_pipeline.memo import ResultCache
+    from dags.iris_pipeline.train import fit_model
+    from dags.iris_pipeline.types import ArtifactRef
+
+    wine = datasets.load_wine()
+    store = LocalArtifactStore(str(tmp_path))
+    cache = ResultCache(store, max_entries=2)
+    result = fit_model(Settings(), wine.data, wine.target, store=store, namespace="run_1")
+    assert cache.get("a") is None
+
+    cache.put_result("a", result)
+    store.gc(0)  # run namespaces are collected; the memo copies survive
+    cached = cache.get("a")["result"]
+    assert cached["memo_key"] == "a" and cached["X_test"] is None
+    assert os.path.exists(cached["model_path"]) and f"/{MEMO_NAMESPACE}/" in cached["model_path"]
+    y_pred = store.get_array(ArtifactRef(**cached["y_pred"]))
+    assert y_pred.shape == tuple(result["y_pred"]["shape"])
+
+    cache.put_metrics("a", {"metrics": {"accuracy": 1.0}, "confusion_matrix_path": None})
+    cache.put_mlflow_run("a", "run-123")
+    entry = cache.get("a")
+    assert entry["metrics"]["metrics"] == {"accuracy": 1.0} and entry["mlflow_run_id"] == "run-123"
+
+    # Two more entries with the same (content-addressed) artifacts; "a" stays most recently used
+    for key in ("b", "c"):
+        cache.put_result(key, cached)
+        cache.get("a")
+    assert store.list_json(MEMO_NAMESPACE) == ["a", "c"]
+    # Artifacts still referenced by surviving entries are not deleted with "b"
+    np.testing.assert_array_equal(store.get_array(ArtifactRef(**cache.get("c")["result"]["y_pred"])), y_pred)
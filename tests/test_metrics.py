@@ -12,3 +12,69 @@ def test_compute_metrics_basic():
     assert abs(eval_metrics.accuracy - 0.75) < 1e-9
     # confusion matrix shape (2x2) for classes {0,1}
     assert cm.shape == (2, 2)
+
+
+def test_compute_metrics_matches_sklearn():
+    from sklearn.metrics import confusion_matrix, f1_score, precision_score, recall_score
+
+    from dags.iris_pipeline.metrics import compute_metrics
+
+    rng = np.random.default_rng(0)
+    y_true = rng.integers(0, 4, size=1000)
+    y_pred = np.where(rng.random(1000) < 0.7, y_true, rng.integers(0, 5, size=1000))
+    m, cm = compute_metrics(y_true, y_pred, chunk_size=97)
+
+    np.testing.assert_array_equal(cm, confusion_matrix(y_true, y_pred))
+    for average in ("weighted", "macro"):
+        assert np.isclose(getattr(m, f"precision_{average}"), precision_score(y_true, y_pred, average=average, zero_division=0))
+        assert np.isclose(getattr(m, f"recall_{average}"), recall_score(y_true, y_pred, average=average, zero_division=0))
+        assert np.isclose(getattr(m, f"f1_{average}"), f1_score(y_true, y_pred, average=average, zero_division=0))
+    assert m.per_class["4"]["support"] == 0 and m.per_class["4"]["precision"] == 0.0
+
+
+def test_confusion_accumulators_merge_across_label_sets():
+    from dags.iris_pipeline.metrics import ConfusionAccumulator, compute_metrics
+
+    y_true = np.array([0, 1, 2, 2, 1, 0])
+    y_pred = np.array([0, 2, 2, 1, 1, 0])
+    left = ConfusionAccumulator().update(y_true[:2], y_pred[:2])
+    right = ConfusionAccumulator().update(y_true[2:], y_pred[2:])
+    merged = left.merge(right)
+
+    expected, cm = compute_metrics(y_true, y_pred)
+    np.testing.assert_array_equal(merged.matrix, cm)
+    assert merged.metrics() == expected
+
+
+def test_bootstrap_intervals_resample_confusion_cells():
+    from dags.iris_pipeline.metrics import (
+        INTERVAL_COLUMNS,
+        ConfusionAccumulator,
+        bootstrap_intervals,
+        confusion_metrics,
+        fold_summary,
+    )
+
+    rng = np.random.default_rng(1)
+    y_true = rng.integers(0, 3, size=400)
+    y_pred = np.where(rng.random(400) < 0.8, y_true, rng.integers(0, 3, size=400))
+    acc = ConfusionAccumulator().update(y_true, y_pred)
+    m = acc.metrics()
+
+    # Stacked matrices are scored like ConfusionAccumulator.metrics()
+    stacked = confusion_metrics(np.stack([acc.matrix, acc.matrix]))
+    assert stacked["accuracy"].shape == (2,)
+    for name in ("accuracy", "precision_weighted", "recall_weighted", "f1_weighted"):
+        assert np.isclose(stacked[name][0], getattr(m, name))
+
+    ci = bootstrap_intervals(acc.matrix, n_samples=4000, level=0.9, seed=3)
+    assert ci["accuracy_ci_low"] < m.accuracy < ci["accuracy_ci_high"]
+    # Same interval as resampling the rows themselves
+    idx = rng.integers(0, 400, size=(4000, 400))
+    row_level = np.quantile((y_true[idx] == y_pred[idx]).mean(axis=1), [0.05, 0.95])
+    np.testing.assert_allclose([ci["accuracy_ci_low"], ci["accuracy_ci_high"]], row_level, atol=0.01)
+    assert bootstrap_intervals(acc.matrix, n_samples=0) == {}
+
+    summary = fold_summary(np.stack([acc.matrix, acc.matrix]), n_samples=500)
+    assert set(summary) == set(INTERVAL_COLUMNS)
+    assert np.isclose(summary["accuracy_mean"], m.accuracy) and summary["accuracy_std"] == 0.0
@@ -1,3 +1,6 @@
+import os
+
+
 def test_noop_logger_returns_none_run_id():
     from dags.iris_pipeline.mlflow_utils import NoOpMetricsLogger
 
@@ -11,3 +14,129 @@ def test_noop_logger_returns_none_run_id():
     )
     assert res.run_id is None
     assert res.error is None
+
+
+def _install_fake_mlflow_entities(monkeypatch):
+    import sys
+    import types
+    from collections import namedtuple
+
+    entities = types.ModuleType("mlflow.entities")
+    entities.Metric = namedtuple("Metric", "key value timestamp step")
+    entities.Param = namedtuple("Param", "key value")
+    entities.RunTag = namedtuple("RunTag", "key value")
+    monkeypatch.setitem(sys.modules, "mlflow", types.ModuleType("mlflow"))
+    monkeypatch.setitem(sys.modules, "mlflow.entities", entities)
+
+
+class _FakeClient:
+    def __init__(self, fail_uploads=0):
+        import threading
+        from types import SimpleNamespace
+
+        self.calls = []
+        self.fail_uploads = fail_uploads
+        self._lock = threading.Lock()
+        self._ns = SimpleNamespace
+        self.runs = 0
+
+    def _record(self, *call):
+        with self._lock:
+            self.calls.append(call)
+
+    def get_experiment_by_name(self, name):
+        self._record("get_experiment_by_name", name)
+        return self._ns(experiment_id="7")
+
+    def create_run(self, experiment_id, tags=None):
+        with self._lock:
+            self.runs += 1
+            run_id = f"run-{self.runs}"
+        self._record("create_run", experiment_id, tags)
+        return self._ns(info=self._ns(run_id=run_id))
+
+    def log_batch(self, run_id, metrics=(), params=(), tags=()):
+        self._record("log_batch", run_id, list(metrics), list(params), list(tags))
+
+    def log_artifact(self, run_id, path, artifact_path=None):
+        with self._lock:
+            if self.fail_uploads:
+                self.fail_uploads -= 1
+                raise IOError("tracking server busy")
+        self._record("log_artifact", run_id, path, artifact_path)
+
+    def set_terminated(self, run_id, status):
+        self._record("set_terminated", run_id, status)
+
+
+def test_batched_logger_single_batch_background_uploads_and_cached_experiment(tmp_path, monkeypatch):
+    from dags.iris_pipeline import mlflow_utils
+
+    _install_fake_mlflow_entities(monkeypatch)
+    monkeypatch.setattr(mlflow_utils, "_EXPERIMENT_IDS", {})
+    client = _FakeClient(fail_uploads=1)
+    logger = mlflow_utils.BatchedMLflowMetricsLogger(
+        "http://tracking", "WineClassifier", max_retries=2, retry_backoff=0, client_factory=lambda uri: client
+    )
+    model_path = tmp_path / "model.joblib"
+    model_path.write_bytes(b"serialized")
+
+    for _ in range(2):
+        res = logger.log_all(
+            params={"model": "LogisticRegression", "max_iter": 400},
+            metrics={"accuracy": 0.9},
+            model_path=str(model_path),
+            features=["f1", "f2"],
+        )
+        assert res.error is None
+    assert logger.flush() == []
+
+    names = [c[0] for c in client.calls]
+    assert names.count("get_experiment_by_name") == 1
+    assert names.count("log_batch") == 2
+    batch = next(c for c in client.calls if c[0] == "log_batch")
+    assert {p.key for p in batch[3]} == {"model", "max_iter"} and batch[2][0].key == "accuracy"
+    uploads = [c for c in client.calls if c[0] == "log_artifact"]
+    assert ("log_artifact", "run-1", str(model_path), "model") in uploads
+    assert len(uploads) == 4  # model + features per run, one retried
+    assert sorted(c[1] for c in client.calls if c[0] == "set_terminated") == ["run-1", "run-2"]
+    # features.txt is written to a scratch dir (removed after upload), not next to the model
+    features = [c[2] for c in uploads if c[2].endswith("features.txt")]
+    assert features and all(not path.startswith(str(tmp_path)) for path in features)
+    assert not any(os.path.exists(path) for path in features)
+    assert sorted(os.listdir(tmp_path)) == ["model.joblib"]
+
+
+def test_batched_logger_flush_waits_for_run_termination(tmp_path, monkeypatch):
+    import time
+
+    from dags.iris_pipeline import mlflow_utils
+
+    _install_fake_mlflow_entities(monkeypatch)
+    monkeypatch.setattr(mlflow_utils, "_EXPERIMENT_IDS", {})
+
+    class SlowClient(_FakeClient):
+        def log_artifact(self, run_id, path, artifact_path=None):
+            time.sleep(0.01)
+            super().log_artifact(run_id, path, artifact_path)
+
+    client = SlowClient()
+    logger = mlflow_utils.BatchedMLflowMetricsLogger(
+        "http://tracking", "WineClassifier", max_workers=2, client_factory=lambda uri: client
+    )
+    model_path = tmp_path / "model.joblib"
+    model_path.write_bytes(b"serialized")
+    for _ in range(20):
+        logger.log_all(params={}, metrics={"accuracy": 0.9}, model_path=str(model_path), features=["f1"])
+        # Every run is closed by the time flush returns, even right after logging
+        assert logger.flush() == []
+        closed = {c[1] for c in client.calls if c[0] == "set_terminated"}
+        assert closed == {f"run-{i + 1}" for i in range(client.runs)}
+
+
+def test_async_logging_is_opt_in():
+    from dags.iris_pipeline.config import Settings
+    from dags.iris_pipeline.mlflow_utils import BatchedMLflowMetricsLogger, MLflowMetricsLogger, build_metrics_logger
+
+    assert type(build_metrics_logger(Settings())) is MLflowMetricsLogger
+    assert isinstance(build_metrics_logger(Settings(mlflow_async_logging=True)), BatchedMLflowMetricsLogger)
@@ -0,0 +1,71 @@
+def test_profile_stage_records_and_round_trips_through_table():
+    import time
+
+    from sqlalchemy import create_engine, text
+
+    from dags.iris_pipeline import db, perf
+    from dags.iris_pipeline.config import Settings
+
+    perf.drain()
+    with perf.profile_stage("fit") as stage:
+        sum(i * i for i in range(200_000))
+        time.sleep(0.01)
+        stage.rows = 178
+    with perf.profile_stage("fit") as other:
+        other.rows = 22
+
+    record = stage.result
+    assert record.stage == "fit" and record.rows_processed == 178
+    assert record.wall_seconds >= 0.01 and record.cpu_seconds > 0 and record.peak_rss_mb > 0
+
+    settings = Settings(perf_table="wine_task_perf")
+    engine = create_engine("sqlite://")
+    db.ensure_tables(engine, settings)
+    written = perf.write_perf(
+        engine, settings.perf_table, perf.drain(), dag_id="d", dag_run_id="r1", task_id="training.fit", map_index=0
+    )
+    assert written == 2 and perf.drain() == []
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM wine_task_perf WHERE stage = 'fit'")).scalar() == 2
+
+    metrics = perf.perf_metrics(perf.load_run_perf(engine, settings.perf_table, "r1"))
+    assert metrics["perf.fit.rows_processed"] == 200
+    assert metrics["perf.fit.peak_rss_mb"] == max(stage.result.peak_rss_mb, other.result.peak_rss_mb)
+    assert perf.load_run_perf(engine, settings.perf_table, "other-run") == []
+
+
+def test_record_task_perf_writes_task_rows_and_never_raises(monkeypatch):
+    from datetime import date
+    from types import SimpleNamespace
+
+    from sqlalchemy import create_engine, text
+
+    from dags.iris_pipeline import db, perf
+    from dags.iris_pipeline.config import Settings
+
+    settings = Settings(postgres_conn_id="perf_task", perf_table="wine_task_perf")
+    engine = create_engine("sqlite://")
+    db.register_engine(settings, engine)
+    db.ensure_tables(engine, settings)
+    context = {
+        "dag": SimpleNamespace(dag_id="iris_backfill_dag"),
+        "run_id": "manual__1",
+        "ti": SimpleNamespace(task_id="train_window", map_index=3),
+    }
+
+    perf.drain()
+    with perf.profile_stage("fit") as stage:
+        stage.rows = 10
+    assert perf.record_task_perf(settings, context, date(2025, 1, 31)) == 1
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT dag_id, task_id, map_index, execution_date FROM wine_task_perf")).one()
+    assert tuple(row[:3]) == ("iris_backfill_dag", "train_window", 3) and str(row[3]).startswith("2025-01-31")
+
+    # A database error is reported, not raised
+    def unreachable(settings):
+        raise ConnectionError("database is down")
+
+    monkeypatch.setattr(perf, "get_engine", unreachable)
+    with perf.profile_stage("persist"):
+        pass
+    assert perf.record_task_perf(settings, context, date(2025, 1, 31)) == 0
@@ -0,0 +1,37 @@
+from datetime import date
+
+
+def test_partitioned_iris_table_and_daily_partition_ddl():
+    from dags.iris_pipeline import schemas
+
+    assert "PARTITION BY RANGE (ingestion_date)" not in schemas.create_iris_table_sql("wine_data")
+    assert "PARTITION BY RANGE (ingestion_date)" in schemas.create_iris_table_sql("wine_data", partitioned=True)
+
+    ddl = schemas.create_iris_partition_sql("wine_data", date(2024, 12, 31))
+    assert "wine_data_p20241231" in ddl
+    assert "FROM ('2024-12-31') TO ('2025-01-01')" in ddl
+
+
+def test_index_ddl():
+    from dags.iris_pipeline import schemas
+
+    assert "USING brin (ingestion_date)" in schemas.create_iris_indexes_sql("wine_data")[0]
+    eval_idx = " ".join(schemas.create_eval_indexes_sql("wine_evaluation"))
+    assert "(execution_date)" in eval_idx and "(run_id)" in eval_idx
+    # Interval columns on new tables, added to existing ones
+    assert "accuracy_ci_low double precision" in schemas.create_eval_table_sql("wine_evaluation")
+    alters = schemas.add_eval_interval_columns_sql("wine_evaluation")
+    assert alters[0] == "ALTER TABLE wine_evaluation ADD COLUMN IF NOT EXISTS cv_folds integer"
+    assert len(alters) == 13
+
+
+def test_compact_iris_table_ddl():
+    from dags.iris_pipeline import schemas
+
+    default = schemas.create_iris_table_sql("wine_data")
+    assert "target integer" in default and "target_name text" in default and "alcohol double precision" in default
+
+    compact = schemas.create_iris_table_sql("wine_data", compact=True, real_features=True)
+    assert "target smallint" in compact and "target_name" not in compact
+    assert "alcohol real" in compact and "proline real" in compact
+    assert "PRIMARY KEY" in schemas.create_labels_table_sql("wine_labels")
@@ -0,0 +1,65 @@
+import pandas as pd
+from sklearn import datasets
+
+
+def test_score_new_partitions_scores_each_partition_once(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+
+    from dags.iris_pipeline import db, ingest, scoring
+    from dags.iris_pipeline.artifacts import LocalArtifactStore
+    from dags.iris_pipeline.config import Settings
+    from dags.iris_pipeline.train import fit_model
+    from dags.iris_pipeline.types import ArtifactRef
+
+    settings = Settings(
+        iris_table="wine_data",
+        predictions_table="wine_predictions",
+        artifact_root=str(tmp_path / "artifacts"),
+        scoring_workers=2,
+        scoring_chunk_rows=50,
+    )
+    engine = create_engine(f"sqlite:///{tmp_path / 'wine.db'}")
+    monkeypatch.setattr(ingest, "get_engine", lambda s: engine)
+    monkeypatch.setattr(scoring, "get_engine", lambda s: engine)
+
+    # Nothing published yet: nothing to do
+    assert scoring.score_new_partitions(settings)["rows_scored"] == 0
+
+    wine = datasets.load_wine()
+    store = LocalArtifactStore(settings.artifact_root)
+    result = fit_model(settings, wine.data, wine.target, store=store)
+    store.publish("model", ArtifactRef(**result["model_ref"]))
+
+    ingest.write_iris(settings, ingest.load_iris_df("2024-01-01"))
+    ingest.write_iris(settings, ingest.load_iris_df("2024-01-02"))
+    db.ensure_tables(engine, settings)
+
+    out = scoring.score_new_partitions(settings)
+    assert out["partitions"] == ["2024-01-01", "2024-01-02"]
+    assert out["rows_scored"] == 356
+
+    preds = pd.read_sql("SELECT * FROM wine_predictions", engine)
+    assert preds["row_id"].is_unique
+    assert set(preds["prediction"]) <= {0, 1, 2}
+    assert preds["probabilities"].iloc[0].startswith("{") and preds["probabilities"].iloc[0].count(",") == 2
+
+    # Already scored: no work; a new partition is scored on its own
+    assert scoring.score_new_partitions(settings)["partitions"] == []
+    ingest.write_iris(settings, ingest.load_iris_df("2024-01-03"))
+    assert scoring.score_new_partitions(settings)["partitions"] == ["2024-01-03"]
+    assert pd.read_sql("SELECT COUNT(*) AS n FROM wine_predictions", engine)["n"][0] == 3 * 178
+
+    # Re-ingesting a day replaces its rows with new row keys but the same count: re-scored
+    ingest.write_iris(settings, ingest.load_iris_df("2024-01-03"))
+    assert scoring.score_new_partitions(settings)["partitions"] == ["2024-01-03"]
+    preds = pd.read_sql("SELECT row_id FROM wine_predictions WHERE ingestion_date >= '2024-01-03'", engine)
+    rows = pd.read_sql("SELECT rowid AS row_id FROM wine_data WHERE ingestion_date >= '2024-01-03'", engine)
+    assert sorted(preds["row_id"]) == sorted(rows["row_id"])
+    assert scoring.score_new_partitions(settings)["partitions"] == []
+
+    # Re-ingesting an older day (e.g. a backfill) drops its predictions; they are rebuilt
+    ingest.write_iris(settings, ingest.load_iris_df("2024-01-01"))
+    assert scoring.score_new_partitions(settings)["partitions"] == ["2024-01-01"]
+    counts = pd.read_sql("SELECT ingestion_date, COUNT(*) AS n FROM wine_predictions GROUP BY ingestion_date", engine)
+    assert counts["n"].tolist() == [178, 178, 178]
+    assert scoring.score_new_partitions(settings)["partitions"] == []
@@ -0,0 +1,155 @@
+import asyncio
+import json
+
+import numpy as np
+from sklearn import datasets
+
+
+def _publish(store, settings, X, y, **params):
+    from dags.iris_pipeline.train import fit_model
+    from dags.iris_pipeline.types import ArtifactRef
+
+    result = fit_model(settings, X, y, store=store, candidate={"model_type": "logreg", "params": params})
+    return store.publish("model", ArtifactRef(**result["model_ref"]), metadata={"trained_through": "2024-01-01"})
+
+
+def test_micro_batches_concurrent_requests_and_hot_swaps(tmp_path):
+    from dags.iris_pipeline import serving
+    from dags.iris_pipeline.artifacts import LocalArtifactStore
+    from dags.iris_pipeline.config import Settings
+
+    wine = datasets.load_wine()
+    settings = Settings(artifact_root=str(tmp_path / "artifacts"), n_jobs=1)
+    store = LocalArtifactStore(settings.artifact_root)
+    cache = serving.ModelCache(store)
+    assert cache.refresh() is False and cache.current is None
+
+    first = _publish(store, settings, wine.data, wine.target)
+    assert cache.refresh() is True and cache.refresh() is False
+    expected = cache.current.model.predict_proba(wine.data)
+
+    async def scenario():
+        batcher = serving.MicroBatcher(cache, max_batch=64, max_wait_ms=5)
+        runner = asyncio.create_task(batcher.run())
+        await asyncio.sleep(0)
+        # 178 single-row requests at once
+        results = await asyncio.gather(*(batcher.predict(wine.data[i : i + 1]) for i in range(len(wine.data))))
+        batches = batcher.batches
+
+        second = _publish(store, settings, wine.data, wine.target, C=0.01)
+        assert cache.refresh() is True
+        _, _, swapped = await batcher.predict(wine.data[:2])
+        runner.cancel()
+        batcher.close()
+        return results, batches, swapped, second
+
+    results, batches, swapped, second = asyncio.run(scenario())
+    np.testing.assert_allclose(np.vstack([proba for _, proba, _ in results]), expected)
+    assert [int(pred[0]) for pred, _, _ in results] == expected.argmax(axis=1).tolist()
+    assert {loaded.sha256 for _, _, loaded in results} == {first.sha256}
+    # Coalesced into at most max_batch rows per predict call
+    assert 3 <= batches < 20
+    assert swapped.sha256 == second.sha256 != first.sha256
+
+
+def test_http_predict_health_and_errors(tmp_path):
+    from dags.iris_pipeline import serving
+    from dags.iris_pipeline.artifacts import LocalArtifactStore
+    from dags.iris_pipeline.config import Settings
+    from dags.iris_pipeline.features import FEATURE_COLS
+
+    wine = datasets.load_wine()
+    settings = Settings(artifact_root=str(tmp_path / "artifacts"), n_jobs=1)
+    store = LocalArtifactStore(settings.artifact_root)
+
+    async def call(writer, reader, method, path, body=b""):
+        writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while (line := await reader.readline()) != b"\r\n":
+            name, _, value = line.decode().partition(":")
+            headers[name.lower()] = value.strip()
+        return status, json.loads(await reader.readexactly(int(headers["content-length"])))
+
+    async def scenario():
+        server = await serving.PredictionServer(settings, store).start("127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        body = json.dumps({"features": wine.data[0].tolist()}).encode()
+        responses = {"no_model": await call(writer, reader, "POST", "/predict", body)}
+        published = _publish(store, settings, wine.data, wine.target)
+        assert await server.refresh()
+        # Same keep-alive connection throughout
+        row = dict(zip(FEATURE_COLS, wine.data[0].tolist()))
+        responses["named"] = await call(writer, reader, "POST", "/predict", json.dumps({"features": row}).encode())
+        body = json.dumps({"instances": wine.data[:3].tolist()}).encode()
+        responses["instances"] = await call(writer, reader, "POST", "/predict", body)
+        responses["bad"] = await call(writer, reader, "POST", "/predict", b'{"features": [1, 2]}')
+        responses["not_json"] = await call(writer, reader, "POST", "/predict", b"{")
+        responses["health"] = await call(writer, reader, "GET", "/health")
+        responses["unknown"] = await call(writer, reader, "GET", "/nope")
+
+        def broken(X):
+            raise ValueError("X has 13 features, but the model expects 12")
+
+        server.cache.current.model.predict_proba = broken
+        responses["model_error"] = await call(writer, reader, "POST", "/predict", body)
+        # The connection survives a failed prediction
+        responses["after_error"] = await call(writer, reader, "GET", "/health")
+        writer.close()
+        await server.close()
+        return responses, published
+
+    responses, published = asyncio.run(scenario())
+    assert responses["no_model"] == (503, {"error": "No published model"})
+    status, named = responses["named"]
+    assert status == 200 and named["model_sha256"] == published.sha256
+    assert named["classes"] == [0, 1, 2] and named["predictions"] == [int(wine.target[0])]
+    assert len(named["probabilities"][0]) == 3
+    status, many = responses["instances"]
+    assert status == 200 and len(many["predictions"]) == 3
+    assert responses["bad"][0] == 400 and "13 feature values" in responses["bad"][1]["error"]
+    assert responses["not_json"][0] == 400
+    status, health = responses["health"]
+    assert status == 200 and health["status"] == "ok" and health["trained_through"] == "2024-01-01"
+    assert health["requests"] == 5 and health["rows"] == 4
+    assert responses["unknown"][0] == 404
+    status, error = responses["model_error"]
+    assert status == 500 and "expects 12" in error["error"]
+    assert responses["after_error"][0] == 200
+
+
+def test_http_rejects_bad_or_oversized_content_length(tmp_path):
+    from dags.iris_pipeline import serving
+    from dags.iris_pipeline.artifacts import LocalArtifactStore
+    from dags.iris_pipeline.config import Settings
+
+    settings = Settings(artifact_root=str(tmp_path / "artifacts"), n_jobs=1, serving_max_body_bytes=64)
+    store = LocalArtifactStore(settings.artifact_root)
+
+    async def call(server, length):
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(f"POST /predict HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while (line := await reader.readline()) != b"\r\n":
+            name, _, value = line.decode().partition(":")
+            headers[name.lower()] = value.strip()
+        body = json.loads(await reader.readexactly(int(headers["content-length"])))
+        # The unread body must not be parsed as the next request
+        closed = await reader.read() == b""
+        writer.close()
+        return status, body, headers["connection"], closed
+
+    async def scenario():
+        server = await serving.PredictionServer(settings, store).start("127.0.0.1", 0)
+        results = {length: await call(server, length) for length in ("abc", "-1", "65", str(10**12))}
+        await server.close()
+        return results
+
+    results = asyncio.run(scenario())
+    for length in ("abc", "-1"):
+        status, body, connection, closed = results[length]
+        assert status == 400 and "Content-Length" in body["error"] and connection == "close" and closed
+    for length in ("65", str(10**12)):
+        status, body, connection, closed = results[length]
+        assert status == 413 and "64 bytes" in body["error"] and connection == "close" and closed
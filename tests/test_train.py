@@ -2,7 +2,7 @@ import numpy as np
 from sklearn import datasets
 
 
-def _get_settings(model_type: str):
+def _get_settings(model_type: str, **overrides):
     from dags.iris_pipeline.config import Settings
 
     return Settings(
@@ -14,31 +14,329 @@ def _get_settings(model_type: str):
         test_size=0.2,
         random_state=42,
         mlflow_tracking_uri=None,
+        **overrides,
     )
 
 
-def test_fit_model_logreg_returns_expected_keys():
+def test_fit_model_logreg_returns_expected_keys(tmp_path):
+    from dags.iris_pipeline.artifacts import LocalArtifactStore
     from dags.iris_pipeline.train import fit_model
 
     wine = datasets.load_wine()
     X = wine.data
     y = wine.target
     settings = _get_settings("logreg")
-    result = fit_model(settings, X, y)
+    result = fit_model(settings, X, y, store=LocalArtifactStore(str(tmp_path)))
 
     for key in ("model_path", "params", "X_test", "y_test", "y_pred", "features"):
         assert key in result
-    assert len(result["y_test"]) == len(result["y_pred"])  # type: ignore[index]
+    assert result["y_test"]["shape"] == result["y_pred"]["shape"]  # type: ignore[index]
 
 
-def test_fit_model_rf_returns_expected_keys():
+def test_fit_model_rf_returns_expected_keys(tmp_path):
+    from dags.iris_pipeline.artifacts import LocalArtifactStore
     from dags.iris_pipeline.train import fit_model
 
     wine = datasets.load_wine()
     X = wine.data
     y = wine.target
     settings = _get_settings("rf")
-    result = fit_model(settings, X, y)
+    result = fit_model(settings, X, y, store=LocalArtifactStore(str(tmp_path)))
 
     assert result["params"]["model"] == "RandomForestClassifier"
-    assert len(result["y_test"]) == len(result["y_pred"])  # type: ignore[index]
+    assert result["y_test"]["shape"] == result["y_pred"]["shape"]  # type: ignore[index]
+
+
+def test_fit_model_passes_test_arrays_by_reference(tmp_path):
+    import json
+
+    from dags.iris_pipeline.artifacts import LocalArtifactStore
+    from dags.iris_pipeline.train import fit_model
+    from dags.iris_pipeline.types import ArtifactRef
+
+    wine = datasets.load_wine()
+    store = LocalArtifactStore(str(tmp_path))
+    result = fit_model(_get_settings("logreg"), wine.data, wine.target, store=store, namespace="run_1")
+
+    # The payload stays small and JSON-serializable (XCom)
+    assert len(json.dumps(result)) < 4096
+    y_test = store.get_array(ArtifactRef(**result["y_test"]))
+    assert y_test.shape == tuple(result["y_test"]["shape"]) == (36,)
+    assert result["X_test"]["shape"] == (36, wine.data.shape[1])
+
+
+def test_load_dataset_incremental_uses_partition_cache(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+
+    from dags.iris_pipeline import train
+    from dags.iris_pipeline.dataset_cache import PartitionCache
+    from dags.iris_pipeline.ingest import load_iris_df
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'wine.db'}")
+    monkeypatch.setattr(train, "get_engine", lambda settings: engine)
+    settings = _get_settings("logreg", dataset_cache_dir=str(tmp_path / "cache"))
+
+    load_iris_df("2024-01-01").to_sql("wine_data", engine, index=False)
+    load_iris_df("2024-01-02").to_sql("wine_data", engine, index=False, if_exists="append")
+    X, y = train.load_dataset(settings)
+    assert X.shape == (356, len(train.FEATURE_COLS))
+    assert len(y) == 356
+
+    cache = PartitionCache(settings.dataset_cache_dir, settings.iris_table)
+    assert cache.partitions() == ["2024-01-01", "2024-01-02"]
+    assert cache.watermark() == "2024-01-02"
+
+    # Drop an already-cached partition from the DB: it is served from the cache
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM wine_data WHERE ingestion_date < '2024-01-02'")
+    load_iris_df("2024-01-03").to_sql("wine_data", engine, index=False, if_exists="append")
+    X, y = train.load_dataset(settings)
+    assert X.shape[0] == 3 * 178
+    assert cache.watermark() == "2024-01-03"
+
+    # Full refresh reloads only what is currently in the table
+    X, y = train.load_dataset(_get_settings("logreg", dataset_cache_dir=settings.dataset_cache_dir, full_refresh=True))
+    assert X.shape[0] == 2 * 178
+    assert cache.partitions() == ["2024-01-02", "2024-01-03"]
+
+
+def test_read_arrays_streams_chunks_into_preallocated_arrays(tmp_path):
+    import pandas as pd
+    from sqlalchemy import create_engine
+
+    from dags.iris_pipeline import train
+    from dags.iris_pipeline.ingest import load_iris_df
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'wine.db'}")
+    df = load_iris_df("2024-01-01")
+    df.to_sql("wine_data", engine, index=False)
+
+    settings = _get_settings("logreg", load_chunk_rows=50, feature_dtype="float32")
+    X, y = train.read_arrays(engine, settings)
+
+    assert X.dtype == np.float32 and X.shape == (178, len(train.FEATURE_COLS))
+    expected = pd.read_sql("SELECT * FROM wine_data", engine)
+    np.testing.assert_allclose(X, expected[train.FEATURE_COLS].values, rtol=1e-6)
+    np.testing.assert_array_equal(y, expected["target"].values)
+
+
+def test_sweep_expands_grid_and_selects_best(tmp_path):
+    import json
+
+    from dags.iris_pipeline.artifacts import LocalArtifactStore
+    from dags.iris_pipeline.train import expand_search_space, fit_model, select_best
+
+    assert expand_search_space(_get_settings("rf")) == [{"model_type": "rf", "params": {}}]
+
+    space = {"logreg": {"C": [0.01, 1.0]}, "rf": {"n_estimators": [10], "max_depth": [2, None]}}
+    settings = _get_settings("logreg", search_space=json.dumps(space), n_jobs=1)
+    candidates = expand_search_space(settings)
+    assert len(candidates) == 4
+    assert {"model_type": "rf", "params": {"max_depth": 2, "n_estimators": 10}} in candidates
+
+    wine = datasets.load_wine()
+    store = LocalArtifactStore(str(tmp_path))
+    results = [fit_model(settings, wine.data, wine.target, store=store, candidate=c) for c in candidates]
+    best = select_best(results, settings.sweep_metric)
+
+    assert best["score"] == max(r["score"] for r in results)
+    assert len(best["candidates"]) == 4
+    assert results[2]["params"]["n_jobs"] == 1
+
+
+def test_hash_split_is_stable_and_sized():
+    from dags.iris_pipeline.train import hash_split
+
+    keys = np.arange(1, 100_001, dtype=np.float64)
+    mask = hash_split(keys, 0.2, seed=42)
+    assert abs(mask.mean() - 0.2) < 0.01
+    # Independent of chunking and order; a different seed gives a different split
+    chunked = np.concatenate([hash_split(keys[:123], 0.2, 42), hash_split(keys[123:], 0.2, 42)])
+    np.testing.assert_array_equal(chunked, mask)
+    np.testing.assert_array_equal(hash_split(keys[::-1], 0.2, 42), mask[::-1])
+    assert (hash_split(keys, 0.2, seed=7) != mask).any()
+
+
+def test_fit_incremental_streams_from_table(tmp_path):
+    import joblib
+    from sqlalchemy import create_engine
+
+    from dags.iris_pipeline import db, ingest
+    from dags.iris_pipeline.artifacts import LocalArtifactStore
+    from dags.iris_pipeline.train import fit_incremental
+    from dags.iris_pipeline.types import ArtifactRef
+
+    from dataclasses import replace
+
+    settings = replace(_get_settings("sgd", load_chunk_rows=100, incremental_epochs=3), postgres_conn_id="incremental")
+    db.register_engine(settings, create_engine(f"sqlite:///{tmp_path / 'wine.db'}"))
+    for ds in ("2024-01-01", "2024-01-02", "2024-01-03"):
+        ingest.write_iris(settings, ingest.load_iris_df(ds))
+    store = LocalArtifactStore(str(tmp_path / "artifacts"))
+
+    results = {}
+    for model_type in ("sgd", "nb"):
+        candidate = {"model_type": model_type, "params": {}}
+        result = fit_incremental(settings, store=store, namespace="run_1", candidate=candidate)
+        y_test = store.get_array(ArtifactRef(**result["y_test"]))
+        assert result["X_test"] is None
+        assert result["params"]["train_rows"] + len(y_test) == 3 * 178
+        assert 0.1 < len(y_test) / (3 * 178) < 0.3
+        assert result["score"] > 0.85
+        model = joblib.load(result["model_path"])
+        assert model.predict_proba(np.zeros((1, len(result["features"])))).shape == (1, 3)
+        results[model_type] = y_test
+
+    # Same hash split for every candidate
+    np.testing.assert_array_equal(results["sgd"], results["nb"])
+
+
+def test_warm_start_loads_new_partitions_and_continues_published_model(tmp_path):
+    from dataclasses import replace
+
+    import joblib
+    from sqlalchemy import create_engine, event
+
+    from dags.iris_pipeline import db, drift, ingest
+    from dags.iris_pipeline.artifacts import LocalArtifactStore
+    from dags.iris_pipeline.train import fit_model, load_training_set, stage_training_set
+    from dags.iris_pipeline.types import ArtifactRef
+
+    settings = replace(
+        _get_settings("rf", warm_start=True, replay_rows=100, warm_start_trees=10, n_jobs=1),
+        postgres_conn_id="warm_start",
+    )
+    db.register_engine(settings, create_engine(f"sqlite:///{tmp_path / 'wine.db'}"))
+    store = LocalArtifactStore(str(tmp_path / "artifacts"))
+    for ds in ("2024-01-01", "2024-01-02"):
+        ingest.write_iris(settings, ingest.load_iris_df(ds))
+
+    # No published model yet: full load
+    X, y, info = load_training_set(settings, store)
+    assert len(y) == 356 and info["base_model"] is None and info["trained_through"] == "2024-01-02"
+    first = fit_model(settings, X, y, store=store, namespace="run_1")
+    store.publish("model", ArtifactRef(**first["model_ref"]), {"params": first["params"], **info})
+
+    ingest.write_iris(settings, ingest.load_iris_df("2024-01-03"))
+    X, y, info = load_training_set(settings, store)
+    assert info["new_rows"] == 178 and 50 <= info["replay_rows"] <= 100
+    assert len(y) == info["new_rows"] + info["replay_rows"]
+    # With the ingest's per-partition stats, the replay sample is sized without a COUNT(*) scan
+    engine = db.get_engine(settings)
+    drift.write_stats(engine, settings, drift.frame_stats(ingest.load_iris_df("2024-01-01")))
+    drift.write_stats(engine, settings, drift.frame_stats(ingest.load_iris_df("2024-01-02")))
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    _, y_stats, stats_info = load_training_set(settings, store)
+    event.remove(engine, "before_cursor_execute", record)
+    assert stats_info["replay_rows"] == info["replay_rows"] and len(y_stats) == len(y)
+    assert not any("COUNT(*)" in s for s in statements)
+
+    base_path = store.local_path(ArtifactRef(**info["base_model"]))
+    previous = joblib.load(base_path)
+    second = fit_model(
+        settings, X, y, store=store, namespace="run_2", base_model_path=base_path, holdout_rows=info["new_rows"]
+    )
+    # The holdout comes from the new partition only; every replayed row is trained on
+    marked = X.copy()
+    marked[info["new_rows"] :, 0] = -1.0
+    split = fit_model(settings, marked, y, store=store, namespace="run_3", holdout_rows=info["new_rows"])
+    X_test = store.get_array(ArtifactRef(**split["X_test"]))
+    assert len(X_test) == round(0.2 * info["new_rows"]) and (X_test[:, 0] > 0).all()
+    assert len(store.get_array(ArtifactRef(**second["y_test"]))) == len(X_test)
+    model = joblib.load(second["model_path"])
+    assert second["params"]["warm_start"] is True and second["score"] > 0.85
+    # Forest size is unchanged: the 90 newest trees are kept and 10 are regrown
+    assert len(model.estimators_) == 100
+    kept = [t.tree_.node_count for t in model.estimators_[:90]]
+    assert kept == [t.tree_.node_count for t in previous.estimators_[10:]]
+
+    # Staged for the fit tasks: array references plus the load info
+    staged = stage_training_set(settings, store, "run_4")
+    assert staged["base_model"] == info["base_model"] and staged["new_rows"] == info["new_rows"]
+    np.testing.assert_array_equal(store.get_array(ArtifactRef(**staged["y"])), y)
+
+    # A model type that differs from the published one trains from scratch on everything
+    X, y, info = load_training_set(replace(settings, model_type="logreg"), store)
+    assert info["base_model"] is None and len(y) == 3 * 178
+
+
+def test_logreg_pipeline_scales_features_and_records_convergence(tmp_path):
+    import joblib
+    import pytest
+    from sklearn.pipeline import Pipeline
+
+    from dags.iris_pipeline.artifacts import LocalArtifactStore
+    from dags.iris_pipeline.train import build_model, expand_search_space, fit_model, warm_start_model
+
+    wine = datasets.load_wine()
+    store = LocalArtifactStore(str(tmp_path))
+    scaled = fit_model(_get_settings("logreg", n_jobs=1), wine.data, wine.target, store=store)
+    raw = fit_model(_get_settings("logreg", n_jobs=1, scaler="none"), wine.data, wine.target, store=store)
+
+    # The scaler is persisted with the model and takes the solver well under its cap
+    model = joblib.load(scaled["model_path"])
+    assert isinstance(model, Pipeline) and model.named_steps["scaler"].mean_.shape == (13,)
+    assert scaled["params"]["scaler"] == "standard" and scaled["params"]["solver"] == "lbfgs"
+    assert scaled["fit_stats"]["converged"] == 1.0
+    assert raw["fit_stats"]["n_iter"] > 3 * scaled["fit_stats"]["n_iter"]
+    assert scaled["fit_stats"]["fit_seconds"] > 0
+    assert scaled["score"] >= raw["score"]
+
+    # Warm start continues the classifier inside the pipeline
+    settings = _get_settings("logreg", n_jobs=1)
+    fresh, _ = build_model(settings, "logreg")
+    warm = warm_start_model(settings, model, fresh, wine.target)
+    assert isinstance(warm, Pipeline) and warm.named_steps["clf"].warm_start
+    assert warm_start_model(settings, joblib.load(raw["model_path"]), fresh, wine.target) is None
+
+    with pytest.raises(ValueError):
+        build_model(_get_settings("logreg", scaler="quantile"), "logreg")
+    # A mistyped SWEEP_METRIC (or a non-metric field) fails before any candidate is fitted
+    for metric in ("acuracy", "confusion_matrix_path", "per_class"):
+        with pytest.raises(ValueError, match=f"Unknown SWEEP_METRIC={metric}"):
+            expand_search_space(_get_settings("logreg", sweep_metric=metric))
+        with pytest.raises(ValueError, match="Unknown SWEEP_METRIC"):
+            fit_model(_get_settings("logreg", sweep_metric=metric), wine.data, wine.target, store=store)
+
+
+def test_cross_validate_parallel_folds_match_serial(tmp_path):
+    import pytest
+
+    from dags.iris_pipeline.train import cross_validate, select_best
+
+    wine = datasets.load_wine()
+    np.save(tmp_path / "X.npy", wine.data)
+    np.save(tmp_path / "y.npy", wine.target)
+    paths = (str(tmp_path / "X.npy"), str(tmp_path / "y.npy"))
+
+    serial = cross_validate(_get_settings("logreg", cv_folds=4, bootstrap_samples=200, cv_workers=1), *paths)
+    parallel = cross_validate(_get_settings("logreg", cv_folds=4, bootstrap_samples=200, cv_workers=4), *paths)
+
+    assert (serial["workers"], parallel["workers"]) == (1, 4)
+    assert parallel["metrics"] == serial["metrics"] and parallel["confusion_matrix"] == serial["confusion_matrix"]
+    # Every row is predicted once, out of fold
+    assert np.sum(parallel["confusion_matrix"]) == len(wine.target) and len(parallel["fit_seconds"]) == 4
+    m = parallel["metrics"]
+    assert m["accuracy_ci_low"] <= m["accuracy_mean"] <= m["accuracy_ci_high"] and m["accuracy_std"] > 0
+
+    # Selection prefers the cross-validated mean over the holdout score
+    results = [
+        {"params": {"C": 1}, "score": 0.9, "cv": {"metrics": {"accuracy_mean": 0.97}}},
+        {"params": {"C": 2}, "score": 1.0, "cv": {"metrics": {"accuracy_mean": 0.95}}},
+    ]
+    assert select_best(results)["params"] == {"C": 1}
+    # A sweep where some candidates have no folds is ranked on holdout scores throughout
+    mixed = [*results, {"params": {"alpha": 1e-4}, "score": 0.96}]
+    best = select_best(mixed)
+    assert best["params"] == {"C": 2} and {c["basis"] for c in best["candidates"]} == {"holdout"}
+    # Metrics without fold statistics are rejected up front instead of failing with a KeyError
+    with pytest.raises(ValueError, match="SWEEP_METRIC=f1_weighted"):
+        select_best(results, "f1_weighted")
+    with pytest.raises(ValueError, match="SWEEP_METRIC=f1_macro"):
+        cross_validate(_get_settings("logreg", cv_folds=4, sweep_metric="f1_macro"), *paths)
+    assert select_best(mixed, "f1_weighted")["params"] == {"C": 2}
@@ -0,0 +1,78 @@
+from dataclasses import replace
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def _settings(tmp_path, **overrides):
+    from sqlalchemy import create_engine
+
+    from dags.iris_pipeline import db
+    from dags.iris_pipeline.config import Settings
+
+    settings = Settings(**{"postgres_conn_id": "validation", "iris_table": "wine_data", **overrides})
+    db.register_engine(settings, create_engine(f"sqlite:///{tmp_path / 'wine.db'}"))
+    db.ensure_tables(db.get_engine(settings), settings)
+    return settings
+
+
+def test_validation_pushes_rules_down_and_reports_per_partition(tmp_path):
+    from dags.iris_pipeline import db, ingest, validation
+
+    settings = _settings(tmp_path)
+    engine = db.get_engine(settings)
+    ingest.write_iris(settings, ingest.load_iris_df("2024-01-01"))
+    bad = ingest.load_iris_df("2024-01-02")
+    bad.loc[:4, "proline"] = 1e6
+    bad.loc[5:6, "hue"] = np.nan
+    bad.loc[7, "target"] = 7
+    ingest.write_iris(settings, bad)
+
+    days = [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)]
+    results = validation.validate_partitions(engine, settings, days)
+    failed = {day: {r.rule: r for r in rs if not r.passed} for day, rs in results.items()}
+    assert failed["2024-01-01"] == {}
+    assert set(failed["2024-01-02"]) == {"range(proline)", "not_null(hue)", "allowed_values(target)"}
+    assert failed["2024-01-02"]["range(proline)"].failed_rows == 5
+    assert failed["2024-01-02"]["range(proline)"].detail == "5 of 178 rows outside [0, 5000]"
+    assert failed["2024-01-02"]["not_null(hue)"].failed_rows == 2
+    # A partition that was never written
+    assert set(failed["2024-01-03"]) == {"min_rows"}
+
+    with pytest.raises(validation.ValidationError) as err:
+        validation.run_validation(engine, settings, days, dag_run_id="run_1")
+    assert "range(proline): 5 of 178 rows" in str(err.value)
+    recorded = pd.read_sql("SELECT * FROM wine_validation", engine)
+    assert set(recorded["dag_run_id"]) == {"run_1"}
+    assert len(recorded) == sum(len(rs) for rs in results.values())
+    assert recorded.loc[~recorded["passed"].astype(bool), "rule"].tolist().count("range(proline)") == 1
+
+    # "warn" records and reports without raising; re-running replaces the rows
+    summary = validation.run_validation(engine, replace(settings, validation_mode="warn"), days[:2], dag_run_id="run_2")
+    assert summary["partitions"] == 2 and len(summary["failed"]) == 3
+    recorded = pd.read_sql("SELECT dag_run_id, COUNT(*) AS n FROM wine_validation GROUP BY dag_run_id", engine)
+    per_day = len(results["2024-01-01"])
+    assert dict(zip(recorded["dag_run_id"], recorded["n"])) == {"run_1": per_day, "run_2": 2 * per_day}
+    assert validation.run_validation(engine, replace(settings, validation_mode="off"), days)["rules"] == 0
+
+
+def test_validation_reports_missing_columns(tmp_path):
+    from sqlalchemy import text
+
+    from dags.iris_pipeline import db, ingest, validation
+
+    settings = _settings(tmp_path, iris_table="renamed_data")
+    engine = db.get_engine(settings)
+    # A frame written without RENAME_MAP applied
+    df = ingest.load_iris_df("2024-01-01").rename(columns={v: k for k, v in ingest.RENAME_MAP.items()})
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE renamed_data"))
+    df.to_sql("renamed_data", engine, index=False)
+
+    results = validation.validate_partitions(engine, settings, [date(2024, 1, 1)])["2024-01-01"]
+    failed = [(r.rule, r.column) for r in results if not r.passed]
+    assert failed == [("schema", "od280_od315_of_diluted_wines")]
+    # Rules on the remaining columns still ran
+    assert any(r.rule == "range(proline)" and r.passed and r.row_count == 178 for r in results)